@@ -1,16 +1,15 @@
 import streamlit as st
-import subprocess
-import requests
-import urllib.parse
-from pathlib import Path
-import os
 import shutil
-import base64
+import json
 import streamlit.components.v1 as components
-
-BASE_DIR = Path.cwd()
-SRC_DIR = BASE_DIR / "src"
-SEPARATED_DIR = BASE_DIR / "separated" / "htdemucs"
+from sound_ai import jobs
+from sound_ai import metrics
+from sound_ai import mixes
+from sound_ai import stem_server
+from sound_ai.config import SEPARATED_DIR, SRC_DIR, STEM_FORMAT
+from sound_ai.library import PAGE_SIZE
+from sound_ai.pipeline import MIME_TYPES
+from sound_ai.storage import format_bytes
 
 SRC_DIR.mkdir(exist_ok=True)
 SEPARATED_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,140 +19,24 @@ st.set_page_config(
     layout="wide"
 )
 
-def sanitize_name(name: str) -> str:
-    forbidden = ['/', '\\', ':', '*', '?', '"', '<', '>', '|', '\0']
-    clean = "".join([c if c not in forbidden else "_" for c in name])
-    clean = clean.strip()
-    return clean if clean else "audio_temp"
-
-def convert_to_mp3(file_path: Path) -> Path:
-    if file_path.suffix == ".mp3":
-        return file_path
-        
-    mp3_path = file_path.with_suffix(".mp3")
-    
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", str(file_path),
-        "-codec:a", "libmp3lame",
-        "-qscale:a", "2",
-        str(mp3_path)
-    ]
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    if mp3_path.exists() and mp3_path.stat().st_size > 0:
-        try:
-            file_path.unlink() 
-        except Exception:
-            pass
-        return mp3_path
-    return file_path
-
-def download_audio(video_url: str, music_name: str) -> tuple[Path | None, str]:
-    if not music_name:
-        music_name = "audio_temp"
-        
-    final_name = sanitize_name(music_name)
-    mp3_path = SRC_DIR / f"{final_name}.mp3"
-    
-    if mp3_path.exists():
-        mp3_path.unlink()
-
-    encoded_url = urllib.parse.quote(video_url, "")
-    api_url = f"https://www.clipto.com/api/youtube/mp3?url={encoded_url}&csrfToken=8crUK66l-IsnUGoga9wzUzPRRfb4Inx9MEIw"
-
-    try:
-        with st.spinner(f"Baixando {final_name}..."):
-            r = requests.get(api_url, stream=True)
-            r.raise_for_status()
-            with open(mp3_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        f.write(chunk)
-        return mp3_path, final_name
-    except Exception as e:
-        st.error(f"Erro no download: {e}")
-        return None, final_name
-
-def process_demucs(input_mp3: Path, music_name: str) -> bool:
-    with st.spinner(f"Separando faixas de {music_name}..."):
-        result = subprocess.run(
-            ["demucs", "-n", "htdemucs", str(input_mp3)], 
-            capture_output=True, 
-            text=True
-        )
-        
-        if result.returncode != 0:
-            
-            st.error(f"Erro no processamento: {result.stderr}")
-            with st.expander("Detalhes do erro"):
-                st.code(result.stdout)
-            return False
-
-    target_dir = SEPARATED_DIR / input_mp3.stem
-    if not target_dir.exists():
-        st.error("Diretório de saída não encontrado.")
-        return False
-
-    stems = ["vocals.wav", "drums.wav", "bass.wav", "other.wav"]
-    mp3_stems = {}
-
-    with st.spinner("Otimizando arquivos (WAV para MP3)..."):
-        for stem in stems:
-            stem_path = target_dir / stem
-            if stem_path.exists():
-                new_path = convert_to_mp3(stem_path)
-                mp3_stems[stem.replace(".wav", "")] = new_path
-
-    vocals = mp3_stems.get("vocals")
-    drums = mp3_stems.get("drums")
-    bass = mp3_stems.get("bass")
-    
-    mixed_file = target_dir / "mixed_audio.mp3"      
-    mixed_voice_file = target_dir / "mixed_audio_voice.mp3" 
-
-    if drums and bass and drums.exists() and bass.exists():
-        with st.spinner("Criando Mixagem (Bateria + Baixo)..."):
-            cmd_mix = [
-                "ffmpeg", "-y",
-                "-i", str(drums),
-                "-i", str(bass),
-                "-filter_complex", "amix=inputs=2:duration=longest",
-                "-codec:a", "libmp3lame", "-qscale:a", "2",
-                str(mixed_file)
-            ]
-            subprocess.run(cmd_mix, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-    if drums and bass and vocals and drums.exists() and bass.exists() and vocals.exists():
-        with st.spinner("Criando Mixagem Completa (Voz + Bateria + Baixo)..."):
-            cmd_mix_voice = [
-                "ffmpeg", "-y",
-                "-i", str(vocals),
-                "-i", str(drums),
-                "-i", str(bass),
-                "-filter_complex", "amix=inputs=3:duration=longest", 
-                "-codec:a", "libmp3lame", "-qscale:a", "2",
-                str(mixed_voice_file)
-            ]
-            subprocess.run(cmd_mix_voice, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-
-    if input_mp3.exists():
-        try:
-            input_mp3.unlink()
-        except Exception as e:
-            st.warning(f"Não foi possível remover arquivo original: {e}")
-
-    return True
+stem_server.ensure_stem_server(SEPARATED_DIR)
 
 if "selected_music" not in st.session_state:
     st.session_state.selected_music = None
 
+if "library_page" not in st.session_state:
+    st.session_state.library_page = 0
+    st.session_state.library_filter = ("", "recent")
+
+@metrics.traced("cleanup")
 def handle_delete(folder_path):
     import time
     try:
         if folder_path.exists():
             shutil.rmtree(folder_path)
+        jobs.get_job_queue().cache.forget(folder_path)
+        jobs.get_job_queue().library.remove(folder_path.name)
+        mixes.get_mix_cache().forget(folder_path)
         
         st.session_state.selected_music = None
         time.sleep(0.1)
@@ -165,12 +48,14 @@ def handle_delete(folder_path):
 
 def get_stem_player_html(stems_dict):
     audio_data = {}
+    peaks_data = {}
     
     for name, path in stems_dict.items():
         if path.exists():
-            with open(path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode()
-                audio_data[name] = f"data:audio/mp3;base64,{b64}"
+            audio_data[name] = stem_server.stem_path(path, SEPARATED_DIR)
+            peaks_file = path.with_suffix(".peaks")
+            if peaks_file.exists():
+                peaks_data[name] = stem_server.stem_path(peaks_file, SEPARATED_DIR)
     
     if not audio_data:
         return "<div>Sem áudio</div>"
@@ -224,6 +109,16 @@ def get_stem_player_html(stems_dict):
             font-weight: bold;
             font-size: 14px;
         }}
+        .track-card {{
+            flex-wrap: wrap;
+            row-gap: 10px;
+        }}
+        .wave {{
+            width: 100%;
+            height: 48px;
+            cursor: pointer;
+            display: block;
+        }}
         
         .switch {{
             position: relative;
@@ -293,7 +188,7 @@ def get_stem_player_html(stems_dict):
         "other": "OUTROS"
     }
 
-    for name, b64_src in audio_data.items():
+    for name, stem_src in audio_data.items():
         label = labels_pt.get(name, name.upper())
         html_code += f"""
         <div class="track-card">
@@ -302,15 +197,32 @@ def get_stem_player_html(stems_dict):
                 <input type="checkbox" id="chk_{name}" checked onchange="toggleMute('{name}')">
                 <span class="slider"></span>
             </label>
-            <audio id="audio_{name}" src="{b64_src}" preload="auto" ontimeupdate="updateProgress()"></audio>
+            <audio id="audio_{name}" data-src="{stem_src}" preload="metadata" ontimeupdate="updateProgress()"></audio>
+            <canvas class="wave" id="wave_{name}" data-peaks="{peaks_data.get(name, '')}"></canvas>
         </div>
         """
 
-    html_code += """
+    html_code += f"""
         </div>
     </div>
 
     <script>
+        const STEM_PUBLIC_URL = {json.dumps(stem_server.PUBLIC_URL)};
+        const STEM_PORT = {stem_server.PORT};
+        function stemBaseUrl() {{
+            if (STEM_PUBLIC_URL) return STEM_PUBLIC_URL;
+            let loc = window.location;
+            try {{ loc = window.parent.location; }} catch (e) {{}}
+            return loc.protocol + '//' + loc.hostname + ':' + STEM_PORT;
+        }}
+        document.querySelectorAll('audio[data-src]').forEach(a => {{
+            a.src = stemBaseUrl() + a.dataset.src;
+        }});
+        document.querySelectorAll('canvas[data-peaks]').forEach(c => {{
+            if (c.dataset.peaks) loadPeaks(c, stemBaseUrl() + c.dataset.peaks);
+        }});
+    """
+    html_code += """
         const tracks = document.querySelectorAll('audio');
         const progress = document.getElementById('progressBar');
         const playBtn = document.getElementById('mainPlayBtn');
@@ -342,28 +254,170 @@ def get_stem_player_html(stems_dict):
             if (tracks.length > 0 && tracks[0].duration) {
                 const val = (tracks[0].currentTime / tracks[0].duration) * 100;
                 progress.value = val;
+                drawAllWaves();
             }
         }
 
+        // Formas de onda a partir dos arquivos .peaks (ver sound_ai/peaks.py),
+        // sem baixar nem decodificar o áudio
+        const waves = {};
+
+        function parsePeaks(buf) {
+            const view = new DataView(buf);
+            const magic = String.fromCharCode(...new Uint8Array(buf, 0, 4));
+            if (magic !== 'SAPK' || view.getUint8(4) !== 1) return null;
+            const count = view.getUint8(5);
+            const result = {
+                samplerate: view.getUint32(8, true),
+                frames: Number(view.getBigUint64(12, true)),
+                levels: [],
+            };
+            let offset = 20;
+            for (let i = 0; i < count; i++) {
+                const spb = view.getUint32(offset, true);
+                const buckets = view.getUint32(offset + 4, true);
+                offset += 8;
+                result.levels.push({spb, buckets, data: new Int8Array(buf, offset, buckets * 2)});
+                offset += buckets * 2;
+            }
+            return result;
+        }
+
+        function waveColumns(peaks, width) {
+            // nível mais grosso que ainda tem ao menos um bucket por pixel
+            let level = peaks.levels[0];
+            for (const l of peaks.levels) {
+                if (l.buckets >= width) level = l;
+            }
+            const lo = new Float32Array(width), hi = new Float32Array(width);
+            for (let x = 0; x < width; x++) {
+                const start = Math.floor(x * level.buckets / width);
+                const stop = Math.max(start + 1, Math.floor((x + 1) * level.buckets / width));
+                let min = 127, max = -127;
+                for (let b = start; b < stop && b < level.buckets; b++) {
+                    min = Math.min(min, level.data[2 * b]);
+                    max = Math.max(max, level.data[2 * b + 1]);
+                }
+                lo[x] = min / 127;
+                hi[x] = max / 127;
+            }
+            return {lo, hi};
+        }
+
+        function drawWave(name) {
+            const wave = waves[name];
+            const canvas = wave.canvas;
+            const ratio = window.devicePixelRatio || 1;
+            const width = Math.max(1, Math.round(canvas.clientWidth * ratio));
+            const height = Math.max(1, Math.round(canvas.clientHeight * ratio));
+            if (canvas.width !== width || canvas.height !== height || !wave.columns) {
+                canvas.width = width;
+                canvas.height = height;
+                wave.columns = waveColumns(wave.peaks, width);
+            }
+            const ctx = canvas.getContext('2d');
+            const t = tracks[0];
+            const played = t && t.duration ? t.currentTime / t.duration * width : 0;
+            const audio = document.getElementById('audio_' + name);
+            ctx.clearRect(0, 0, width, height);
+            const mid = height / 2;
+            for (let x = 0; x < width; x++) {
+                ctx.fillStyle = x < played ? '#2196F3' : (audio && audio.muted ? '#3a3a3a' : '#777');
+                const top = mid - wave.columns.hi[x] * mid;
+                const bottom = mid - wave.columns.lo[x] * mid;
+                ctx.fillRect(x, top, 1, Math.max(1, bottom - top));
+            }
+            if (wave.hover !== null) {
+                // prévia da busca: linha e tempo sob o cursor
+                const x = wave.hover * width;
+                const seconds = wave.hover * wave.peaks.frames / wave.peaks.samplerate;
+                ctx.fillStyle = '#FAFAFA';
+                ctx.fillRect(x, 0, ratio, height);
+                ctx.font = (11 * ratio) + 'px sans-serif';
+                const label = Math.floor(seconds / 60) + ':' + String(Math.floor(seconds % 60)).padStart(2, '0');
+                ctx.fillText(label, Math.min(x + 4 * ratio, width - 32 * ratio), 12 * ratio);
+            }
+        }
+
+        function drawAllWaves() {
+            Object.keys(waves).forEach(drawWave);
+        }
+
+        async function loadPeaks(canvas, url) {
+            try {
+                const response = await fetch(url);
+                if (!response.ok) return;
+                const peaks = parsePeaks(await response.arrayBuffer());
+                if (!peaks) return;
+                const name = canvas.id.slice('wave_'.length);
+                waves[name] = {canvas, peaks, columns: null, hover: null};
+                const fraction = e => {
+                    const rect = canvas.getBoundingClientRect();
+                    return Math.min(Math.max((e.clientX - rect.left) / rect.width, 0), 1);
+                };
+                canvas.addEventListener('mousemove', e => { waves[name].hover = fraction(e); drawWave(name); });
+                canvas.addEventListener('mouseleave', () => { waves[name].hover = null; drawWave(name); });
+                canvas.addEventListener('click', e => { seekAll(fraction(e) * 100); drawAllWaves(); });
+                drawWave(name);
+            } catch (e) {}
+        }
+        window.addEventListener('resize', () => {
+            Object.values(waves).forEach(w => w.columns = null);
+            drawAllWaves();
+        });
+
         function toggleMute(name) {
             const audio = document.getElementById('audio_' + name);
             const chk = document.getElementById('chk_' + name);
             audio.muted = !chk.checked;
+            if (waves[name]) drawWave(name);
         }
     </script>
     """
     return html_code
 
-def render_list_view(subfolders):
+LIBRARY_SORTS_PT = {
+    "recent": "Mais recentes",
+    "oldest": "Mais antigas",
+    "name": "Nome",
+    "duration": "Duração",
+    "size": "Tamanho",
+}
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+def render_list_view(library, storage):
     st.markdown("### Minhas Músicas")
     st.caption("Selecione uma música para abrir o mixer multifaixa")
+    if storage.quota_bytes:
+        used = storage.usage()
+        st.progress(min(used / storage.quota_bytes, 1.0),
+                    text=f"💾 {format_bytes(used)} de {format_bytes(storage.quota_bytes)}")
+
+    col_search, col_sort = st.columns([0.7, 0.3])
+    with col_search:
+        search = st.text_input("Buscar", key="library_search", placeholder="🔎 Buscar por nome ou URL", label_visibility="collapsed")
+    with col_sort:
+        sort = st.selectbox("Ordenar", list(LIBRARY_SORTS_PT), format_func=LIBRARY_SORTS_PT.get, key="library_sort", label_visibility="collapsed")
     st.divider()
 
-    if not subfolders:
-        st.info("📂 Nenhuma música processada ainda. Use o menu lateral para começar!")
+    if st.session_state.library_filter != (search, sort):
+        st.session_state.library_filter = (search, sort)
+        st.session_state.library_page = 0
+
+    page = st.session_state.library_page
+    tracks, total = library.query(search, sort, limit=PAGE_SIZE, offset=page * PAGE_SIZE)
+
+    if not total:
+        if search:
+            st.info("Nenhuma música encontrada para essa busca.")
+        else:
+            st.info("📂 Nenhuma música processada ainda. Use o menu lateral para começar!")
         return
 
-    for folder in subfolders:
+    for track in tracks:
         with st.container(border=True):
             col_icon, col_name, col_action = st.columns([0.05, 0.7, 0.25])
             
@@ -371,25 +425,98 @@ def render_list_view(subfolders):
                 st.markdown("### 🎵")
             
             with col_name:
-                st.markdown(f"**{folder.name}**")
+                st.markdown(f"**{track.id}**")
                 
-                stem_count = len(list(folder.glob("*.mp3")))
-                if stem_count > 0:
-                    st.caption(f"🎚️ {stem_count} faixas disponíveis")
+                if track.stems:
+                    caption = f"🎚️ {len(track.stems)} faixas disponíveis"
+                    if track.duration:
+                        caption += f" · ⏱️ {format_duration(track.duration)}"
+                    st.caption(caption)
             
             with col_action:
-                if st.button("▶ ABRIR", key=f"open_{folder.name}", use_container_width=True, type="primary"):
-                    st.session_state.selected_music = folder.name
+                if st.button("▶ ABRIR", key=f"open_{track.id}", use_container_width=True, type="primary"):
+                    st.session_state.selected_music = track.id
                     st.rerun()
 
+    pages = -(-total // PAGE_SIZE)
+    if pages > 1:
+        col_prev, col_page, col_next = st.columns([0.2, 0.6, 0.2])
+        with col_prev:
+            if st.button("⬅ Anterior", disabled=page == 0, use_container_width=True):
+                st.session_state.library_page = page - 1
+                st.rerun()
+        with col_page:
+            st.caption(f"Página {page + 1} de {pages} · {total} músicas")
+        with col_next:
+            if st.button("Próxima ➡", disabled=page >= pages - 1, use_container_width=True):
+                st.session_state.library_page = page + 1
+                st.rerun()
+
+def render_custom_mix(folder_path):
+    st.markdown("#### 💿 Mix Personalizado")
+    labels_pt = {"vocals": "🎤 Voz", "drums": "🥁 Bateria", "bass": "🎸 Baixo", "other": "🎹 Outros"}
+    with st.container(border=True):
+        preset = st.selectbox("Atalho", ["Personalizado", *mixes.PRESETS], key=f"mix_preset_{folder_path.name}")
+        base = mixes.PRESETS.get(preset, {stem: 1.0 for stem in mixes.STEMS})
+
+        gains = {}
+        cols = st.columns(len(mixes.STEMS))
+        for col, stem in zip(cols, mixes.STEMS):
+            with col:
+                # a chave inclui o atalho para que trocar de atalho reposicione os controles
+                key = f"mix_{stem}_{preset}_{folder_path.name}"
+                on = st.checkbox(labels_pt[stem], value=stem in base, key=f"{key}_on")
+                volume = st.slider("Volume (%)", 0, int(mixes.MAX_GAIN * 100), 100, step=5,
+                                   key=f"{key}_vol", disabled=not on, label_visibility="collapsed")
+                gains[stem] = volume / 100 if on else 0.0
+
+        try:
+            spec = mixes.MixSpec.create(gains)
+        except mixes.MixError as e:
+            st.caption(str(e))
+            return
+
+        cache = mixes.get_mix_cache()
+        mixed = cache.lookup(folder_path, spec)
+        if mixed is None:
+            # só gasta CPU quando alguém pede esta combinação
+            if not st.button("🎛️ Gerar mix", use_container_width=True, key=f"mix_render_{folder_path.name}"):
+                return
+            with st.spinner("Gerando mixagem..."):
+                try:
+                    mixed = cache.render(folder_path, spec)
+                except mixes.MixError as e:
+                    st.error(str(e))
+                    return
+
+        col_play, col_download = st.columns([0.7, 0.3])
+        with col_play:
+            st.audio(str(mixed), format=MIME_TYPES[STEM_FORMAT])
+        with col_download:
+            suffix = "_".join(f"{stem}{int(gain * 100)}" for stem, gain in spec.gains)
+            with open(mixed, "rb") as f:
+                st.download_button(
+                    label="⬇ Baixar Mix",
+                    data=f,
+                    file_name=f"{folder_path.name}_mix_{suffix}.{STEM_FORMAT}",
+                    mime=MIME_TYPES[STEM_FORMAT],
+                    on_click=jobs.get_job_queue().storage.touch,
+                    args=(folder_path.name, True),
+                    use_container_width=True
+                )
+
 def render_detail_view(folder_path):
     if not folder_path.exists():
+        jobs.get_job_queue().library.remove(folder_path.name)
         st.error("Pasta não encontrada.")
         if st.button("Voltar"):
             st.session_state.selected_music = None
             st.rerun()
         return
 
+    # último acesso para a cota de disco (faixas menos usadas saem primeiro)
+    jobs.get_job_queue().storage.touch(folder_path.name)
+
     col_back, col_title, col_delete = st.columns([0.1, 0.7, 0.2])
     
     with col_back:
@@ -426,52 +553,34 @@ def render_detail_view(folder_path):
     st.divider()
 
     stems_dict = {
-        "vocals": folder_path / "vocals.mp3",
-        "drums": folder_path / "drums.mp3",
-        "bass": folder_path / "bass.mp3",
-        "other": folder_path / "other.mp3"
+        "vocals": folder_path / f"vocals.{STEM_FORMAT}",
+        "drums": folder_path / f"drums.{STEM_FORMAT}",
+        "bass": folder_path / f"bass.{STEM_FORMAT}",
+        "other": folder_path / f"other.{STEM_FORMAT}"
     }
     
     if all(p.exists() for p in stems_dict.values()):
+        # os picos são gerados na publicação (ou por rebuild_library.py --picos);
+        # sem eles o player só não desenha as formas de onda
         st.markdown("#### 🎚️ Mixer Multifaixa")
-        components.html(get_stem_player_html(stems_dict), height=400)
+        components.html(get_stem_player_html(stems_dict), height=520)
     else:
         st.warning("⚠️ Arquivos de áudio não encontrados.")
 
     st.divider()
     
-    mixed = folder_path / "mixed_audio.mp3"
-    
-    if mixed.exists():
-        st.markdown("#### 💿 Mix Automático")
-        with st.container(border=True):
-            col_play, col_download = st.columns([0.7, 0.3])
-            
-            with col_play:
-                st.caption("🥁 Bateria + 🎸 Baixo")
-                st.audio(str(mixed), format="audio/mp3")
-            
-            with col_download:
-                st.write("")
-                st.write("")
-                with open(mixed, "rb") as f:
-                    st.download_button(
-                        label="⬇ Baixar Mix",
-                        data=f,
-                        file_name=f"{folder_path.name}_mix.mp3",
-                        mime="audio/mpeg",
-                        use_container_width=True
-                    )
+    if all(p.exists() for p in stems_dict.values()):
+        render_custom_mix(folder_path)
 
     st.divider()
     st.markdown("#### 📦 Faixas Individuais")
     
-    stem_list = ["vocals.mp3", "drums.mp3", "bass.mp3", "other.mp3"]
+    stem_list = [f"{stem}.{STEM_FORMAT}" for stem in ["vocals", "drums", "bass", "other"]]
     labels_pt = {
-        "vocals.mp3": ("🎤", "VOZ"), 
-        "drums.mp3": ("🥁", "BATERIA"), 
-        "bass.mp3": ("🎸", "BAIXO"), 
-        "other.mp3": ("🎹", "OUTROS")
+        f"vocals.{STEM_FORMAT}": ("🎤", "VOZ"), 
+        f"drums.{STEM_FORMAT}": ("🥁", "BATERIA"), 
+        f"bass.{STEM_FORMAT}": ("🎸", "BAIXO"), 
+        f"other.{STEM_FORMAT}": ("🎹", "OUTROS")
     }
     
     cols = st.columns(2)
@@ -488,16 +597,82 @@ def render_detail_view(folder_path):
                             label="⬇ Download",
                             data=f,
                             file_name=f"{folder_path.name}_{stem_name}",
-                            mime="audio/mpeg",
+                            mime=MIME_TYPES[STEM_FORMAT],
                             key=f"dl_{stem_name}_{folder_path.name}",
+                            on_click=jobs.get_job_queue().storage.touch,
+                            args=(folder_path.name, True),
                             use_container_width=True
                         )
 
+JOB_STAGES_PT = {
+    "download": "Baixando",
+    "separate": "Separando faixas",
+    "encode": "Codificando os stems",
+    "mix": "Criando mixagens",
+    "cleanup": "Finalizando",
+    "publish": "Publicando na biblioteca",
+    "cache": "Recuperando do cache",
+}
+
+@st.fragment(run_every="2s")
+def render_jobs_panel():
+    queue = jobs.get_job_queue()
+    session_jobs = [queue.status(job_id) for job_id in st.session_state.job_ids]
+    session_jobs = [job for job in session_jobs if job is not None]
+    if not session_jobs:
+        return
+
+    st.divider()
+    st.markdown("**Processamentos**")
+    needs_refresh = False
+
+    for job in reversed(session_jobs):
+        with st.container(border=True):
+            st.markdown(f"**{job.name}**")
+            if job.status == jobs.PENDING:
+                st.caption("⏳ Na fila")
+            elif job.status == jobs.RUNNING:
+                st.caption(f"⚙️ {JOB_STAGES_PT.get(job.stage, job.stage)}...")
+                if job.progress > 0:
+                    st.progress(min(job.progress, 1.0))
+                details = []
+                if job.eta is not None:
+                    minutes, seconds = divmod(int(job.eta), 60)
+                    details.append(f"~{minutes}min {seconds:02d}s restantes" if minutes else f"~{seconds}s restantes")
+                if job.speed:
+                    details.append(f"{job.speed:.1f}× tempo real")
+                if details:
+                    st.caption(" · ".join(details))
+            elif job.status == jobs.DONE and job.stage == "cache":
+                st.caption("⚡ Já processada, recuperada do cache")
+            elif job.status == jobs.DONE:
+                st.caption("✅ Processamento finalizado!")
+            elif job.status == jobs.CANCELLED:
+                st.caption("🚫 Cancelado")
+            else:
+                st.caption("❌ Erro no processamento")
+                with st.expander("Detalhes do erro"):
+                    st.code(job.error)
+
+            if not job.finished:
+                if st.button("Cancelar", key=f"cancel_{job.id}", use_container_width=True):
+                    queue.cancel(job.id)
+                    st.rerun(scope="fragment")
+            elif job.id not in st.session_state.jobs_seen:
+                st.session_state.jobs_seen.add(job.id)
+                needs_refresh = job.status == jobs.DONE
+
+    if needs_refresh:
+        st.rerun()
+
+if "jobs_seen" not in st.session_state:
+    st.session_state.jobs_seen = set()
+
 with st.sidebar:
     st.header("Mateus Sono IA")
     
-    if "processing" not in st.session_state:
-        st.session_state.processing = False
+    if "job_ids" not in st.session_state:
+        st.session_state.job_ids = []
     
     if "input_url_value" not in st.session_state:
         st.session_state.input_url_value = ""
@@ -520,51 +695,22 @@ with st.sidebar:
     
     st.write("") 
     
-    if st.session_state.processing:
-        st.button("⏳ Processando...", type="primary", disabled=True, use_container_width=True)
-        
-        input_url = st.session_state.input_url_value
-        input_name_user = st.session_state.input_name_value
-        
-        if input_url and input_name_user:
-            mp3_file, final_name = download_audio(input_url, input_name_user)
-            if mp3_file and mp3_file.exists():
-                success = process_demucs(mp3_file, final_name)
-                if success:
-                    st.success("Processamento finalizado!")
-                    st.session_state.processing = False
-                    st.session_state.input_url_value = ""
-                    st.session_state.input_name_value = ""
-                    st.rerun()
-                else:
-                    st.session_state.processing = False
-                    st.rerun()
-            else:
-                st.session_state.processing = False
-                st.rerun()
-    else:
-        if st.button("INICIAR PROCESSAMENTO", type="primary", use_container_width=True):
-            if not input_url:
-                st.warning("O campo URL é obrigatório.")
-            elif not input_name_user:
-                st.warning("Defina um nome para o projeto.")
-            else:
-                st.session_state.input_url_value = input_url
-                st.session_state.input_name_value = input_name_user
-                st.session_state.processing = True
-                st.rerun()
+    if st.button("INICIAR PROCESSAMENTO", type="primary", use_container_width=True):
+        if not input_url:
+            st.warning("O campo URL é obrigatório.")
+        elif not input_name_user:
+            st.warning("Defina um nome para o projeto.")
+        else:
+            job_id = jobs.get_job_queue().submit(input_url, input_name_user)
+            st.session_state.job_ids.append(job_id)
+            st.session_state.input_url_value = ""
+            st.session_state.input_name_value = ""
+            st.rerun()
 
-if SEPARATED_DIR.exists():
-    subfolders = sorted(
-        [f for f in SEPARATED_DIR.iterdir() if f.is_dir()],
-        key=lambda x: os.path.getmtime(x),
-        reverse=True
-    )
-else:
-    subfolders = []
+    render_jobs_panel()
 
 if st.session_state.selected_music:
     target_folder = SEPARATED_DIR / st.session_state.selected_music
     render_detail_view(target_folder)
 else:
-    render_list_view(subfolders)
\ No newline at end of file
+    render_list_view(jobs.get_job_queue().library, jobs.get_job_queue().storage)
\ No newline at end of file
@@ -1,11 +1,16 @@
 import streamlit as st
-import subprocess
-import requests
 import urllib.parse
 import sys
-import shutil
 from pathlib import Path
-from tqdm import tqdm
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.cache import ResultCache, cache_key
+from sound_ai.downloader import download_file
+from sound_ai.library import Library
+from sound_ai.mixer import mix_wav_files
+from sound_ai.separator import SeparationError, separate_file
+from sound_ai.wavio import WavError
+from sound_ai.workspace import Workspace, cleanup_orphans
 
 # --- CONFIGURAÇÕES INICIAIS ---
 st.set_page_config(page_title="Drum & Bass Extractor", page_icon="🥁")
@@ -19,61 +24,68 @@ DEMUCS_OUTPUT_DIR = SEPARATED_DIR / "htdemucs"
 # Garante que as pastas existam
 SRC_DIR.mkdir(exist_ok=True)
 
-def download_audio(url_youtube, progress_bar):
+# cada execução usa a sua área de trabalho; as de execuções interrompidas são apagadas
+WORKSPACE_DIR = SEPARATED_DIR / ".work"
+
+@st.cache_resource
+def init_workspaces():
+    # uma vez por processo do Streamlit, não a cada rerun
+    cleanup_orphans(WORKSPACE_DIR)
+
+@st.cache_resource
+def get_result_index():
+    # cache de resultados e índice da biblioteca, os mesmos do app principal
+    return ResultCache(DEMUCS_OUTPUT_DIR), Library(DEMUCS_OUTPUT_DIR)
+
+init_workspaces()
+
+def download_audio(url_youtube, progress_bar, workspace):
    
     try:
        
-       
-        filename = "temp_audio" 
-        output_path = SRC_DIR / f"{filename}.mp3"
+        # nome pelo id do vídeo: usuários diferentes não disputam o mesmo arquivo
+        filename = cache_key(url_youtube)
+        output_path = workspace.path / f"{filename}.mp3"
         
         encoded_url = urllib.parse.quote(url_youtube, "")
        
         api_url = f"https://www.clipto.com/api/youtube/mp3?url={encoded_url}&csrfToken=8crUK66l-IsnUGoga9wzUzPRRfb4Inx9MEIw"
         
-        r = requests.get(api_url, stream=True)
-        total_size = int(r.headers.get("content-length", 0))
+        def update_progress(downloaded, total_size):
+            if total_size:
+                progress_bar.progress(min(downloaded / total_size, 1.0))
+
+        download_file(api_url, output_path, on_progress=update_progress)
         
        
+        total_size = output_path.stat().st_size
         if total_size < 10000 and total_size > 0:
+             output_path.unlink()
              st.error("Erro no download: A API retornou um arquivo inválido. O link pode ser inválido ou o token expirou.")
              return None
-
-        downloaded = 0
-        with open(output_path, "wb") as f:
-            for chunk in r.iter_content(1024):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    progress_bar.progress(min(downloaded / total_size, 1.0))
         
         return output_path
     except Exception as e:
         st.error(f"Erro ao baixar: {e}")
         return None
 
-def run_demucs(input_path):
+def run_demucs(input_path, workspace):
    
     try:
        
-        cmd = ["demucs", str(input_path)]
-        
-       
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            st.error("Erro no Demucs:")
-            st.code(result.stderr)
-            return False
-        return True
+        # Modelo fica carregado no processo entre execuções (fallback: CLI do demucs)
+        return separate_file(input_path, workspace.out_root)
+    except SeparationError as e:
+        st.error("Erro no Demucs:")
+        st.code(str(e))
+        return None
     except Exception as e:
         st.error(f"Erro crítico ao executar Demucs: {e}")
-        return False
+        return None
 
-def mix_tracks(song_folder_name):
+def mix_tracks(track_dir):
    
    
-    track_dir = DEMUCS_OUTPUT_DIR / song_folder_name
     
     drums = track_dir / "drums.wav"
     bass = track_dir / "bass.wav"
@@ -83,19 +95,11 @@ def mix_tracks(song_folder_name):
         st.error(f"Arquivos separados não encontrados em: {track_dir}")
         return None
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", str(drums),
-        "-i", str(bass),
-        "-filter_complex", "amix=inputs=2:duration=longest",
-        str(output_mixed)
-    ]
-
     try:
-        subprocess.run(cmd, check=True, capture_output=True)
+        mix_wav_files([drums, bass], output_mixed)
         return output_mixed
-    except subprocess.CalledProcessError as e:
-        st.error("Erro no FFmpeg ao mixar as faixas.")
+    except WavError as e:
+        st.error(f"Erro ao mixar as faixas: {e}")
         return None
 
 # --- INTERFACE DO STREAMLIT ---
@@ -115,50 +119,48 @@ if st.button("🚀 Processar Áudio", type="primary"):
            
             st.write("⬇️ Baixando áudio do YouTube...")
             progress_bar = st.progress(0)
-            mp3_path = download_audio(youtube_url, progress_bar)
-            
-            if mp3_path:
-                st.write("✅ Download concluído!")
-                
-               
-                st.write("🧠 A IA (Demucs) está separando as faixas... (Isso pode demorar)")
-               
-                song_name = mp3_path.stem
-                potential_old_folder = DEMUCS_OUTPUT_DIR / song_name
-                if potential_old_folder.exists():
-                    shutil.rmtree(potential_old_folder)
-
-                success = run_demucs(mp3_path)
-                
-                if success:
-                    st.write("✅ Separação concluída!")
-                    
-                   
-                    st.write("🎛️ Mixando Bateria + Baixo...")
-                    final_file = mix_tracks(song_name)
-                    
-                    if final_file:
-                        status.update(label="Processo finalizado com sucesso!", state="complete", expanded=False)
-                        
-                        st.success("Tudo pronto! Ouça ou baixe abaixo.")
-                        
-                       
-                        st.audio(str(final_file), format="audio/wav")
-                        
-                       
-                        with open(final_file, "rb") as file:
-                            st.download_button(
-                                label="📥 Baixar Mix (WAV)",
-                                data=file,
-                                file_name="drums_bass_mix.wav",
-                                mime="audio/wav"
-                            )
+            with Workspace.create("app", WORKSPACE_DIR) as workspace:
+                mp3_path = download_audio(youtube_url, progress_bar, workspace)
+
+                if mp3_path:
+                    st.write("✅ Download concluído!")
+
+                    st.write("🧠 A IA (Demucs) está separando as faixas... (Isso pode demorar)")
+                    track_dir = run_demucs(mp3_path, workspace)
+
+                    if track_dir:
+                        st.write("✅ Separação concluída!")
+
+                        st.write("🎛️ Mixando Bateria + Baixo...")
+                        final_file = mix_tracks(track_dir)
+
+                        if final_file:
+                            # entra no cache e no índice como nos jobs: substitui só uma versão
+                            # anterior do mesmo vídeo, nunca a pasta de outro com o mesmo nome
+                            cache, library = get_result_index()
+                            published = cache.place(workspace, track_dir, track_dir.name,
+                                                    cache_key(youtube_url), youtube_url)
+                            library.update(published)
+                            final_file = published / final_file.name
+                            status.update(label="Processo finalizado com sucesso!", state="complete", expanded=False)
+
+                            st.success("Tudo pronto! Ouça ou baixe abaixo.")
+
+                            st.audio(str(final_file), format="audio/wav")
+
+                            with open(final_file, "rb") as file:
+                                st.download_button(
+                                    label="📥 Baixar Mix (WAV)",
+                                    data=file,
+                                    file_name="drums_bass_mix.wav",
+                                    mime="audio/wav"
+                                )
+                        else:
+                            status.update(label="Erro na mixagem", state="error")
                     else:
-                        status.update(label="Erro na mixagem", state="error")
+                        status.update(label="Erro na separação", state="error")
                 else:
-                    status.update(label="Erro na separação", state="error")
-            else:
-                status.update(label="Erro no download", state="error")
+                    status.update(label="Erro no download", state="error")
 
 # Rodapé com info de debug
 with st.expander("ℹ️ Informações do Sistema"):
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark do mixer NumPy contra o `amix` do FFmpeg, conferindo se as duas
+saídas são iguais (mesmo volume com e sem --gains)
+Uso: python src/scripts/bench_mix.py [--seconds 240] [--stems 3] [--runs 5] [--gains 1.0,0.5,0.8]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.mixer import mix_wav_files
+from sound_ai.wavio import WavReader, WavWriter
+
+SAMPLERATE = 44100
+# diferença máxima aceitável entre os engines (arredondamento para int16)
+MAX_DIFF = 1e-3
+
+
+def generate_stems(folder, seconds, count):
+    rng = np.random.default_rng(0)
+    paths = []
+    for idx in range(count):
+        path = folder / f"stem{idx}.wav"
+        # duração diferente por stem para exercitar duration=longest
+        frames = int(SAMPLERATE * seconds * (1.0 - 0.05 * idx))
+        with WavWriter(path, SAMPLERATE, 2) as writer:
+            for start in range(0, frames, SAMPLERATE * 10):
+                n = min(SAMPLERATE * 10, frames - start)
+                writer.write((rng.standard_normal((n, 2)) * 0.1).astype(np.float32))
+        paths.append(path)
+    return paths
+
+
+def run_numpy(inputs, output, gains=None):
+    mix_wav_files(inputs, output, gains=gains)
+
+
+def run_ffmpeg(inputs, output, gains=None):
+    cmd = ["ffmpeg", "-y", "-loglevel", "error"]
+    for path in inputs:
+        cmd.extend(["-i", str(path)])
+    amix = f"amix=inputs={len(inputs)}:duration=longest"
+    if gains:
+        amix += ":weights=" + " ".join(str(g) for g in gains)
+    cmd.extend(["-filter_complex", amix, str(output)])
+    subprocess.run(cmd, check=True)
+
+
+def bench(fn, inputs, output, runs, gains=None):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(inputs, output, gains)
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def frame_count(path):
+    reader = WavReader(path)
+    reader.close()
+    return reader.frames
+
+
+def compare(a, b, frames):
+    """
+    Diferença máxima por amostra e picos das duas saídas nos primeiros
+    `frames`. Depois que o stem mais curto acaba o amix sobe o volume aos
+    poucos (`dropout_transition`) e o mixer NumPy de uma vez.
+    """
+    ra, rb = WavReader(a), WavReader(b)
+    try:
+        frames = min(frames, ra.frames, rb.frames)
+        da, db = ra.read(0, frames), rb.read(0, frames)
+        return float(np.abs(da - db).max()), float(np.abs(da).max()), float(np.abs(db).max())
+    finally:
+        ra.close()
+        rb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do mixer NumPy x FFmpeg amix")
+    parser.add_argument("--seconds", type=float, default=240, help="Duração de cada stem")
+    parser.add_argument("--stems", type=int, default=3, help="Quantidade de stems")
+    parser.add_argument("--runs", type=int, default=5, help="Repetições por engine")
+    parser.add_argument("--gains", help="Ganho por stem, separados por vírgula")
+    args = parser.parse_args()
+    gains = [float(g) for g in args.gains.split(",")] if args.gains else None
+    if gains and len(gains) != args.stems:
+        parser.error("informe um ganho para cada stem")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        print(f"🎛️ Gerando {args.stems} stems de {args.seconds:.0f}s...")
+        inputs = generate_stems(folder, args.seconds, args.stems)
+
+        results = {"numpy": bench(run_numpy, inputs, folder / "numpy.wav", args.runs, gains)}
+        diff = None
+        try:
+            results["ffmpeg"] = bench(run_ffmpeg, inputs, folder / "ffmpeg.wav", args.runs, gains)
+            shortest = min(frame_count(path) for path in inputs)
+            diff = compare(folder / "numpy.wav", folder / "ffmpeg.wav", shortest)
+        except (FileNotFoundError, subprocess.CalledProcessError) as e:
+            print(f"⚠️ FFmpeg indisponível, pulando: {e}")
+
+    print(f"\n{'engine':<8} {'melhor':>10} {'média':>10} {'mixes/min':>10}")
+    for engine, (best, mean) in results.items():
+        print(f"{engine:<8} {best:>9.3f}s {mean:>9.3f}s {60 / mean:>10.1f}")
+    if "ffmpeg" in results:
+        print(f"\n⚡ NumPy {results['ffmpeg'][1] / results['numpy'][1]:.1f}x mais rápido (média)")
+    if diff is not None:
+        max_diff, peak_numpy, peak_ffmpeg = diff
+        ok = max_diff <= MAX_DIFF
+        print(f"{'✔' if ok else '❌'} diferença máxima entre os engines: {max_diff:.2e} "
+              f"(picos {peak_numpy:.3f} numpy, {peak_ffmpeg:.3f} ffmpeg)")
+        if not ok:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta do pipeline (download → separação → transcodificação → mixagem)
+Uso: python src/scripts/bench_pipeline.py [--lengths 30 120 300] [--runs 3] [-o bench.json]
+     python src/scripts/bench_pipeline.py --baseline bench-main.json
+     python src/scripts/bench_pipeline.py --compare bench-main.json bench.json
+
+Roda offline: o áudio é sintético e o download usa um servidor HTTP local.
+"""
+
+import argparse
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from mix_audio_cli import mix_audio_files
+from sound_ai import stem_server
+from sound_ai.benchmark import (
+    compare, environment, generate_stems, load_report, measure, median_result,
+    save_report, skipped,
+)
+from sound_ai.downloader import iter_download
+from sound_ai.media import iter_decode_stream
+from sound_ai.mixes import PRESETS, MixSpec, render_mix
+from sound_ai.pipeline import (
+    convert_to_mp3, download_audio, encode_stems, process_demucs, transcode_stems,
+)
+from sound_ai.separator import SAMPLERATE, engine_available
+from sound_ai.wavio import WavReader
+
+DEFAULT_LENGTHS = [30, 120, 300]
+
+
+def start_server(root):
+    # serve os MP3 sintéticos da raiz, fora do layout da biblioteca
+    server = stem_server.make_server(root, "127.0.0.1", 0, restrict=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def quiet(fn):
+    """mix_audio_files imprime o progresso; no benchmark só interessa o resultado."""
+    def wrapper(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def check(ok):
+    if not ok:
+        raise RuntimeError("a etapa retornou falha")
+
+
+def read_stems(paths):
+    stems = {}
+    for stem, path in paths.items():
+        reader = WavReader(path)
+        stems[stem] = np.ascontiguousarray(reader.read(0, reader.frames).T)
+        reader.close()
+    return stems
+
+
+def consume_stream(url):
+    for _ in iter_decode_stream(iter_download(url), SAMPLERATE, 2):
+        pass
+
+
+def render_presets(track_dir, folder):
+    """Renderiza as mixagens predefinidas da interface, como na primeira vez que são pedidas."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for idx, gains in enumerate(PRESETS.values()):
+        spec = MixSpec.create(gains)
+        sources = {stem: track_dir / f"{stem}.{spec.fmt}" for stem in spec.stems}
+        render_mix(sources, spec, folder / f"mix{idx}.{spec.fmt}")
+
+
+def bench_length(seconds, work, api_url, separation):
+    """Roda todas as etapas para uma faixa sintética de `seconds` segundos."""
+    name = f"bench_{int(seconds)}s"
+    synth = work / "synth" / name
+    stems, mixture = generate_stems(synth, seconds)
+    results = []
+
+    # WAV → MP3 (mesmo caminho usado para uploads/arquivos locais)
+    served = work / "served"
+    served.mkdir(exist_ok=True)
+    wav = served / f"{name}.wav"
+    shutil.copy(mixture, wav)
+    results.append(measure("convert_to_mp3", seconds, convert_to_mp3, wav))
+    mp3 = served / f"{name}.mp3"
+    if not mp3.exists():
+        return results
+
+    downloads = work / "downloads"
+    downloads.mkdir(exist_ok=True)
+    results.append(measure("download_audio", seconds, download_audio,
+                           mp3.name, name, downloads, api_url=api_url))
+    results.append(measure("download_decode_stream", seconds, consume_stream,
+                           api_url.format(url=mp3.name)))
+
+    if separation:
+        source = downloads / f"{name}_sep.mp3"
+        shutil.copy(mp3, source)
+        results.append(measure("process_demucs", seconds, process_demucs, source, work / "separated"))
+    else:
+        results.append(skipped("process_demucs", seconds, "torch/demucs indisponível ou --skip-separation"))
+
+    # caminho do CLI do demucs: stems WAV → formato final em uma passada do ffmpeg
+    # (as mixagens não são mais geradas aqui, ver render_mix)
+    target = work / "transcode" / name
+    target.mkdir(parents=True, exist_ok=True)
+    for stem, path in stems.items():
+        shutil.copy(path, target / path.name)
+    results.append(measure("transcode_stems", seconds, transcode_stems, target))
+
+    # mixagens sob demanda (amix) a partir dos stems codificados acima
+    results.append(measure("render_mix", seconds, render_presets, target, work / "mixes" / name))
+
+    # caminho do engine em processo: arrays → encoder via stdin
+    arrays = read_stems(stems)
+    results.append(measure("encode_stems", seconds, encode_stems,
+                           arrays, SAMPLERATE, work / "encoded" / name))
+    del arrays
+
+    inputs = [str(stems["drums"]), str(stems["bass"])]
+    results.append(measure("mix_audio_files[numpy]", seconds,
+                           lambda: check(quiet(mix_audio_files)(inputs, str(work / f"{name}_mix.wav"), engine="numpy"))))
+    results.append(measure("mix_audio_files[ffmpeg]", seconds,
+                           lambda: check(quiet(mix_audio_files)(inputs, str(work / f"{name}_mix.mp3"), engine="ffmpeg"))))
+
+    shutil.rmtree(work / "transcode" / name, ignore_errors=True)
+    shutil.rmtree(work / "mixes" / name, ignore_errors=True)
+    shutil.rmtree(work / "encoded" / name, ignore_errors=True)
+    for path in downloads.glob(f"{name}*"):
+        path.unlink()
+    return results
+
+
+def run(lengths, runs, separation):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="sound-ai-bench-") as tmp:
+        work = Path(tmp)
+        (work / "served").mkdir()
+        server = start_server(work / "served")
+        api_url = f"http://127.0.0.1:{server.server_address[1]}/{{url}}"
+        try:
+            for seconds in lengths:
+                print(f"🎛️ Faixa sintética de {seconds:.0f}s ({runs} execução(ões))...")
+                rounds = [bench_length(seconds, work, api_url, separation) for _ in range(runs)]
+                for stage_results in zip(*rounds):
+                    results.append(median_result(list(stage_results)))
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def format_bytes(n):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def print_results(results):
+    print(f"\n{'etapa':<24} {'dur':>6} {'parede':>9} {'cpu':>9} {'pico rss':>10} {'lido':>10} {'gravado':>10}")
+    for r in results:
+        if r["status"] != "ok":
+            print(f"{r['stage']:<24} {r['seconds']:>5.0f}s  {r['status']}: {r['error']}")
+            continue
+        print(f"{r['stage']:<24} {r['seconds']:>5.0f}s {r['wall']:>8.3f}s {r['cpu']:>8.3f}s "
+              f"{format_bytes(r['peak_rss']):>10} {format_bytes(r['read_bytes']):>10} "
+              f"{format_bytes(r['write_bytes']):>10}")
+
+
+def print_comparison(report, threshold):
+    print(f"\n📊 Comparação com a baseline (limite {threshold:.0%})")
+    for row in report.rows:
+        mark = "❌" if row.regression else "  "
+        if row.metric == "peak_rss":
+            values = f"{format_bytes(row.baseline):>10} → {format_bytes(row.current):>10}"
+        else:
+            values = f"{row.baseline:>9.3f}s → {row.current:>9.3f}s"
+        print(f"{mark} {row.stage:<24} {row.seconds:>5.0f}s {row.metric:<9} {values} ({row.change:+.1%})")
+    for stage, seconds in report.missing:
+        print(f"   {stage} ({seconds:.0f}s): sem dado na baseline")
+    if report.regressions:
+        print(f"\n❌ {len(report.regressions)} regressão(ões)")
+    else:
+        print("\n✅ Nenhuma regressão")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do pipeline")
+    parser.add_argument("--lengths", type=float, nargs="+", default=DEFAULT_LENGTHS,
+                        help="Durações das faixas sintéticas em segundos")
+    parser.add_argument("--runs", type=int, default=1, help="Repetições (usa a mediana)")
+    parser.add_argument("-o", "--output", default="bench-pipeline.json", help="Arquivo JSON de saída")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Piora relativa que conta como regressão (0.10 = 10%%)")
+    parser.add_argument("--skip-separation", action="store_true",
+                        help="Não roda o demucs (etapa mais lenta)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "ATUAL"),
+                        help="Só compara dois arquivos JSON, sem rodar o benchmark")
+    args = parser.parse_args()
+
+    if args.compare:
+        report = compare(load_report(args.compare[0]), load_report(args.compare[1]), args.threshold)
+        print_comparison(report, args.threshold)
+        sys.exit(1 if report.regressions else 0)
+
+    separation = not args.skip_separation and engine_available()
+    meta = environment()
+    meta.update(lengths=args.lengths, runs=args.runs, separation=separation)
+    results = run(args.lengths, max(1, args.runs), separation)
+    current = save_report(args.output, results, meta)
+    print_results(current["results"])
+    print(f"\n💾 Resultados em {args.output}")
+
+    if args.baseline:
+        report = compare(load_report(args.baseline), current, args.threshold)
+        print_comparison(report, args.threshold)
+        sys.exit(1 if report.regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
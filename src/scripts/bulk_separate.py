@@ -0,0 +1,58 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.bulk import BATCH_SIZE, BATCH_SEGMENT_SECONDS, run_bulk
+
+
+def ler_entradas(args):
+    entradas = list(args.entradas)
+    if args.lista:
+        with open(args.lista) as f:
+            entradas.extend(linha.strip() for linha in f if linha.strip() and not linha.startswith("#"))
+    return entradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Separação em lote (backfill de catálogo)")
+    parser.add_argument("entradas", nargs="*", help="Arquivos de áudio ou URLs do YouTube")
+    parser.add_argument("-l", "--lista", help="Arquivo com um caminho/URL por linha")
+    parser.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE,
+                        help="Trechos por chamada ao modelo")
+    parser.add_argument("-s", "--segmento", type=float, default=BATCH_SEGMENT_SECONDS,
+                        help="Duração de cada trecho em segundos")
+    args = parser.parse_args()
+
+    entradas = ler_entradas(args)
+    if not entradas:
+        parser.error("informe ao menos um arquivo/URL")
+
+    def ao_terminar(track):
+        # a faixa já está na biblioteca e no cache de resultados
+        if track.cached:
+            print(f"⚡ {track.name} já estava na biblioteca → {track.output_dir}")
+        else:
+            print(f"✔ {track.name} → {track.output_dir}")
+
+    print(f"🎧 Separando {len(entradas)} faixa(s) em lotes de {args.batch_size}...")
+    report = run_bulk(
+        entradas,
+        batch_size=args.batch_size,
+        segment_seconds=args.segmento,
+        on_track_done=ao_terminar,
+    )
+
+    for track in report.failed:
+        print(f"❌ {track.source}: {track.error}")
+
+    print(f"\n📊 {len(report.succeeded)}/{len(report.tracks)} faixas em {report.elapsed:.1f}s "
+          f"({report.batches} lotes)")
+    print(f"   {report.tracks_per_hour:.1f} faixas/hora · "
+          f"{report.realtime_factor:.2f}s de áudio por segundo")
+
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Orçamento de tempo de import (cold start) dos pontos de entrada
+Uso: python src/scripts/check_import_time.py [--runs 5] [--scale 1.0]
+
+Importa cada ponto de entrada em um interpretador novo com `-X importtime`,
+compara a mediana com o orçamento e confere que dependências pesadas
+(moviepy, torch/demucs, pytubefix, numpy, requests) não foram carregadas.
+Sai com código 1 se algum ponto de entrada estourar o orçamento. O mesmo
+orçamento é conferido por `tests/test_import_time.py` (pytest).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = SRC_DIR / "scripts"
+
+HEAVY = ["moviepy", "torch", "demucs", "pytubefix", "numpy", "requests"]
+
+# orçamento em ms do import (sem contar o próprio interpretador)
+ENTRY_POINTS = {
+    "cli.py": {"modules": ["cli"], "budget_ms": 60, "forbidden": HEAVY},
+    "mix_audio_cli.py": {"modules": ["mix_audio_cli"], "budget_ms": 60, "forbidden": HEAVY},
+    # o que o app Streamlit (src/main.py) importa do pacote
+    "main.py (sound_ai)": {
+        "modules": ["sound_ai.jobs", "sound_ai.stem_server"],
+        "budget_ms": 120,
+        "forbidden": HEAVY,
+    },
+}
+
+PROBE = """
+import json, sys
+sys.path[:0] = {paths!r}
+{imports}
+print(json.dumps(sorted(m for m in {forbidden!r} if m in sys.modules)))
+"""
+
+
+def parse_importtime(stderr: str, modules: list[str]) -> float:
+    """Soma o tempo cumulativo (ms) dos imports de primeiro nível pedidos."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        # imports de primeiro nível têm um único espaço de indentação
+        if name[:1] == " " and name[1:2] != " " and name.strip() in modules:
+            total += int(parts[1])
+    return total / 1000
+
+
+def measure(modules: list[str], forbidden: list[str]) -> tuple[float, list[str]]:
+    code = PROBE.format(
+        paths=[str(SRC_DIR), str(SCRIPTS_DIR)],
+        imports="\n".join(f"import {m}" for m in modules),
+        forbidden=forbidden,
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=SRC_DIR.parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr, modules), json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere o tempo de import dos pontos de entrada")
+    parser.add_argument("--runs", type=int, default=5, help="Execuções por ponto de entrada (usa a mediana)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplica os orçamentos (máquinas de CI mais lentas)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'ponto de entrada':<22} {'mediana':>9} {'orçamento':>10}")
+    for name, entry in ENTRY_POINTS.items():
+        budget = entry["budget_ms"] * args.scale
+        try:
+            runs = [measure(entry["modules"], entry["forbidden"]) for _ in range(max(1, args.runs))]
+        except RuntimeError as e:
+            print(f"❌ {name:<20} falhou ao importar: {e}")
+            failed = True
+            continue
+
+        median = statistics.median(ms for ms, _ in runs)
+        loaded = runs[-1][1]
+        ok = median <= budget and not loaded
+        failed |= not ok
+        print(f"{'✔' if ok else '❌'} {name:<20} {median:>7.1f}ms {budget:>8.0f}ms")
+        if loaded:
+            print(f"   dependências pesadas carregadas no import: {', '.join(loaded)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
 import argparse
-from pytubefix import YouTube
-from pytubefix.cli import on_progress
-import moviepy
+import contextlib
+import sys
+import urllib.parse
+from pathlib import Path
 import os
 
-def baixar_video(url, formato, output_dir="."):
-    yt = YouTube(url, on_progress_callback=on_progress)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.media import AUDIO_FORMATS, convert_audio
+from sound_ai.metrics import span
+
+# pytubefix é importado só no caminho que o usa: o CLI é chamado milhares de
+# vezes por jobs em lote
+
+def baixar_video(url, formato, output_dir=".", mostrar_progresso=True, limite=None):
+    """
+    Args:
+        limite: função(url_da_mídia) -> context manager em volta da transferência
+            (limite por host do `DownloadPool`)
+    """
+    from pytubefix import YouTube
+    from pytubefix.cli import on_progress
+
+    callback = on_progress if mostrar_progresso else None
+    yt = YouTube(url, on_progress_callback=callback)
 
     if formato == "mp4":
         stream = yt.streams.get_highest_resolution()
@@ -13,34 +30,124 @@ def baixar_video(url, formato, output_dir="."):
         stream = yt.streams.filter(only_audio=True).order_by('abr').desc().first()
 
     print(f"📥 Baixando: {yt.title} ({formato})")
-    arquivo = stream.download(output_path=output_dir)
+    # o host que conta é o servidor da mídia (googlevideo), não o youtube.com
+    with limite(stream.url) if limite else contextlib.nullcontext():
+        with span("download", url=url, format=formato) as current:
+            arquivo = stream.download(output_path=output_dir)
+            current.add_bytes(os.path.getsize(arquivo))
 
     if formato == "mp4":
         print("✔ Download finalizado (MP4).")
-        return
+        return arquivo
 
-    # Converter para áudio
+    # Converter para áudio: copia o stream quando o codec já serve para o
+    # formato, senão recodifica com bitrate próximo ao da origem
     print(f"🔄 Convertendo para {formato}...")
-    audio = moviepy.AudioFileClip(arquivo)
-    nome_base = os.path.splitext(arquivo)[0]
-    novo_arquivo = f"{nome_base}.{formato}"
+    with span("encode", format=formato) as current:
+        novo_arquivo, modo = convert_audio(arquivo, formato)
+        current.set(mode=modo)
+        current.add_bytes(os.path.getsize(novo_arquivo))
+
+    if str(novo_arquivo) != arquivo:
+        os.remove(arquivo)
+    acao = {"copy": "remuxado (sem recodificar)", "transcode": "convertido", "none": "já estava no formato"}[modo]
+    print(f"🎧 Arquivo {acao}: {novo_arquivo}")
+    return str(novo_arquivo)
+
+
+def eh_playlist(url):
+    parsed = urllib.parse.urlparse(url)
+    return parsed.path.rstrip("/").endswith("/playlist") and "list=" in parsed.query
+
+
+def expandir_urls(urls, arquivo=None):
+    """Junta URLs da linha de comando e do arquivo, expandindo playlists."""
+    entradas = list(urls)
+    if arquivo:
+        with open(arquivo) as f:
+            entradas.extend(linha.strip() for linha in f if linha.strip() and not linha.startswith("#"))
+
+    videos = []
+    for url in entradas:
+        if eh_playlist(url):
+            from pytubefix import Playlist
+
+            playlist = Playlist(url)
+            print(f"📃 Playlist: {playlist.title} ({len(playlist.video_urls)} vídeos)")
+            videos.extend(playlist.video_urls)
+        else:
+            videos.append(url)
+
+    # remove duplicadas mantendo a ordem
+    return list(dict.fromkeys(videos))
 
-    audio.write_audiofile(novo_arquivo, bitrate="320k")  # força 320kbps
-    audio.close()
 
-    os.remove(arquivo)
-    print(f"🎧 Arquivo convertido: {novo_arquivo}")
+def formatar_bytes(n):
+    for unidade in ["B", "KB", "MB", "GB"]:
+        if n < 1024 or unidade == "GB":
+            return f"{n:.1f} {unidade}"
+        n /= 1024
+
+
+def baixar_varios(urls, formato, output_dir=".", workers=4, por_host=2, tentativas=3):
+    from pytubefix.exceptions import RegexMatchError, VideoUnavailable
+
+    from sound_ai.download_pool import DownloadPool
+
+    # vídeo privado, removido, restrito ou URL inválida: não adianta tentar de novo
+    pool = DownloadPool(workers=workers, per_host=por_host, retries=tentativas,
+                        permanent=(VideoUnavailable, RegexMatchError))
+    mostrar_progresso = workers == 1
+
+    def baixar(url):
+        return baixar_video(url, formato, output_dir, mostrar_progresso=mostrar_progresso,
+                            limite=pool.host_slot)
+
+    def ao_terminar(resultado):
+        if resultado.ok:
+            print(f"✔ {Path(resultado.path).name} ({resultado.elapsed:.1f}s)")
+        else:
+            print(f"❌ {resultado.url}: {resultado.error}")
+
+    resumo = pool.run(urls, baixar, on_done=ao_terminar)
+
+    print("\n📊 Resumo")
+    print(f"   Sucesso: {len(resumo.succeeded)}/{len(resumo.results)}")
+    print(f"   Total: {formatar_bytes(resumo.total_bytes)} em {resumo.elapsed:.1f}s "
+          f"({formatar_bytes(resumo.throughput)}/s)")
+    if resumo.failed:
+        print("   Falhas:")
+        for resultado in resumo.failed:
+            print(f"   - {resultado.url} ({resultado.attempts} tentativas): {resultado.error}")
+    return resumo
 
 
 def main():
     parser = argparse.ArgumentParser(description="YouTube Downloader CLI")
-    parser.add_argument("url", help="URL do vídeo do YouTube")
-    parser.add_argument("--format", choices=["mp3", "mp4", "wav"], default="mp4",
+    parser.add_argument("url", nargs="*", help="URLs de vídeos ou playlists do YouTube")
+    parser.add_argument("--format", choices=["mp4", *AUDIO_FORMATS], default="mp4",
                         help="Formato de saída desejado")
+    parser.add_argument("-a", "--arquivo", help="Arquivo com uma URL por linha")
+    parser.add_argument("-o", "--saida", default=".", help="Pasta de destino")
+    parser.add_argument("-j", "--workers", type=int, default=4,
+                        help="Downloads simultâneos")
+    parser.add_argument("--por-host", type=int, default=2,
+                        help="Downloads simultâneos por host")
+    parser.add_argument("--tentativas", type=int, default=3,
+                        help="Novas tentativas por URL em caso de erro")
 
     args = parser.parse_args()
 
-    baixar_video(args.url, args.format)
+    urls = expandir_urls(args.url, args.arquivo)
+    if not urls:
+        parser.error("informe ao menos uma URL ou --arquivo")
+
+    if len(urls) == 1:
+        baixar_video(urls[0], args.format, args.saida)
+        return
+
+    resumo = baixar_varios(urls, args.format, args.saida, args.workers, args.por_host, args.tentativas)
+    sys.exit(1 if resumo.failed else 0)
 
 
 if __name__ == "__main__":
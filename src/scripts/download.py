@@ -1,15 +1,19 @@
-import requests, urllib.parse
+import sys, urllib.parse
+from pathlib import Path
 from tqdm import tqdm
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.downloader import download_file
+
 video="https://www.youtube.com/watch?v=kNJPalON82E&list=RDkNJPalON82E&start_radio=1"
 music_name="vanessa.mp3"
 
 url=urllib.parse.quote(video, "")
 clip=f"https://www.clipto.com/api/youtube/mp3?url={url}&csrfToken=8crUK66l-IsnUGoga9wzUzPRRfb4Inx9MEIw"
 
-r=requests.get(clip, stream=True)
-total=int(r.headers.get('content-length', 0))
+with tqdm(unit="B", unit_scale=True) as bar:
+    def progresso(baixado, total):
+        bar.total = total
+        bar.update(baixado - bar.n)
 
-with open(f"src/{music_name}", "wb") as f:
-    for chunk in tqdm(r.iter_content(1024), total=total//1024, unit="KB"):
-        f.write(chunk)
+    download_file(clip, Path("src") / music_name, on_progress=progresso)
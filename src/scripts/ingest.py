@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Ingestão em massa: baixa muitos vídeos com o backend assíncrono e separa cada
+um na fila de jobs assim que o download termina.
+Uso: python src/scripts/ingest.py URL [URL ...] [-l lista.txt] [-j 32] [--por-host 8]
+
+Cada linha da lista pode ter `URL nome da música`; sem nome, usa o id do vídeo.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.async_downloader import CONCURRENCY, PER_HOST, AsyncDownloader, ingest
+from sound_ai.cache import cache_key
+from sound_ai.config import QUEUE_MODE
+from sound_ai.jobs import DONE, JobQueue, get_job_queue
+
+
+def ler_entradas(args):
+    linhas = list(args.entradas)
+    if args.lista:
+        with open(args.lista) as f:
+            linhas.extend(linha.strip() for linha in f if linha.strip() and not linha.startswith("#"))
+
+    itens = []
+    for linha in linhas:
+        url, _, nome = linha.partition(" ")
+        itens.append((url, nome.strip() or cache_key(url)))
+    return list(dict.fromkeys(itens))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download assíncrono + separação em fila")
+    parser.add_argument("entradas", nargs="*", help="URLs do YouTube")
+    parser.add_argument("-l", "--lista", help="Arquivo com `URL [nome]` por linha")
+    parser.add_argument("-j", "--downloads", type=int, default=CONCURRENCY,
+                        help="Downloads simultâneos")
+    parser.add_argument("--por-host", type=int, default=PER_HOST,
+                        help="Conexões simultâneas por host")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Workers de separação (ignorado com SOUND_AI_QUEUE=shared)")
+    args = parser.parse_args()
+
+    itens = ler_entradas(args)
+    if not itens:
+        parser.error("informe ao menos uma URL ou --lista")
+
+    # no modo compartilhado os áudios vão para a inbox da fila e os workers separam
+    fila = get_job_queue() if QUEUE_MODE == "shared" else JobQueue(workers=args.workers)
+    downloader = AsyncDownloader(concurrency=args.downloads, per_host=args.por_host)
+
+    def ao_baixar(resultado):
+        if resultado.error:
+            print(f"❌ {resultado.url}: {resultado.error}")
+        elif resultado.path is None:
+            print(f"♻️ {resultado.name} (cache)")
+        else:
+            print(f"📥 {resultado.name} ({resultado.elapsed:.1f}s) → fila de separação")
+
+    inicio = time.perf_counter()
+    print(f"🌐 Baixando {len(itens)} vídeo(s), até {args.downloads} ao mesmo tempo...")
+    resultados = asyncio.run(ingest(itens, fila, fila.src_dir, downloader, on_done=ao_baixar))
+    print(f"   Downloads concluídos em {time.perf_counter() - inicio:.1f}s")
+
+    ids = [r.job_id for r in resultados if r.ok]
+    while not all(fila.status(job_id).finished for job_id in ids):
+        time.sleep(0.5)
+
+    falhas = [r for r in resultados if not r.ok]
+    for job_id in ids:
+        job = fila.status(job_id)
+        if job.status == DONE:
+            print(f"✔ {job.name} → {job.result}")
+        else:
+            print(f"❌ {job.name}: {job.status} {job.error.strip().splitlines()[-1] if job.error else ''}")
+            falhas.append(job)
+
+    print(f"\n📊 {len(itens) - len(falhas)}/{len(itens)} faixas em {time.perf_counter() - inicio:.1f}s")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
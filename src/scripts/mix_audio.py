@@ -1,9 +1,14 @@
 
-import subprocess
+import sys
 from pathlib import Path
-import requests, urllib.parse
+import urllib.parse
 from tqdm import tqdm
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.downloader import download_file
+from sound_ai.mixer import mix_wav_files
+from sound_ai.separator import SeparationError, separate_file
+
 
 music_name = "Coldplay"
 mp3_path = Path("src") / f"{music_name}.mp3"
@@ -16,16 +21,20 @@ url = urllib.parse.quote(video, "")
 clip = f"https://www.clipto.com/api/youtube/mp3?url={url}&csrfToken=8crUK66l-IsnUGoga9wzUzPRRfb4Inx9MEIw"
 
 print(f"⬇️ Baixando música em: {mp3_path}")
-r = requests.get(clip, stream=True)
-total = int(r.headers.get("content-length", 0))
+with tqdm(unit="B", unit_scale=True) as bar:
+    def progresso(baixado, total):
+        bar.total = total
+        bar.update(baixado - bar.n)
 
-with open(mp3_path, "wb") as f:
-    for chunk in tqdm(r.iter_content(1024), total=total//1024, unit="KB"):
-        f.write(chunk)
+    download_file(clip, mp3_path, on_progress=progresso)
 
 
 print(f"🎧 1. Rodando Demucs em: {mp3_path}")
-subprocess.run(["demucs", str(mp3_path)])
+try:
+    separate_file(mp3_path, Path("separated"))
+except SeparationError as e:
+    print(f"❌ ERRO no Demucs: {e}")
+    exit(1)
 
 
 separated_root = Path("separated")
@@ -53,12 +62,6 @@ if not drums.exists() or not bass.exists():
     exit(1)
 
 
-subprocess.run([
-    "ffmpeg", "-y",
-    "-i", str(drums),
-    "-i", str(bass),
-    "-filter_complex", "amix=inputs=2:duration=longest",
-    str(output_file)
-])
+mix_wav_files([drums, bass], output_file)
 
 print(f"✅ Finalizado: {output_file}")
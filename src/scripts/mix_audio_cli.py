@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Script para mixar stems de áudio usando FFmpeg
+Script para mixar stems de áudio (NumPy para WAV, FFmpeg para outros formatos)
 Uso: python mix_stems.py drums.wav bass.wav -o output.wav
 """
 
@@ -9,14 +9,25 @@ import sys
 import os
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.metrics import span
 
-def mix_audio_files(input_files, output_file):
+
+def choose_engine(input_files, output_file):
+    files = list(input_files) + [output_file]
+    return "numpy" if all(Path(f).suffix.lower() == ".wav" for f in files) else "ffmpeg"
+
+
+def mix_audio_files(input_files, output_file, gains=None, normalize=False, engine=None):
     """
-    Mixa múltiplos arquivos de áudio em um único arquivo usando FFmpeg
+    Mixa múltiplos arquivos de áudio em um único arquivo
     
     Args:
         input_files: Lista de caminhos dos arquivos de entrada
         output_file: Caminho do arquivo de saída
+        gains: Ganho linear de cada entrada (opcional)
+        normalize: Normaliza o pico da mixagem (apenas engine numpy)
+        engine: "numpy", "ffmpeg" ou None para escolher pela extensão
     """
    
     for file in input_files:
@@ -24,6 +35,29 @@ def mix_audio_files(input_files, output_file):
             print(f"❌ Erro: Arquivo não encontrado: {file}")
             return False
     
+    engine = engine or choose_engine(input_files, output_file)
+    num_inputs = len(input_files)
+    
+    print(f"🎵 Mixando {num_inputs} arquivo(s) ({engine})...")
+    print(f"   Entrada: {', '.join([Path(f).name for f in input_files])}")
+    print(f"   Saída: {Path(output_file).name}")
+    
+    if engine == "numpy":
+        # numpy só é carregado quando o mixer em processo é usado
+        from sound_ai.mixer import mix_wav_files
+        from sound_ai.wavio import WavError
+
+        try:
+            mix_wav_files(input_files, output_file, gains=gains, normalize=normalize)
+            print(f"✅ Sucesso! Arquivo salvo: {output_file}")
+            return True
+        except WavError as e:
+            print(f"❌ Erro ao mixar: {e}")
+            return False
+    
+    if normalize:
+        print("⚠️ --normalize só é suportado pelo engine numpy (entradas e saída WAV); ignorado.")
+    
    
     cmd = ["ffmpeg", "-y"] 
     
@@ -32,30 +66,29 @@ def mix_audio_files(input_files, output_file):
         cmd.extend(["-i", file])
     
    
-    num_inputs = len(input_files)
+    amix = f"amix=inputs={num_inputs}:duration=longest"
+    if gains:
+        amix += ":weights=" + " ".join(str(g) for g in gains)
     cmd.extend([
         "-filter_complex",
-        f"amix=inputs={num_inputs}:duration=longest",
+        amix,
         output_file
     ])
     
-    print(f"🎵 Mixando {num_inputs} arquivo(s)...")
-    print(f"   Entrada: {', '.join([Path(f).name for f in input_files])}")
-    print(f"   Saída: {Path(output_file).name}")
-    
     try:
        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with span("mix", engine="ffmpeg"):
+            subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                check=True
+            )
         print(f"✅ Sucesso! Arquivo salvo: {output_file}")
         return True
         
     except subprocess.CalledProcessError as e:
-        print(f"❌ Erro ao executar FFmpeg:")
+        print("❌ Erro ao executar FFmpeg:")
         print(e.stderr)
         return False
     except FileNotFoundError:
@@ -64,17 +97,41 @@ def mix_audio_files(input_files, output_file):
         return False
 
 
+def pop_option(args, name, has_value=True):
+    if name not in args:
+        return None
+    idx = args.index(name)
+    if not has_value:
+        args.pop(idx)
+        return True
+    if idx + 1 >= len(args):
+        print(f"❌ Erro: Especifique um valor após {name}")
+        sys.exit(1)
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    return value
+
+
 def main():
     if len(sys.argv) < 3:
-        print("Uso: python mix_stems.py <arquivo1> <arquivo2> [arquivo3...] -o <saída>")
+        print("Uso: python mix_stems.py <arquivo1> <arquivo2> [arquivo3...] -o <saída> "
+              "[--gains g1,g2,...] [--normalize] [--engine numpy|ffmpeg]")
         print("\nExemplos:")
         print("  python mix_stems.py drums.wav bass.wav -o drums_bass.wav")
         print("  python mix_stems.py drums.wav bass.wav other.wav -o instrumental.wav")
+        print("  python mix_stems.py drums.wav bass.wav -o mix.wav --gains 1.0,0.7 --normalize")
         sys.exit(1)
     
    
     args = sys.argv[1:]
     
+    gains = pop_option(args, "--gains")
+    normalize = bool(pop_option(args, "--normalize", has_value=False))
+    engine = pop_option(args, "--engine")
+    if engine not in (None, "numpy", "ffmpeg"):
+        print(f"❌ Erro: Engine inválido: {engine}")
+        sys.exit(1)
+    
    
     if "-o" in args:
         o_index = args.index("-o")
@@ -94,13 +151,23 @@ def main():
         print("❌ Erro: É necessário pelo menos 2 arquivos para mixar")
         sys.exit(1)
     
+    if gains:
+        try:
+            gains = [float(g) for g in gains.split(",")]
+        except ValueError:
+            print("❌ Erro: --gains deve ser uma lista de números separados por vírgula")
+            sys.exit(1)
+        if len(gains) != len(input_files):
+            print("❌ Erro: Informe um ganho para cada arquivo de entrada")
+            sys.exit(1)
+    
    
     output_dir = os.path.dirname(output_file)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
     
    
-    success = mix_audio_files(input_files, output_file)
+    success = mix_audio_files(input_files, output_file, gains=gains, normalize=normalize, engine=engine)
     
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,39 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.config import MODEL_NAME, SEPARATED_ROOT, STEM_FORMAT
+from sound_ai.library import Library
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói o índice da biblioteca a partir do disco")
+    parser.add_argument("-m", "--modelo", default=MODEL_NAME, help="Modelo (pasta em separated/)")
+    parser.add_argument("-d", "--pasta", default=str(SEPARATED_ROOT), help="Pasta raiz dos resultados")
+    parser.add_argument("--picos", action="store_true",
+                        help="Gera os picos da forma de onda que faltam (faixas antigas)")
+    args = parser.parse_args()
+
+    root = Path(args.pasta) / args.modelo
+    library = Library(root, args.modelo)
+
+    if args.picos:
+        from sound_ai.peaks import ensure_track_peaks
+
+        print(f"〰️ Gerando picos que faltam em {root}...")
+        created = 0
+        for folder in sorted(root.iterdir()) if root.exists() else []:
+            if folder.is_dir() and not folder.name.startswith("."):
+                created += len(ensure_track_peaks(folder, STEM_FORMAT))
+        print(f"✔ {created} arquivo(s) de picos gerados")
+
+    print(f"🔎 Indexando {root}...")
+    started = time.perf_counter()
+    total = library.rebuild()
+    print(f"✔ {total} música(s) indexadas em {time.perf_counter() - started:.1f}s → {library.db_path}")
+
+
+if __name__ == "__main__":
+    main()
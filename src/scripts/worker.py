@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Worker da fila compartilhada: processa os jobs enfileirados pelo app.
+Uso: SOUND_AI_QUEUE=shared python src/scripts/worker.py [-t 1] [--id nome]
+
+Rode quantos workers quiser, em containers do mesmo host que montem o mesmo volume
+`separated/` (a fila fica em `separated/.queue`, ou em SOUND_AI_QUEUE_DIR).
+Se um worker morrer, os jobs dele voltam para a fila quando a concessão vence.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sound_ai.shared_queue import LEASE_SECONDS, SharedJobQueue, SharedWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de separação da fila compartilhada")
+    parser.add_argument("-t", "--threads", type=int, default=1,
+                        help="Jobs simultâneos neste worker (um modelo carregado por thread)")
+    parser.add_argument("--id", help="Nome do worker (padrão: host-pid)")
+    args = parser.parse_args()
+
+    fila = SharedJobQueue()
+    worker = SharedWorker(fila, threads=args.threads, worker_id=args.id)
+    print(f"👷 Worker {worker.worker_id}: {args.threads} thread(s), fila em {fila.dir} "
+          f"(concessão de {LEASE_SECONDS:.0f}s)")
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
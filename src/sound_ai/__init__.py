@@ -0,0 +1 @@
+"""Núcleo de processamento do Mateus Sono IA (separação, mixagem e download)."""
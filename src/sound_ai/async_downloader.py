@@ -0,0 +1,424 @@
+"""
+Backend de download assíncrono (asyncio) para ingestão com muitas URLs.
+
+O backend síncrono (`downloader.download_file`) ocupa uma thread por
+transferência. Aqui uma única thread com um event loop conduz centenas de
+downloads: um semáforo global limita quantos rodam ao mesmo tempo, um pool de
+conexões keep-alive por host evita refazer TCP/TLS a cada arquivo e cada
+download tem o seu callback de progresso.
+
+O cliente HTTP/1.1 é implementado sobre `asyncio.open_connection` (sem
+dependências extras): redirecionamentos, `Transfer-Encoding: chunked` e
+retomada via `Range` do arquivo `.part`, como no backend síncrono.
+
+`ingest` liga o backend à fila de jobs: cada arquivo entra na fila de
+separação assim que termina de baixar.
+"""
+
+import asyncio
+import os
+import re
+import ssl
+import time
+import urllib.parse
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .downloader import RETRIES, DownloadError
+from .metrics import span
+
+CONCURRENCY = int(os.environ.get("SOUND_AI_ASYNC_DOWNLOADS", "32"))
+PER_HOST = int(os.environ.get("SOUND_AI_ASYNC_PER_HOST", "8"))
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+IDLE_TIMEOUT = 30
+CHUNK_SIZE = 256 << 10
+MAX_REDIRECTS = 5
+USER_AGENT = "sound-ai/0.1"
+
+REDIRECTS = (301, 302, 303, 307, 308)
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class HTTPStatusError(DownloadError):
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} em {url}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status >= 500 or self.status in (408, 429)
+
+
+class _StaleConnection(Exception):
+    """Conexão reaproveitada do pool que o servidor já tinha fechado."""
+
+
+@dataclass
+class _Connection:
+    key: tuple[str, str, int]
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    reused: bool = False
+    idle_since: float = 0.0
+
+    def close(self):
+        self.writer.close()
+
+
+class _Response:
+    def __init__(self, conn: _Connection, url: str, status: int, headers: dict[str, str],
+                 keep_alive: bool):
+        self.conn = conn
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.keep_alive = keep_alive
+        self.complete = False
+
+    @property
+    def length(self) -> int | None:
+        value = self.headers.get("content-length")
+        return int(value) if value and value.isdigit() else None
+
+    async def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
+        reader = self.conn.reader
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await _read(reader.readuntil(b"\r\n"))
+                size = int(line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # trailers até a linha vazia
+                    while (await _read(reader.readuntil(b"\r\n"))) != b"\r\n":
+                        pass
+                    break
+                while size:
+                    data = await _read(reader.read(min(size, chunk_size)))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b"", size)
+                    size -= len(data)
+                    yield data
+                await _read(reader.readexactly(2))
+        elif self.length is not None:
+            remaining = self.length
+            while remaining:
+                data = await _read(reader.read(min(remaining, chunk_size)))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                yield data
+        else:
+            # sem tamanho: o corpo termina quando o servidor fecha a conexão
+            self.keep_alive = False
+            while data := await _read(reader.read(chunk_size)):
+                yield data
+        self.complete = True
+
+
+async def _read(awaitable):
+    async with asyncio.timeout(READ_TIMEOUT):
+        return await awaitable
+
+
+class ConnectionPool:
+    """Conexões keep-alive por (esquema, host, porta), no máximo `per_host` por host."""
+
+    def __init__(self, per_host: int = PER_HOST):
+        self.per_host = max(1, per_host)
+        self._idle: dict[tuple, list[_Connection]] = {}
+        self._slots: dict[tuple, asyncio.Semaphore] = {}
+        self._ssl = None
+
+    def _ssl_context(self):
+        if self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        return self._ssl
+
+    def slot(self, key: tuple) -> asyncio.Semaphore:
+        if key not in self._slots:
+            self._slots[key] = asyncio.Semaphore(self.per_host)
+        return self._slots[key]
+
+    async def acquire(self, key: tuple) -> _Connection:
+        idle = self._idle.get(key, [])
+        now = time.monotonic()
+        while idle:
+            conn = idle.pop()
+            if now - conn.idle_since < IDLE_TIMEOUT and not conn.reader.at_eof():
+                conn.reused = True
+                return conn
+            conn.close()
+
+        scheme, host, port = key
+        async with asyncio.timeout(CONNECT_TIMEOUT):
+            reader, writer = await asyncio.open_connection(
+                host, port,
+                ssl=self._ssl_context() if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None,
+                limit=CHUNK_SIZE,
+            )
+        return _Connection(key, reader, writer)
+
+    def release(self, conn: _Connection, reusable: bool):
+        if reusable:
+            conn.idle_since = time.monotonic()
+            self._idle.setdefault(conn.key, []).append(conn)
+        else:
+            conn.close()
+
+    def discard(self, key: tuple):
+        for conn in self._idle.pop(key, []):
+            conn.close()
+
+    def close(self):
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+
+
+def _split_url(url: str) -> tuple[tuple[str, str, int], str, str]:
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise DownloadError(f"URL não suportada: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    host = parts.netloc.rsplit("@", 1)[-1]
+    return (parts.scheme, parts.hostname, port), host, target
+
+
+async def _send(conn: _Connection, url: str, host: str, target: str,
+                headers: dict[str, str]) -> _Response:
+    lines = [f"GET {target} HTTP/1.1", f"Host: {host}", f"User-Agent: {USER_AGENT}",
+             "Accept: */*", "Accept-Encoding: identity", "Connection: keep-alive"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    try:
+        await _read(conn.writer.drain())
+        head = await _read(conn.reader.readuntil(b"\r\n\r\n"))
+    except (asyncio.IncompleteReadError, ConnectionError) as e:
+        if conn.reused:
+            raise _StaleConnection() from e
+        raise
+    except asyncio.LimitOverrunError as e:
+        raise DownloadError("Cabeçalhos HTTP grandes demais") from e
+
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    try:
+        version, status = status_line.split(" ", 2)[:2]
+        status = int(status)
+    except ValueError:
+        raise DownloadError(f"Resposta HTTP inválida: {status_line[:100]!r}")
+    parsed = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            parsed[name.strip().lower()] = value.strip()
+    connection = parsed.get("connection", "").lower()
+    keep_alive = (version == "HTTP/1.1" and connection != "close") or connection == "keep-alive"
+    return _Response(conn, url, status, parsed, keep_alive)
+
+
+class AsyncDownloader:
+    """
+    Downloads concorrentes em um event loop.
+
+    Args:
+        concurrency: downloads simultâneos no total (semáforo global)
+        per_host: conexões simultâneas por host
+    """
+
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST,
+                 retries: int = RETRIES):
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.pool = ConnectionPool(per_host)
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # criado dentro do loop que vai usá-lo
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.close()
+
+    @asynccontextmanager
+    async def _get(self, url: str, headers: dict[str, str]):
+        """
+        GET seguindo redirecionamentos, com a conexão reservada durante o
+        bloco. Ela volta ao pool só se o corpo foi lido inteiro.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            key, host, target = _split_url(url)
+            async with self.pool.slot(key):
+                while True:
+                    conn = await self.pool.acquire(key)
+                    try:
+                        response = await _send(conn, url, host, target, headers)
+                        break
+                    except _StaleConnection:
+                        # as outras conexões ociosas do host provavelmente também caíram
+                        conn.close()
+                        self.pool.discard(key)
+                    except BaseException:
+                        conn.close()
+                        raise
+
+                if response.status in REDIRECTS and "location" in response.headers:
+                    # o corpo do redirecionamento é descartado com a conexão
+                    self.pool.release(conn, False)
+                    url = urllib.parse.urljoin(url, response.headers["location"])
+                    continue
+                try:
+                    yield response
+                finally:
+                    self.pool.release(conn, response.complete and response.keep_alive)
+                return
+        raise DownloadError(f"Redirecionamentos demais: {url}")
+
+    async def _fetch(self, url: str, part_path: Path, on_progress) -> int | None:
+        """Uma tentativa: continua `part_path` de onde parou. Retorna o tamanho total."""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with self._get(url, headers) as response:
+            content_range = _CONTENT_RANGE_RE.match(response.headers.get("content-range", ""))
+            if response.status == 416 and offset:
+                total = response.headers.get("content-range", "").rpartition("/")[2]
+                if total == str(offset):
+                    # o .part já tem o arquivo inteiro
+                    return offset
+                part_path.unlink()
+                raise DownloadError(f"Range recusado em {offset} bytes; recomeçando")
+            if response.status >= 400:
+                raise HTTPStatusError(response.status, response.url)
+
+            size = response.length
+            if response.status == 206 and content_range:
+                size = int(content_range.group(3)) if content_range.group(3) != "*" else None
+            elif offset:
+                # sem suporte a Range: recomeça do zero
+                offset = 0
+
+            done = offset
+            with open(part_path, "ab" if offset else "wb") as f:
+                async for chunk in response.iter_chunks():
+                    f.write(chunk)
+                    done += len(chunk)
+                    if on_progress:
+                        on_progress(done, size)
+            return size
+
+    async def download(self, url: str, dest: Path, on_progress=None) -> Path:
+        """
+        Baixa `url` para `dest` (via `<destino>.part` e rename atômico).
+
+        Args:
+            on_progress: callback(bytes_baixados, total_ou_None)
+        """
+        dest = Path(dest)
+        part_path = dest.with_name(dest.name + ".part")
+
+        async with self.semaphore:
+            with span("download", backend="asyncio") as current:
+                for attempt in range(self.retries + 1):
+                    try:
+                        size = await self._fetch(url, part_path, on_progress)
+                        actual = part_path.stat().st_size
+                        if size is not None and actual != size:
+                            raise DownloadError(f"Download incompleto: {actual} de {size} bytes")
+                        break
+                    except (OSError, TimeoutError, asyncio.IncompleteReadError, DownloadError) as e:
+                        if isinstance(e, HTTPStatusError) and not e.retryable:
+                            raise
+                        if attempt == self.retries:
+                            if isinstance(e, DownloadError):
+                                raise
+                            raise DownloadError(f"Erro no download: {type(e).__name__}: {e}") from e
+                    await asyncio.sleep(min(2 ** attempt, 10))
+
+                os.replace(part_path, dest)
+                current.add_bytes(dest.stat().st_size)
+        return dest
+
+
+@dataclass
+class IngestResult:
+    url: str
+    name: str
+    path: Path | None = None
+    job_id: str = ""
+    error: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.job_id) and not self.error
+
+
+async def ingest(items: list[tuple[str, str]], job_queue, dest_dir: Path,
+                 downloader: AsyncDownloader | None = None, on_progress=None,
+                 on_done=None, api_url: str | None = None) -> list[IngestResult]:
+    """
+    Baixa vários vídeos ao mesmo tempo e envia cada arquivo para a fila de
+    separação (`JobQueue.submit(..., input_path=...)`) assim que ele termina,
+    sem esperar os demais. Vídeos já no cache não são baixados.
+
+    A consulta ao cache e o `submit` (ffprobe, publicação, SQLite) rodam em
+    threads (`asyncio.to_thread`) para não travar os outros downloads. Uma
+    falha em um vídeo vira `IngestResult.error` e não interrompe o lote.
+
+    Args:
+        items: pares (URL do vídeo, nome da música)
+        on_progress: callback(url, bytes_baixados, total_ou_None)
+        on_done: callback(IngestResult) quando cada download termina
+    """
+    from .cache import cache_key
+    from .pipeline import API_URL, PipelineError, download_audio_async, sanitize_name
+
+    downloader = downloader or AsyncDownloader()
+
+    async def one(url: str, name: str) -> IngestResult:
+        result = IngestResult(url=url, name=name)
+        started = time.perf_counter()
+        try:
+            if await asyncio.to_thread(job_queue.cache.lookup, cache_key(url)) is None:
+                progress = (lambda done, total: on_progress(url, done, total)) if on_progress else None
+                # nome de arquivo único: o job renomeia a entrada na sua área de trabalho
+                result.path, _ = await download_audio_async(
+                    url, f".ingest-{uuid.uuid4().hex[:12]}", dest_dir, on_progress=progress,
+                    api_url=api_url or API_URL, downloader=downloader,
+                )
+            result.name = sanitize_name(name)
+            result.job_id = await asyncio.to_thread(job_queue.submit, url, result.name, input_path=result.path)
+        except PipelineError as e:
+            result.error = str(e)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}".rstrip(": ")
+        if result.error and result.path is not None:
+            # o arquivo baixado não entrou na fila
+            await asyncio.to_thread(result.path.unlink, missing_ok=True)
+        result.elapsed = time.perf_counter() - started
+        if on_done:
+            on_done(result)
+        return result
+
+    async with downloader:
+        outcomes = await asyncio.gather(*(one(url, name) for url, name in items), return_exceptions=True)
+    results = []
+    for (url, name), outcome in zip(items, outcomes):
+        if isinstance(outcome, BaseException):
+            # erro no callback `on_done`; o resultado do vídeo se perdeu com ele
+            outcome = IngestResult(url=url, name=name, error=f"{type(outcome).__name__}: {outcome}")
+        results.append(outcome)
+    return results
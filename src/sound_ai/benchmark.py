@@ -0,0 +1,287 @@
+"""
+Medição por etapa para o benchmark do pipeline (`scripts/bench_pipeline.py`).
+
+`measure` roda uma etapa e registra tempo de parede, CPU (do processo e dos
+filhos como ffmpeg/demucs), pico de RSS da árvore de processos e bytes lidos
+e gravados. Só usa `/proc` e `resource`, então funciona offline em Linux sem
+dependências extras. Também gera áudio sintético com stems conhecidos e
+compara resultados com uma baseline.
+"""
+
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from .wavio import WavWriter
+
+SAMPLERATE = 44100
+RSS_INTERVAL = 0.02
+SYNTH_STEMS = ["vocals", "drums", "bass", "other"]
+
+# métricas comparadas com a baseline e a variação mínima que conta como regressão
+COMPARED = {"wall": 0.05, "cpu": 0.05, "peak_rss": 8 << 20}
+
+
+@dataclass
+class StageResult:
+    stage: str
+    seconds: float
+    status: str = "ok"
+    error: str = ""
+    wall: float = 0.0
+    cpu_user: float = 0.0
+    cpu_system: float = 0.0
+    peak_rss: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    disk_read_bytes: int = 0
+    disk_write_bytes: int = 0
+
+    @property
+    def cpu(self) -> float:
+        return self.cpu_user + self.cpu_system
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["cpu"] = self.cpu
+        return data
+
+
+def _read_io() -> dict[str, int]:
+    """Contadores de E/S do processo (inclui filhos já finalizados)."""
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f)}
+    except OSError:
+        return {}
+
+
+def _rss_pages(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _descendants(root: int) -> list[int]:
+    parents: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # o nome do processo pode ter espaços: o ppid vem depois do ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    found, stack = [], [root]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def tree_rss() -> int:
+    """RSS em bytes deste processo somado ao de todos os descendentes."""
+    pids = [os.getpid()] + _descendants(os.getpid())
+    return sum(_rss_pages(pid) for pid in pids) * os.sysconf("SC_PAGE_SIZE")
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, interval: float = RSS_INTERVAL):
+        super().__init__(name="sound-ai-rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = tree_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, tree_rss())
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def measure(stage: str, seconds: float, fn, *args, **kwargs) -> StageResult:
+    """
+    Executa `fn(*args, **kwargs)` medindo a etapa. Exceções viram
+    `status="error"` em vez de interromper o benchmark.
+    """
+    result = StageResult(stage=stage, seconds=seconds)
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io_before = _read_io()
+    sampler = _RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        result.status = "error"
+        result.error = f"{type(e).__name__}: {e}"
+    result.wall = time.perf_counter() - started
+    result.peak_rss = sampler.stop()
+
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io_after = _read_io()
+    result.cpu_user = (self_after.ru_utime - self_before.ru_utime) + (children_after.ru_utime - children_before.ru_utime)
+    result.cpu_system = (self_after.ru_stime - self_before.ru_stime) + (children_after.ru_stime - children_before.ru_stime)
+
+    def io_delta(key):
+        return io_after.get(key, 0) - io_before.get(key, 0)
+
+    result.read_bytes = io_delta("rchar")
+    result.write_bytes = io_delta("wchar")
+    result.disk_read_bytes = io_delta("read_bytes")
+    result.disk_write_bytes = io_delta("write_bytes")
+    return result
+
+
+def skipped(stage: str, seconds: float, reason: str) -> StageResult:
+    return StageResult(stage=stage, seconds=seconds, status="skipped", error=reason)
+
+
+def median_result(results: list[StageResult]) -> StageResult:
+    """Mediana de cada métrica entre repetições da mesma etapa."""
+    ok = [r for r in results if r.status == "ok"]
+    if not ok:
+        return results[-1]
+    merged = StageResult(stage=ok[0].stage, seconds=ok[0].seconds)
+    for name in ("wall", "cpu_user", "cpu_system", "peak_rss", "read_bytes",
+                 "write_bytes", "disk_read_bytes", "disk_write_bytes"):
+        value = statistics.median(getattr(r, name) for r in ok)
+        setattr(merged, name, type(getattr(ok[0], name))(value))
+    return merged
+
+
+def generate_stems(folder: Path, seconds: float, samplerate: int = SAMPLERATE,
+                   seed: int = 0) -> tuple[dict[str, Path], Path]:
+    """
+    Gera stems sintéticos (voz, bateria, baixo, outros) em WAV e a mixagem
+    deles, para que o benchmark não dependa de rede nem de arquivos externos.
+
+    Returns:
+        ({stem: caminho}, caminho da mixagem)
+    """
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    frames = int(seconds * samplerate)
+    block = samplerate * 10
+    beat = samplerate // 2  # 120 bpm
+
+    paths = {stem: folder / f"{stem}.wav" for stem in SYNTH_STEMS}
+    mix_path = folder / "mixture.wav"
+    writers = {stem: WavWriter(path, samplerate, 2) for stem, path in paths.items()}
+    mix_writer = WavWriter(mix_path, samplerate, 2)
+    try:
+        for start in range(0, frames, block):
+            n = min(block, frames - start)
+            t = (start + np.arange(n)) / samplerate
+            pos = (start + np.arange(n)) % beat
+
+            note = 110 * 2 ** (((start + np.arange(n)) // (beat * 4) % 5) / 12)
+            bass = 0.3 * np.sin(2 * np.pi * note * t)
+            drums = 0.25 * rng.standard_normal(n) * np.exp(-pos / (samplerate * 0.05))
+            vocals = 0.2 * np.sin(2 * np.pi * (330 + 6 * np.sin(2 * np.pi * 5 * t)) * t) * (0.6 + 0.4 * np.sin(np.pi * t / 2) ** 2)
+            other = 0.1 * (np.sin(2 * np.pi * 261.6 * t) + np.sin(2 * np.pi * 329.6 * t) + np.sin(2 * np.pi * 392.0 * t)) / 3
+
+            signals = {"vocals": vocals, "drums": drums, "bass": bass, "other": other}
+            mix = np.zeros((n, 2), dtype=np.float32)
+            for idx, stem in enumerate(SYNTH_STEMS):
+                pan = 0.5 + 0.2 * (idx - 1.5) / 1.5
+                data = np.stack([signals[stem] * (1 - pan), signals[stem] * pan], axis=1).astype(np.float32)
+                writers[stem].write(data)
+                mix += data
+            mix_writer.write(mix)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        mix_writer.close()
+    return paths, mix_path
+
+
+def environment() -> dict:
+    try:
+        ffmpeg = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        ffmpeg = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg,
+        "created_at": time.time(),
+    }
+
+
+def save_report(path: Path, results: list[StageResult], meta: dict | None = None):
+    report = {"meta": meta or environment(), "results": [r.to_dict() for r in results]}
+    Path(path).write_text(json.dumps(report, indent=2))
+    return report
+
+
+def load_report(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+@dataclass
+class Comparison:
+    stage: str
+    seconds: float
+    metric: str
+    baseline: float
+    current: float
+    regression: bool = False
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline if self.baseline else 0.0
+
+
+@dataclass
+class ComparisonReport:
+    rows: list[Comparison] = field(default_factory=list)
+    missing: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def regressions(self) -> list[Comparison]:
+        return [row for row in self.rows if row.regression]
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> ComparisonReport:
+    """
+    Compara duas execuções etapa a etapa. Uma métrica regrediu quando piorou
+    mais que `threshold` (fração) e mais que o piso absoluto de `COMPARED`,
+    para que ruído em etapas de milissegundos não conte.
+    """
+    base = {(r["stage"], r["seconds"]): r for r in baseline["results"] if r["status"] == "ok"}
+    report = ComparisonReport()
+    for row in current["results"]:
+        key = (row["stage"], row["seconds"])
+        if row["status"] != "ok":
+            continue
+        if key not in base:
+            report.missing.append(key)
+            continue
+        for metric, floor in COMPARED.items():
+            old, new = base[key][metric], row[metric]
+            regression = new - old > max(old * threshold, floor)
+            report.rows.append(Comparison(row["stage"], row["seconds"], metric, old, new, regression))
+    return report
@@ -0,0 +1,229 @@
+"""
+Separação em lote para backfill de catálogo.
+
+Os trechos de várias faixas são agrupados em lotes e passam juntos pelo
+modelo, o que aproveita melhor CPUs com muitos núcleos do que uma chamada por
+faixa. Cada faixa é decodificada para PCM em disco na sua área de trabalho
+(como no modo segmentado, sem carregar a faixa inteira na memória), costurada
+em ordem com o mesmo crossfade e publicada na biblioteca pelo mesmo caminho
+dos jobs (`JobQueue.publish`): entra no cache de resultados e nunca
+sobrescreve a faixa de outro vídeo com o mesmo nome.
+
+Faixas que já estão no cache não são baixadas nem separadas de novo, e cada
+faixa reserva o seu espaço na cota (`StorageManager`) antes de ser decodificada.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from .config import SEPARATED_ROOT, SRC_DIR
+from .jobs import JobQueue
+from .media import MediaError, probe_duration
+from .pipeline import PipelineError, StemEncoder, download_audio, stem_order
+from .segmented import TrackStitcher, decode_to_raw, plan_segments
+from .separator import SeparationEngine
+from .storage import Reservation, StorageError, StorageManager
+from .workspace import Workspace
+
+BATCH_SIZE = int(os.environ.get("SOUND_AI_BATCH_SIZE", "8"))
+BATCH_SEGMENT_SECONDS = float(os.environ.get("SOUND_AI_BATCH_SEGMENT_SECONDS", "30"))
+BATCH_OVERLAP_SECONDS = 1.0
+
+
+@dataclass
+class BulkTrack:
+    source: str
+    name: str
+    key: str = ""
+    url: str = ""
+    input_path: Path | None = None
+    downloaded: bool = False
+    frames: int = 0
+    error: str = ""
+    output_dir: Path | None = None
+    # já estava na biblioteca (resultado do cache, nada foi separado)
+    cached: bool = False
+    workspace: Workspace | None = field(default=None, repr=False)
+    reservation: Reservation | None = field(default=None, repr=False)
+
+
+@dataclass
+class BulkReport:
+    tracks: list[BulkTrack] = field(default_factory=list)
+    elapsed: float = 0.0
+    audio_seconds: float = 0.0
+    batches: int = 0
+
+    @property
+    def succeeded(self) -> list[BulkTrack]:
+        return [t for t in self.tracks if not t.error and t.output_dir]
+
+    @property
+    def failed(self) -> list[BulkTrack]:
+        return [t for t in self.tracks if t.error]
+
+    @property
+    def tracks_per_hour(self) -> float:
+        return len(self.succeeded) * 3600 / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.audio_seconds / self.elapsed if self.elapsed else 0.0
+
+
+def resolve_inputs(items: list[str], src_dir: Path = SRC_DIR) -> list[BulkTrack]:
+    from .cache import cache_key
+
+    tracks = []
+    for item in items:
+        if item.startswith(("http://", "https://")):
+            key = cache_key(item)
+            tracks.append(BulkTrack(source=item, name=key, key=key, url=item))
+        else:
+            path = Path(item)
+            tracks.append(BulkTrack(source=item, name=path.stem, input_path=path))
+    return tracks
+
+
+def _staged_dir(track: BulkTrack, engine: SeparationEngine) -> Path:
+    return track.workspace.out_root / engine.model_name / track.name
+
+
+def _skip_cached(tracks: list[BulkTrack], queue: JobQueue, on_track_done=None) -> list[BulkTrack]:
+    """Resolve pelo cache as faixas já separadas; devolve as que faltam separar."""
+    from .cache import file_key
+
+    pending = []
+    for track in tracks:
+        try:
+            if not track.key:
+                track.key = file_key(track.input_path)
+        except OSError as e:
+            track.error = str(e)
+            continue
+        cached = queue.cache.lookup(track.key)
+        if cached is None:
+            pending.append(track)
+            continue
+        track.output_dir, track.name, track.cached = cached, cached.name, True
+        queue.storage.touch(cached.name)
+        if on_track_done:
+            on_track_done(track)
+    return pending
+
+
+def _release(track: BulkTrack, storage: StorageManager):
+    if track.reservation is not None:
+        storage.release(track.reservation)
+        track.reservation = None
+        # a estimativa pode ter ficado abaixo do que a faixa ocupou
+        storage.enforce()
+
+
+def _iter_segments(tracks, engine, segment, overlap, queue: JobQueue):
+    """Gera (faixa, stitcher, início, fim, trecho, norm) decodificando uma faixa por vez."""
+    samplerate, channels = engine.samplerate, engine.audio_channels
+    storage = queue.storage
+    for track in tracks:
+        try:
+            track.workspace = Workspace.create(track.name, queue.workspace_dir)
+            if track.input_path is None:
+                track.input_path, track.name = download_audio(track.source, track.name, track.workspace.path)
+                track.downloaded = True
+            # o PCM decodificado e os stems ocupam o mesmo volume da biblioteca
+            track.reservation = storage.reserve(
+                storage.estimate(probe_duration(track.input_path)), names=[track.name],
+            )
+            raw_path = track.workspace.path / "input.f32"
+            track.frames, norm = decode_to_raw(track.input_path, raw_path, samplerate, channels)
+        except (PipelineError, MediaError, StorageError, OSError) as e:
+            track.error = str(e)
+            _release(track, storage)
+            continue
+
+        segments = plan_segments(track.frames, segment, overlap)
+        if not segments:
+            track.error = "Áudio vazio"
+            _release(track, storage)
+            continue
+
+        audio = np.memmap(raw_path, dtype="<f4", mode="r", shape=(track.frames, channels))
+
+        def encoder_factory(names, ch, sr, target_dir=_staged_dir(track, engine)):
+            return StemEncoder(stem_order(names), ch, sr, target_dir)
+
+        stitcher = TrackStitcher(track.frames, overlap, encoder_factory, channels, samplerate)
+        for start, stop in segments:
+            # cópia do trecho: o PCM em disco é apagado com a área de trabalho
+            yield track, stitcher, start, stop, np.ascontiguousarray(audio[start:stop].T), norm
+        del audio
+
+
+def run_bulk(items: list[str], batch_size: int = BATCH_SIZE,
+             segment_seconds: float = BATCH_SEGMENT_SECONDS,
+             out_root: Path = SEPARATED_ROOT,
+             engine: SeparationEngine | None = None, on_track_done=None) -> BulkReport:
+    engine = engine or SeparationEngine()
+    # cache, biblioteca e áreas de trabalho da mesma saída que os jobs da interface
+    queue = JobQueue(out_root=out_root)
+    samplerate = engine.samplerate
+    segment = int(segment_seconds * samplerate)
+    overlap = int(BATCH_OVERLAP_SECONDS * samplerate)
+    sources = engine.sources
+
+    report = BulkReport(tracks=resolve_inputs(items))
+    started = time.perf_counter()
+    pending = _skip_cached(report.tracks, queue, on_track_done)
+
+    def flush(batch):
+        # trechos menores (final da faixa) são completados com silêncio
+        length = max(item[4].shape[1] for item in batch)
+        data = np.zeros((len(batch), engine.audio_channels, length), dtype=np.float32)
+        for idx, item in enumerate(batch):
+            data[idx, :, : item[4].shape[1]] = item[4]
+        results = engine.separate_batch(data, [item[5] for item in batch])
+        report.batches += 1
+
+        for (track, stitcher, start, stop, chunk, _), result in zip(batch, results):
+            if track.error:
+                continue
+            n = chunk.shape[1]
+            try:
+                stitcher.add(start, stop, {name: result[s, :, :n] for s, name in enumerate(sources)})
+                if stitcher.finished:
+                    stitcher.close()
+                    track.output_dir = queue.publish(
+                        track.workspace, _staged_dir(track, engine), track.key, track.url,
+                    )
+                    track.name = track.output_dir.name
+                    track.workspace.cleanup()
+                    _release(track, queue.storage)
+                    report.audio_seconds += track.frames / samplerate
+                    if on_track_done:
+                        on_track_done(track)
+            except (PipelineError, OSError) as e:
+                track.error = str(e)
+                stitcher.abort()
+
+    batch = []
+    try:
+        for item in _iter_segments(pending, engine, segment, overlap, queue):
+            batch.append(item)
+            if len(batch) == batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        # faixas com erro deixam a área de trabalho (e a reserva) para trás
+        for track in report.tracks:
+            if track.workspace is not None:
+                track.workspace.cleanup()
+            _release(track, queue.storage)
+
+    report.elapsed = time.perf_counter() - started
+    return report
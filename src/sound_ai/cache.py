@@ -0,0 +1,190 @@
+"""
+Cache de resultados indexado pelo ID do vídeo do YouTube (e pelo modelo).
+
+Cada pasta processada recebe um `track.json` com a chave de origem. Um pedido
+para um vídeo que já foi separado, mesmo com outro nome, reaproveita os stems
+e mixagens existentes (hardlinks, sem cópia) em vez de baixar e separar de novo. Toda
+pasta entra na biblioteca por `place`, que nunca sobrescreve a faixa de outro
+vídeo com o mesmo nome.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+from .config import MODEL_NAME, SEPARATED_DIR, STEM_FORMAT
+from .workspace import Workspace
+
+MANIFEST = "track.json"
+REQUIRED_FILES = [f"{stem}.{STEM_FORMAT}" for stem in ("vocals", "drums", "bass", "other")]
+
+_YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com")
+
+
+def extract_video_id(url: str) -> str | None:
+    parsed = urllib.parse.urlparse(url.strip())
+    host = parsed.netloc.lower()
+    path_parts = [p for p in parsed.path.split("/") if p]
+
+    if host in ("youtu.be", "www.youtu.be") and path_parts:
+        return path_parts[0]
+    if host in _YOUTUBE_HOSTS:
+        video_id = urllib.parse.parse_qs(parsed.query).get("v")
+        if video_id:
+            return video_id[0]
+        if len(path_parts) >= 2 and path_parts[0] in ("shorts", "embed", "live", "v"):
+            return path_parts[1]
+    return None
+
+
+def cache_key(url: str) -> str:
+    """ID canônico do vídeo; URLs que não são do YouTube usam um hash da URL."""
+    video_id = extract_video_id(url)
+    if video_id:
+        return video_id
+    return "url-" + hashlib.sha1(url.strip().encode()).hexdigest()[:16]
+
+
+def file_key(path: Path) -> str:
+    """Chave de um arquivo local (backfill): hash do conteúdo."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return "file-" + digest.hexdigest()[:16]
+
+
+def read_manifest(track_dir: Path) -> dict | None:
+    try:
+        return json.loads((track_dir / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(track_dir: Path, **data) -> dict:
+    manifest = read_manifest(track_dir) or {}
+    manifest.update(data)
+    tmp = track_dir / f".{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp, track_dir / MANIFEST)
+    return manifest
+
+
+class ResultCache:
+    def __init__(self, root: Path = SEPARATED_DIR, model: str = MODEL_NAME):
+        self.root = root
+        self.model = model
+        self._index: dict[str, set[str]] | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if not self.root.exists():
+            return
+        for folder in self.root.iterdir():
+            manifest = read_manifest(folder) if folder.is_dir() else None
+            if manifest and manifest.get("model") == self.model and manifest.get("key"):
+                self._index.setdefault(manifest["key"], set()).add(folder.name)
+
+    @staticmethod
+    def is_complete(track_dir: Path) -> bool:
+        return all((track_dir / f).exists() for f in REQUIRED_FILES)
+
+    def lookup(self, key: str, refresh: bool = False) -> Path | None:
+        """
+        Args:
+            refresh: relê os manifestos se não achar (resultados gravados por
+                outros processos, como os workers da fila compartilhada)
+        """
+        with self._lock:
+            self._ensure_index()
+            if refresh and key not in self._index:
+                self._index = None
+                self._ensure_index()
+            for name in sorted(self._index.get(key, ())):
+                folder = self.root / name
+                if self.is_complete(folder):
+                    return folder
+            return None
+
+    def store(self, key: str, track_dir: Path, url: str = "") -> None:
+        with self._lock:
+            self._ensure_index()
+            write_manifest(
+                track_dir, key=key, model=self.model, url=url,
+                name=track_dir.name, created_at=time.time(),
+            )
+            self._index.setdefault(key, set()).add(track_dir.name)
+
+    def forget(self, track_dir: Path) -> None:
+        with self._lock:
+            if self._index is None:
+                return
+            for names in self._index.values():
+                names.discard(track_dir.name)
+
+    def _candidates(self, name: str, key: str):
+        # o nome pedido; se outro vídeo já o usa, o nome com a chave e um contador
+        yield self.root / name
+        tagged = f"{name} [{key}]"
+        yield self.root / tagged
+        for n in itertools.count(2):
+            yield self.root / f"{tagged} {n}"
+
+    @staticmethod
+    def _usable(target: Path, key: str) -> bool:
+        """Nome livre ou ocupado pelo mesmo vídeo (uma versão anterior da faixa)."""
+        if not target.exists():
+            return True
+        return bool(key) and (read_manifest(target) or {}).get("key") == key
+
+    def place(self, workspace: Workspace, staged: Path, name: str, key: str, url: str = "") -> Path:
+        """
+        Publica a pasta `staged` da área de trabalho na biblioteca e registra a
+        chave. Uma pasta de outro vídeo com o mesmo nome nunca é substituída: a
+        faixa recebe o primeiro nome livre de `_candidates`.
+        """
+        for target in self._candidates(name, key):
+            if not self._usable(target, key):
+                continue
+            try:
+                workspace.publish(staged, target, replace=target.exists())
+            except FileExistsError:
+                continue  # outro job acabou de publicar com este nome
+            self.forget(target)
+            if key:
+                self.store(key, target, url)
+            return target
+
+    def publish(self, cached_dir: Path, name: str, workspace: Workspace) -> Path:
+        """
+        Disponibiliza um resultado em cache com outro nome na biblioteca. Os
+        hardlinks são montados na área de trabalho e publicados por `place`.
+        """
+        manifest = read_manifest(cached_dir) or {}
+        key = manifest.get("key", "")
+        for target in self._candidates(name, key):
+            if self._usable(target, key):
+                if target.exists() and target.resolve() == cached_dir.resolve():
+                    return target
+                break
+
+        staged = workspace.path / "cached" / name
+        staged.mkdir(parents=True)
+        for src in cached_dir.iterdir():
+            if not src.is_file() or src.name == MANIFEST:
+                continue
+            dst = staged / src.name
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+        return self.place(workspace, staged, name, key, manifest.get("url", ""))
@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+BASE_DIR = Path.cwd()
+SRC_DIR = BASE_DIR / "src"
+SEPARATED_ROOT = BASE_DIR / "separated"
+
+MODEL_NAME = os.environ.get("SOUND_AI_MODEL", "htdemucs")
+SEPARATED_DIR = SEPARATED_ROOT / MODEL_NAME
+
+# "cpu", "cuda" ou vazio para escolher automaticamente
+DEVICE = os.environ.get("SOUND_AI_DEVICE", "")
+
+# Formato final dos stems e mixagens: "mp3", "opus" ou "flac"
+STEM_FORMAT = os.environ.get("SOUND_AI_STEM_FORMAT", "mp3")
+
+# acima desta duração (segundos) a separação é feita em segmentos paralelos
+LONG_TRACK_SECONDS = float(os.environ.get("SOUND_AI_LONG_TRACK_SECONDS", "900"))
+
+# baixa e decodifica ao mesmo tempo, sem gravar o MP3 de origem em disco
+STREAM_DOWNLOADS = os.environ.get("SOUND_AI_STREAM_DOWNLOADS", "1") != "0"
+
+# logs JSON das etapas do pipeline: "-" para stderr, um caminho de arquivo ou vazio (desligado)
+TRACE_LOG = os.environ.get("SOUND_AI_TRACE_LOG", "")
+
+# espaço máximo das mixagens personalizadas em cache (as menos usadas são apagadas)
+MIX_CACHE_BYTES = int(float(os.environ.get("SOUND_AI_MIX_CACHE_MB", "2048")) * (1 << 20))
+
+# cota da biblioteca (stems + mixagens em cache); 0 = sem cota. Acima dela as
+# faixas menos acessadas são removidas
+STORAGE_QUOTA_BYTES = int(float(os.environ.get("SOUND_AI_STORAGE_QUOTA_GB", "0")) * (1 << 30))
+
+# espaço livre mínimo no disco que os jobs não podem consumir
+STORAGE_MIN_FREE_BYTES = int(float(os.environ.get("SOUND_AI_MIN_FREE_MB", "1024")) * (1 << 20))
+
+# "delete": remove faixas inteiras se preciso; "demote": só apaga mixagens e arquivos derivados
+STORAGE_EVICTION = os.environ.get("SOUND_AI_STORAGE_EVICTION", "delete")
+
+# "local": jobs rodam em threads do próprio app; "shared": o app só enfileira e
+# workers (`scripts/worker.py`, em containers do mesmo host com o mesmo volume)
+# processam. Veja as limitações do modo compartilhado em `shared_queue`
+QUEUE_MODE = os.environ.get("SOUND_AI_QUEUE", "local")
+QUEUE_DIR = Path(os.environ.get("SOUND_AI_QUEUE_DIR", SEPARATED_ROOT / ".queue"))
+
+# áreas de trabalho dos jobs; no mesmo volume da biblioteca para publicar com rename
+WORKSPACE_DIR = Path(os.environ.get("SOUND_AI_WORKSPACE_DIR", SEPARATED_ROOT / ".work"))
@@ -0,0 +1,149 @@
+"""
+Pool de downloads concorrentes com limite por host e novas tentativas.
+
+Usado pelo CLI para baixar playlists e listas de URLs: no máximo `workers`
+downloads ao mesmo tempo, no máximo `per_host` transferências por host, e
+falhas passageiras são repetidas com backoff exponencial.
+
+O limite por host vale para o host de onde a mídia é baixada, que só se
+conhece depois de resolver a URL enviada (todo item de playlist é
+`www.youtube.com`, mas a mídia vem de vários servidores `googlevideo.com`).
+Por isso a função de download pede a vaga com `host_slot(url_da_mídia)` em
+volta da transferência. Erros permanentes (vídeo privado, removido, 404) não
+são repetidos.
+"""
+
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# respostas HTTP que não mudam tentando de novo
+PERMANENT_HTTP_STATUS = (400, 401, 404, 410)
+
+
+class PermanentDownloadError(Exception):
+    """Falha que não adianta repetir (vídeo privado, removido, URL inválida)."""
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: Path | None = None
+    error: str = ""
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None and not self.error
+
+    @property
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size if self.path else 0
+        except OSError:
+            return 0
+
+
+@dataclass
+class DownloadSummary:
+    results: list[DownloadResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> list[DownloadResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> list[DownloadResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(r.size for r in self.succeeded)
+
+    @property
+    def throughput(self) -> float:
+        """Bytes por segundo no tempo total (wall clock)."""
+        return self.total_bytes / self.elapsed if self.elapsed else 0.0
+
+
+class DownloadPool:
+    def __init__(self, workers: int = 4, per_host: int = 2, retries: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 30.0, permanent: tuple = ()):
+        """
+        Args:
+            permanent: tipos de exceção que não são repetidos, além de
+                `PermanentDownloadError` e dos `PERMANENT_HTTP_STATUS`
+        """
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.permanent = (PermanentDownloadError, *permanent)
+        self._hosts: dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, url: str) -> threading.Semaphore:
+        """Vaga no limite por host de `url`; use com `with` em volta da transferência."""
+        host = urllib.parse.urlparse(url).hostname or ""
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.Semaphore(self.per_host)
+            return self._hosts[host]
+
+    def is_permanent(self, error: Exception) -> bool:
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code in PERMANENT_HTTP_STATUS
+        return isinstance(error, self.permanent)
+
+    def _delay(self, attempt: int) -> float:
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    def _run_one(self, url: str, download) -> DownloadResult:
+        result = DownloadResult(url=url)
+        started = time.perf_counter()
+        for attempt in range(1, self.retries + 2):
+            result.attempts = attempt
+            try:
+                result.path = Path(download(url))
+                result.error = ""
+                break
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                if self.is_permanent(e):
+                    break
+                if attempt <= self.retries:
+                    time.sleep(self._delay(attempt))
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def run(self, urls: list[str], download, on_done=None) -> DownloadSummary:
+        """
+        Baixa todas as URLs com `download(url) -> caminho do arquivo`. A
+        função deve fazer a transferência dentro de `host_slot(url_da_mídia)`.
+
+        Args:
+            on_done: callback(DownloadResult) chamado quando cada URL termina
+        """
+        summary = DownloadSummary()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._run_one, url, download) for url in urls]
+            for future in as_completed(futures):
+                result = future.result()
+                summary.results.append(result)
+                if on_done:
+                    on_done(result)
+        summary.elapsed = time.perf_counter() - started
+        order = {url: idx for idx, url in enumerate(urls)}
+        summary.results.sort(key=lambda r: order.get(r.url, 0))
+        return summary
@@ -0,0 +1,357 @@
+"""
+Download HTTP com sessão reaproveitada, retomada via `Range` e segmentos
+paralelos.
+
+O arquivo é baixado para `<destino>.part`. Um `<destino>.part.json` guarda o
+progresso de cada segmento, então uma conexão que cai (ou um processo que
+morre) continua de onde parou em vez de recomeçar. O estado só é retomado se
+for da mesma URL e o arquivo no servidor não mudou (tamanho, `ETag` e
+`Last-Modified`). No final o tamanho é
+conferido com o `content-length` e o arquivo é renomeado atomicamente.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .metrics import file_size, traced
+
+CHUNK_SIZE = 1 << 20
+SEGMENTS = int(os.environ.get("SOUND_AI_DOWNLOAD_SEGMENTS", "4"))
+MIN_SEGMENT_SIZE = 4 << 20
+RETRIES = 3
+TIMEOUT = (10, 60)
+STATE_FLUSH_BYTES = 4 << 20
+PROGRESS_INTERVAL = 0.25
+STREAM_CHUNK_SIZE = 64 << 10
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def get_session() -> "requests.Session":
+    """Sessão compartilhada (keep-alive e pool de conexões)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests só é carregado quando algo é baixado de fato
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _probe(session, url, timeout):
+    """
+    Descobre tamanho e suporte a Range com um GET de 1 byte.
+
+    Returns:
+        (url final após redirecionamentos, tamanho ou None, aceita Range,
+        {"etag", "last_modified"} do arquivo no servidor)
+    """
+    r = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+    try:
+        r.raise_for_status()
+        validators = {"etag": r.headers.get("ETag", ""), "last_modified": r.headers.get("Last-Modified", "")}
+        if r.status_code == 206:
+            match = _CONTENT_RANGE_RE.match(r.headers.get("Content-Range", ""))
+            if match and match.group(3) != "*":
+                return r.url, int(match.group(3)), True, validators
+            return r.url, None, False, validators
+        length = r.headers.get("Content-Length")
+        return r.url, int(length) if length else None, False, validators
+    finally:
+        r.close()
+
+
+def _retryable(error: Exception) -> bool:
+    """Respostas 4xx (fora 408 e 429) não mudam repetindo o pedido."""
+    response = getattr(error, "response", None)
+    status = response.status_code if response is not None else None
+    return status is None or status >= 500 or status in (408, 429)
+
+
+def _probe_with_retries(session, url, timeout, retries):
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            return _probe(session, url, timeout)
+        except requests.RequestException as e:
+            if attempt == retries or not _retryable(e):
+                raise DownloadError(f"Erro no download: {e}") from e
+        time.sleep(min(2 ** attempt, 10))
+
+
+class _State:
+    """Progresso dos segmentos persistido ao lado do arquivo parcial."""
+
+    def __init__(self, path: Path, url: str, size: int | None, segments: list[list[int]],
+                 source: str = "", validators: dict | None = None):
+        self.path = path
+        self.url = url
+        # URL pedida (a final pode mudar a cada redirecionamento) e validadores HTTP
+        self.source = source
+        self.validators = validators or {}
+        self.size = size
+        # cada segmento: [início, fim inclusivo, bytes já gravados]
+        self.segments = segments
+        self._lock = threading.Lock()
+        self._unflushed = 0
+
+    @classmethod
+    def load(cls, path: Path, source: str, size: int | None, validators: dict):
+        """O estado salvo, ou None se for de outra URL ou de outra versão do arquivo."""
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("source") != source or data.get("size") != size:
+            return None
+        saved = data.get("validators", {})
+        for name, value in validators.items():
+            # um validador que o servidor não mandou antes ou agora não é comparado
+            if value and saved.get(name) and saved[name] != value:
+                return None
+        return cls(path, data.get("url", ""), size, data["segments"], source, saved)
+
+    def advance(self, idx: int, n: int):
+        with self._lock:
+            self.segments[idx][2] += n
+            self._unflushed += n
+            if self._unflushed >= STATE_FLUSH_BYTES:
+                self._flush()
+
+    def _flush(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "url": self.url, "source": self.source, "validators": self.validators,
+            "size": self.size, "segments": self.segments,
+        }))
+        os.replace(tmp, self.path)
+        self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    @property
+    def downloaded(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+
+def _plan(size: int, segments: int) -> list[list[int]]:
+    count = max(1, min(segments, size // MIN_SEGMENT_SIZE))
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+def _fetch_segment(session, url, part_path, state, idx, timeout, retries, report):
+    import requests
+
+    start, end, _ = state.segments[idx]
+    for attempt in range(retries + 1):
+        offset = start + state.segments[idx][2]
+        if offset > end:
+            return
+        try:
+            headers = {"Range": f"bytes={offset}-{end}"}
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code != 206:
+                    raise DownloadError(f"Servidor ignorou Range (HTTP {r.status_code})")
+                with open(part_path, "r+b") as f:
+                    f.seek(offset)
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        chunk = chunk[: end - offset + 1]
+                        f.write(chunk)
+                        offset += len(chunk)
+                        state.advance(idx, len(chunk))
+                        report(len(chunk))
+                        if offset > end:
+                            break
+            if offset > end:
+                return
+        except (requests.RequestException, OSError) as e:
+            if attempt == retries:
+                raise DownloadError(f"Falha no segmento {idx}: {e}") from e
+        time.sleep(min(2 ** attempt, 10))
+    raise DownloadError(f"Segmento {idx} incompleto")
+
+
+def _fetch_stream(session, url, part_path, size, timeout, retries, report, validators=None):
+    """
+    Download sequencial; retoma com Range se o servidor permitir. Uma
+    passada que termina antes de `size` bytes conta como falha e é retomada.
+
+    Args:
+        report: callback(bytes no arquivo parcial), contando os que já estavam em disco
+        validators: `ETag`/`Last-Modified` da sondagem, enviados em `If-Range`
+            para o servidor mandar o arquivo inteiro se ele mudou
+    """
+    import requests
+
+    if_range = (validators or {}).get("etag") or (validators or {}).get("last_modified")
+    for attempt in range(retries + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        if offset and if_range:
+            headers["If-Range"] = if_range
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    # sem suporte a Range (ou o arquivo mudou): recomeça do zero
+                    offset = 0
+                mode = "ab" if offset else "wb"
+                done = offset
+                report(done)
+                with open(part_path, mode, buffering=CHUNK_SIZE) as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        if chunk:
+                            f.write(chunk)
+                            done += len(chunk)
+                            report(done)
+            if size is None or done >= size:
+                return
+            error = f"Download incompleto: {done} de {size} bytes"
+        except (requests.RequestException, OSError) as e:
+            error = f"Erro no download: {e}"
+        if attempt == retries:
+            raise DownloadError(error)
+        time.sleep(min(2 ** attempt, 10))
+
+
+@traced("download", bytes_of=file_size)
+def download_file(url: str, dest: Path, segments: int = SEGMENTS, timeout=TIMEOUT,
+                  retries: int = RETRIES, on_progress=None,
+                  session: "requests.Session | None" = None) -> Path:
+    """
+    Baixa `url` para `dest`.
+
+    Args:
+        segments: conexões paralelas para arquivos grandes com suporte a Range
+        on_progress: callback(bytes_baixados, total_ou_None)
+    """
+    dest = Path(dest)
+    part_path = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.json")
+    session = session or get_session()
+
+    final_url, size, ranges, validators = _probe_with_retries(session, url, timeout, retries)
+
+    lock = threading.Lock()
+    progress = [0]
+
+    def count(n):
+        with lock:
+            progress[0] += n
+
+    def report(done):
+        with lock:
+            progress[0] = done
+        if on_progress:
+            on_progress(done, size)
+
+    if ranges and size:
+        state = _State.load(state_path, url, size, validators) if part_path.exists() else None
+        if state is None:
+            state = _State(state_path, final_url, size, _plan(size, segments), url, validators)
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            state.flush()
+        progress[0] = state.downloaded
+
+        pending = [i for i, (s, e, done) in enumerate(state.segments) if s + done <= e]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                futures = [
+                    executor.submit(_fetch_segment, session, final_url, part_path, state, i,
+                                    timeout, retries, count)
+                    for i in pending
+                ]
+                # o progresso é reportado na thread chamadora (ex.: script do Streamlit)
+                while futures:
+                    _, not_done = wait(futures, timeout=PROGRESS_INTERVAL)
+                    if on_progress:
+                        on_progress(progress[0], size)
+                    for future in futures:
+                        if future.done():
+                            future.result()
+                    futures = list(not_done)
+        finally:
+            state.flush()
+        if state.downloaded != size:
+            raise DownloadError(f"Download incompleto: {state.downloaded} de {size} bytes")
+    else:
+        state_path.unlink(missing_ok=True)
+        if not ranges:
+            part_path.unlink(missing_ok=True)
+        _fetch_stream(session, final_url, part_path, size, timeout, retries, report, validators)
+
+    actual = part_path.stat().st_size
+    if size is not None and actual != size:
+        raise DownloadError(f"Download incompleto: {actual} de {size} bytes")
+
+    os.replace(part_path, dest)
+    state_path.unlink(missing_ok=True)
+    return dest
+
+
+def iter_download(url: str, timeout=TIMEOUT, retries: int = RETRIES, on_progress=None,
+                  session: "requests.Session | None" = None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Gera o corpo de `url` em blocos de bytes, sem gravar nada em disco.
+
+    Se a conexão cair no meio, a leitura continua do último byte recebido
+    com `Range` (quando o servidor aceita).
+
+    Args:
+        on_progress: callback(bytes_baixados, total_ou_None)
+    """
+    import requests
+
+    session = session or get_session()
+    offset = 0
+    size = None
+    for attempt in range(retries + 1):
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    raise DownloadError(f"Conexão interrompida em {offset} bytes e o servidor não aceita Range")
+                if size is None:
+                    length = r.headers.get("Content-Length")
+                    size = int(length) if length else None
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    offset += len(chunk)
+                    if on_progress:
+                        on_progress(offset, size)
+                    yield chunk
+            if size is None or offset >= size:
+                return
+            error = f"Download incompleto: {offset} de {size} bytes"
+        except requests.RequestException as e:
+            error = f"Erro no download: {e}"
+        if attempt == retries:
+            raise DownloadError(error)
+        time.sleep(min(2 ** attempt, 10))
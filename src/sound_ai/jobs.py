@@ -0,0 +1,362 @@
+"""
+Fila de jobs em background com um pool limitado de workers de separação.
+
+Os jobs rodam fora do ciclo de rerun do Streamlit: a interface só chama
+`submit`, consulta `status` periodicamente e pode pedir `cancel`. Cada worker
+mantém o seu próprio `SeparationEngine`, então o modelo é carregado uma vez por
+worker e o número de separações simultâneas nunca passa de `workers`.
+
+Cada job roda na sua própria área de trabalho (`workspace.Workspace`) e a
+faixa só entra na biblioteca, com um `rename`, depois de pronta.
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .cache import ResultCache, cache_key
+from .config import MODEL_NAME, QUEUE_MODE, SEPARATED_ROOT, SRC_DIR, STEM_FORMAT, STREAM_DOWNLOADS
+from .metrics import JOB_SECONDS, JOBS, JOBS_PENDING, QUEUE_WAIT, log_event, trace
+from .workspace import Workspace, check_same_filesystem, cleanup_orphans, workspace_root
+
+# biblioteca (sqlite3), armazenamento e pipeline (ffmpeg, downloads) são
+# importados só quando a fila é criada ou um job roda: o app importa este
+# módulo no começo de todo script (ver scripts/check_import_time.py)
+
+WORKERS = int(os.environ.get("SOUND_AI_WORKERS", "1"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    url: str
+    name: str
+    key: str = ""
+    input_path: Path | None = None
+    aliases: list[str] = field(default_factory=list)
+    status: str = PENDING
+    stage: str = ""
+    progress: float = 0.0
+    # segundos restantes e segundos de áudio por segundo, quando a etapa informa
+    eta: float | None = None
+    speed: float | None = None
+    error: str = ""
+    result: Path | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def set_stage(self, stage: str):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.stage = stage
+        self.progress = 0.0
+        self.eta = self.speed = None
+
+    def set_progress(self, fraction: float, eta: float | None = None, speed: float | None = None):
+        self.progress = fraction
+        self.eta = eta
+        self.speed = speed
+
+
+class JobQueue:
+    def __init__(self, workers: int = WORKERS, src_dir: Path = SRC_DIR,
+                 out_root: Path = SEPARATED_ROOT):
+        from .library import Library
+        from .storage import StorageManager
+
+        self.workers = max(1, workers)
+        self.src_dir = src_dir
+        self.out_root = out_root
+        self.cache = ResultCache(out_root / MODEL_NAME)
+        self.library = Library(out_root / MODEL_NAME)
+        self.storage = StorageManager(self.library, self.cache, self._mix_cache(out_root / MODEL_NAME))
+        # no mesmo volume da saída, para a publicação ser um rename
+        self.workspace_dir = workspace_root(out_root)
+        check_same_filesystem(self.workspace_dir, self.cache.root)
+        cleanup_orphans(self.workspace_dir)
+        self._queue = queue.Queue()
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    @staticmethod
+    def _mix_cache(root: Path):
+        from .mixes import MixCache, get_mix_cache
+
+        # a interface usa o cache compartilhado; outra raiz (scripts, testes) tem o seu
+        shared = get_mix_cache()
+        return shared if shared.root == root else MixCache(root)
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(
+                    target=self._worker,
+                    name=f"sound-ai-worker-{len(self._threads)}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, url: str, name: str, input_path: Path | None = None) -> str:
+        """
+        Enfileira um job. Vídeos já processados são resolvidos pelo cache, em
+        uma thread à parte, e pedidos simultâneos do mesmo vídeo viram um único job.
+
+        Args:
+            input_path: áudio já baixado (ex.: pelo backend assíncrono); o
+                job começa direto na separação
+        """
+        from .pipeline import sanitize_name
+
+        key = cache_key(url)
+        job = Job(id=uuid.uuid4().hex[:12], url=url, name=name, key=key, input_path=input_path)
+
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            if input_path is not None:
+                input_path.unlink(missing_ok=True)
+            job.status = RUNNING
+            job.stage = "cache"
+            job.started_at = time.time()
+            with self._lock:
+                self._jobs[job.id] = job
+            self._start_cached(job, cached)
+            return job.id
+
+        with self._lock:
+            for other in self._jobs.values():
+                if other.key == key and not other.finished:
+                    other.aliases.append(sanitize_name(name))
+                    if input_path is not None and input_path != other.input_path:
+                        input_path.unlink(missing_ok=True)
+                    return other.id
+            self._jobs[job.id] = job
+        self._queue.put(job.id)
+        JOBS_PENDING.set(self.pending_count())
+        self._ensure_workers()
+        return job.id
+
+    def status(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancela um job. Jobs pendentes nunca chegam a rodar; jobs em execução
+        param na próxima troca de etapa.
+        """
+        job = self.status(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.status == PENDING:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def pending_count(self) -> int:
+        return sum(1 for j in self.jobs() if j.status == PENDING)
+
+    def _start_cached(self, job: Job, cached: Path, on_finish=None):
+        # hardlinks, picos de resultados antigos e SQLite: nada disso roda no script do Streamlit
+        threading.Thread(
+            target=self._finish_cached, args=(job, cached, on_finish),
+            name=f"sound-ai-cache-{job.id}", daemon=True,
+        ).start()
+
+    def _finish_cached(self, job: Job, cached: Path, on_finish=None):
+        """Publica o resultado em cache com o nome pedido no job e o finaliza."""
+        from .pipeline import sanitize_name
+
+        try:
+            job.result = self._publish_cached(cached, sanitize_name(job.name))
+            job.name = job.result.name
+            job.status = DONE
+        except Exception:
+            job.status = FAILED
+            job.error = traceback.format_exc()
+        job.finished_at = time.time()
+        if on_finish is not None:
+            on_finish(job)
+        JOBS.inc(status="cache" if job.status == DONE else job.status)
+        log_event("job", job_id=job.id, key=job.key, status="cache" if job.status == DONE else job.status,
+                  name=job.name, error=job.error[-500:])
+
+    def _worker(self):
+        from .process import cancel_scope
+        from .separator import SeparationEngine
+
+        engine = SeparationEngine()
+        while True:
+            job_id = self._queue.get()
+            try:
+                job = self.status(job_id)
+                if job is None or job.status != PENDING:
+                    continue
+                # subprocessos (demucs, ffmpeg) são mortos assim que o job é cancelado
+                with trace(job_id=job.id, key=job.key), cancel_scope(job.cancel_event):
+                    self._run(job, engine)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job, engine):
+        from .media import probe_duration
+        from .pipeline import PipelineError, download_audio, process_demucs, process_stream, sanitize_name
+        from .process import ProcessCancelled
+        from .separator import engine_available
+        from .storage import StorageError
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        JOBS_PENDING.set(self.pending_count())
+        QUEUE_WAIT.observe(job.started_at - job.created_at)
+        workspace = None
+        reservation = None
+        try:
+            workspace = Workspace.create(job.id, self.workspace_dir)
+            mp3_path = job.input_path
+            if mp3_path is not None:
+                mp3_path = workspace.adopt(mp3_path, f"{sanitize_name(job.name)}.mp3")
+            duration = probe_duration(mp3_path) if mp3_path is not None else None
+            reservation = self.storage.reserve(
+                self.storage.estimate(duration), names=[sanitize_name(job.name), *job.aliases],
+            )
+            if mp3_path is not None:
+                staged = process_demucs(
+                    mp3_path, workspace.out_root, engine=engine,
+                    on_stage=job.set_stage, on_progress=job.set_progress,
+                )
+            elif STREAM_DOWNLOADS and engine_available():
+                staged = process_stream(
+                    job.url, job.name, workspace.out_root, engine=engine,
+                    on_stage=job.set_stage, on_progress=job.set_progress,
+                )
+            else:
+                job.set_stage("download")
+                mp3_path, _ = download_audio(
+                    job.url, job.name, workspace.path,
+                    on_progress=lambda done, total: total and job.set_progress(done / total),
+                )
+                staged = process_demucs(
+                    mp3_path, workspace.out_root, engine=engine,
+                    on_stage=job.set_stage, on_progress=job.set_progress,
+                )
+            job.set_stage("publish")
+            job.result = self.publish(workspace, staged, job.key, job.url)
+            job.name = job.result.name
+            for alias in job.aliases:
+                if alias != job.result.name:
+                    self._publish_cached(job.result, alias, workspace)
+            job.status = DONE
+        except (JobCancelled, ProcessCancelled):
+            job.status = CANCELLED
+        except (PipelineError, StorageError) as e:
+            job.status = FAILED
+            job.error = str(e)
+        except Exception:
+            job.status = FAILED
+            job.error = traceback.format_exc()
+        finally:
+            if workspace is not None:
+                workspace.cleanup()
+            if reservation is not None:
+                self.storage.release(reservation)
+                self.storage.enforce()
+            job.finished_at = time.time()
+            duration = job.finished_at - job.started_at
+            JOBS.inc(status=job.status)
+            JOB_SECONDS.observe(duration, status=job.status)
+            log_event("job", status=job.status, name=job.name, stage=job.stage,
+                      queue_wait=round(job.started_at - job.created_at, 3),
+                      duration=round(duration, 3), error=job.error[-500:])
+
+    def publish(self, workspace: Workspace, staged: Path, key: str, url: str = "") -> Path:
+        """
+        Publica a pasta de uma faixa separada em `workspace` na biblioteca:
+        cache de resultados (`key`), picos e índice. Só substitui uma versão
+        anterior do mesmo vídeo; outro vídeo com o mesmo nome é preservado.
+
+        Usado pelos jobs e por quem separa fora da fila (`bulk.run_bulk`).
+        """
+        # o player nunca calcula picos; os stems que vierem sem eles ganham aqui
+        self._ensure_peaks(staged)
+        target = self.cache.place(workspace, staged, staged.name, key, url)
+        if self.storage.mix_cache is not None:
+            # mixagens de uma versão anterior saíram com a pasta substituída
+            self.storage.mix_cache.forget(target)
+        self.library.update(target)
+        return target
+
+    @staticmethod
+    def _ensure_peaks(track_dir: Path):
+        from .media import MediaError
+        from .peaks import ensure_track_peaks
+
+        try:
+            ensure_track_peaks(track_dir, STEM_FORMAT)
+        except (MediaError, OSError, ValueError) as e:
+            # sem picos o player só não desenha as formas de onda
+            log_event("peaks", track=track_dir.name, status="error", error=str(e)[-500:])
+
+    def _publish_cached(self, cached: Path, name: str, workspace: Workspace | None = None) -> Path:
+        """Publica um resultado em cache com outro nome (`ResultCache.publish`)."""
+        if workspace is None:
+            with Workspace.create("publish", self.workspace_dir) as workspace:
+                return self._publish_cached(cached, name, workspace)
+        # resultados antigos, de antes dos arquivos de picos, ganham os seus uma vez
+        self._ensure_peaks(cached)
+        target = self.cache.publish(cached, name, workspace)
+        if target != cached and self.storage.mix_cache is not None:
+            self.storage.mix_cache.forget(target)
+        self.library.update(target)
+        return target
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Fila compartilhada do processo (todas as sessões do Streamlit). Com
+    `SOUND_AI_QUEUE=shared` é a fila em disco processada por `scripts/worker.py`.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            if QUEUE_MODE == "shared":
+                from .shared_queue import SharedJobQueue
+
+                _queue = SharedJobQueue()
+            else:
+                _queue = JobQueue()
+        return _queue
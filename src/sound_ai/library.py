@@ -0,0 +1,278 @@
+"""
+Índice da biblioteca ("Minhas Músicas") em SQLite.
+
+A lista da interface consulta este índice em vez de varrer
+`separated/<modelo>/` a cada rerun. O pipeline atualiza o índice quando uma
+faixa é gerada ou apagada; `rebuild` reconstrói tudo a partir do disco
+(pastas copiadas à mão, índice perdido, etc.).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .cache import read_manifest
+from .config import MODEL_NAME, SEPARATED_DIR, STEM_FORMAT
+from .media import probe_duration
+
+DB_NAME = "library.sqlite3"
+STEMS = ["vocals", "drums", "bass", "other"]
+PAGE_SIZE = 20
+
+SORTS = {
+    "recent": "updated_at DESC",
+    "oldest": "updated_at ASC",
+    "name": "name COLLATE NOCASE ASC",
+    "duration": "duration DESC",
+    "size": "size_bytes DESC",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    model TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source_key TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    stems TEXT NOT NULL DEFAULT '[]',
+    files TEXT NOT NULL DEFAULT '{}',
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, id)
+);
+CREATE INDEX IF NOT EXISTS tracks_updated ON tracks (model, updated_at);
+CREATE INDEX IF NOT EXISTS tracks_name ON tracks (model, name COLLATE NOCASE);
+"""
+
+
+@dataclass
+class TrackRecord:
+    id: str
+    name: str
+    model: str
+    source_key: str = ""
+    url: str = ""
+    stems: list[str] = field(default_factory=list)
+    files: dict[str, int] = field(default_factory=dict)
+    size_bytes: int = 0
+    duration: float = 0.0
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    accessed_at: float = 0.0
+
+    @property
+    def last_used(self) -> float:
+        return max(self.accessed_at, self.updated_at)
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "TrackRecord":
+        data = dict(row)
+        data["stems"] = json.loads(data["stems"])
+        data["files"] = json.loads(data["files"])
+        return cls(**data)
+
+
+def scan_track(track_dir: Path, model: str = MODEL_NAME, fmt: str = STEM_FORMAT) -> TrackRecord:
+    """Lê do disco os metadados de uma pasta processada."""
+    manifest = read_manifest(track_dir) or {}
+    files = {}
+    for path in track_dir.iterdir():
+        if path.is_file() and path.suffix == f".{fmt}":
+            files[path.name] = path.stat().st_size
+    stems = [stem for stem in STEMS if f"{stem}.{fmt}" in files]
+    duration = probe_duration(track_dir / f"{stems[0]}.{fmt}") if stems else 0.0
+    mtime = track_dir.stat().st_mtime
+    return TrackRecord(
+        id=track_dir.name,
+        name=manifest.get("name") or track_dir.name,
+        model=model,
+        source_key=manifest.get("key", ""),
+        url=manifest.get("url", ""),
+        stems=stems,
+        files=files,
+        size_bytes=sum(files.values()),
+        duration=duration,
+        created_at=manifest.get("created_at") or mtime,
+        updated_at=mtime,
+    )
+
+
+class Library:
+    def __init__(self, root: Path = SEPARATED_DIR, model: str = MODEL_NAME,
+                 db_path: Path | None = None):
+        # fora da pasta do modelo, que é servida pelo servidor de stems
+        self.root = root
+        self.db_path = Path(db_path) if db_path else root.parent / DB_NAME
+        self.model = model
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ensure(self):
+        """Cria o banco; na primeira vez, indexa o que já existe em disco."""
+        with self._lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._migrate(conn)
+                empty = conn.execute(
+                    "SELECT COUNT(*) FROM tracks WHERE model = ?", (self.model,)
+                ).fetchone()[0] == 0
+            self._ready = True
+        if empty:
+            self.rebuild()
+
+    @staticmethod
+    def _migrate(conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tracks)")}
+        if "accessed_at" not in columns:
+            conn.execute("ALTER TABLE tracks ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+
+    def _upsert(self, conn, record: TrackRecord):
+        conn.execute(
+            """
+            INSERT INTO tracks (model, id, name, source_key, url, stems, files,
+                                size_bytes, duration, created_at, updated_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (model, id) DO UPDATE SET
+                name = excluded.name, source_key = excluded.source_key,
+                url = excluded.url, stems = excluded.stems, files = excluded.files,
+                size_bytes = excluded.size_bytes, duration = excluded.duration,
+                created_at = excluded.created_at, updated_at = excluded.updated_at,
+                accessed_at = MAX(accessed_at, excluded.accessed_at)
+            """,
+            (record.model, record.id, record.name, record.source_key, record.url,
+             json.dumps(record.stems), json.dumps(record.files), record.size_bytes,
+             record.duration, record.created_at, record.updated_at, record.accessed_at),
+        )
+
+    def update(self, track_dir: Path, refresh: bool = True) -> TrackRecord | None:
+        """
+        Reindexa uma pasta (chamado pelo pipeline quando ela muda).
+
+        Args:
+            refresh: marca a faixa como atualizada agora; False em manutenção
+                (ex.: cota de disco) para não mudar a ordem LRU
+        """
+        self.ensure()
+        if not track_dir.is_dir():
+            self.remove(track_dir.name)
+            return None
+        record = scan_track(track_dir, self.model)
+        previous = None if refresh else self.get(track_dir.name)
+        if previous is not None:
+            record.updated_at = previous.updated_at
+        else:
+            record.updated_at = max(record.updated_at, time.time())
+        with self._connect() as conn:
+            self._upsert(conn, record)
+        return record
+
+    def remove(self, track_id: str):
+        self.ensure()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tracks WHERE model = ? AND id = ?", (self.model, track_id))
+
+    def touch(self, track_id: str, when: float | None = None):
+        """Registra um acesso (abrir a faixa, baixar um arquivo) para a ordem LRU."""
+        self.ensure()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tracks SET accessed_at = ? WHERE model = ? AND id = ?",
+                (when or time.time(), self.model, track_id),
+            )
+
+    def total_size(self) -> int:
+        self.ensure()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0) FROM tracks WHERE model = ?", (self.model,)
+            ).fetchone()[0]
+
+    def least_recently_used(self, limit: int = 100) -> list[TrackRecord]:
+        self.ensure()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM tracks WHERE model = ? ORDER BY MAX(accessed_at, updated_at), id LIMIT ?",
+                (self.model, limit),
+            ).fetchall()
+        return [TrackRecord.from_row(row) for row in rows]
+
+    def get(self, track_id: str) -> TrackRecord | None:
+        self.ensure()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM tracks WHERE model = ? AND id = ?", (self.model, track_id)
+            ).fetchone()
+        return TrackRecord.from_row(row) if row else None
+
+    def query(self, search: str = "", sort: str = "recent", limit: int = PAGE_SIZE,
+              offset: int = 0) -> tuple[list[TrackRecord], int]:
+        """
+        Uma página da biblioteca.
+
+        Returns:
+            (faixas da página, total de faixas que batem com a busca)
+        """
+        self.ensure()
+        where = "model = ?"
+        params: list = [self.model]
+        if search.strip():
+            pattern = "%" + search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where += " AND (name LIKE ? ESCAPE '\\' OR id LIKE ? ESCAPE '\\' OR url LIKE ? ESCAPE '\\')"
+            params += [pattern, pattern, pattern]
+        order = SORTS.get(sort, SORTS["recent"])
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM tracks WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM tracks WHERE {where} ORDER BY {order}, id LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [TrackRecord.from_row(row) for row in rows], total
+
+    def rebuild(self) -> int:
+        """Reconstrói o índice do modelo a partir das pastas em disco."""
+        with self._lock:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+                self._migrate(conn)
+            self._ready = True
+
+        records = []
+        if self.root.exists():
+            for folder in self.root.iterdir():
+                if folder.is_dir() and not folder.name.startswith("."):
+                    records.append(scan_track(folder, self.model))
+
+        with self._connect() as conn:
+            # o histórico de acesso (ordem LRU) não está no disco: preserva o do índice
+            accessed = dict(conn.execute(
+                "SELECT id, accessed_at FROM tracks WHERE model = ?", (self.model,)
+            ).fetchall())
+            conn.execute("DELETE FROM tracks WHERE model = ?", (self.model,))
+            for record in records:
+                record.accessed_at = accessed.get(record.id, 0.0)
+                self._upsert(conn, record)
+        return len(records)
+
@@ -0,0 +1,243 @@
+"""
+Utilitários de mídia sobre ffprobe/ffmpeg: inspeção, decodificação para PCM e
+conversão de áudio (cópia do stream quando possível, recodificação só quando
+o codec de origem não cabe no formato pedido).
+"""
+
+import json
+import subprocess
+import threading
+from pathlib import Path
+
+from .process import ProcessError, parse_ffmpeg_progress, run_process, with_progress
+
+DECODE_CHUNK_BYTES = 1 << 20
+
+LOSSY_BITRATES = [64, 96, 112, 128, 160, 192, 224, 256, 320]
+
+# formato de saída -> codecs que podem ser copiados sem recodificar e o
+# encoder usado quando é preciso recodificar
+AUDIO_FORMATS = {
+    "mp3": {"copy": {"mp3"}, "codec": "libmp3lame", "max_kbps": 320},
+    "m4a": {"copy": {"aac", "alac"}, "codec": "aac", "max_kbps": 256},
+    "opus": {"copy": {"opus"}, "codec": "libopus", "max_kbps": 256},
+    "flac": {"copy": {"flac"}, "codec": "flac"},
+    "wav": {"copy": {"pcm_s16le", "pcm_s24le", "pcm_f32le"}, "codec": "pcm_s16le"},
+}
+
+
+class MediaError(Exception):
+    def __init__(self, message: str, output: str = ""):
+        super().__init__(message)
+        self.output = output
+
+
+def probe(path: Path) -> dict:
+    """Saída JSON do ffprobe (format + streams)."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json",
+         "-show_format", "-show_streams", str(path)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise MediaError(f"ffprobe falhou para {path}", result.stderr)
+    return json.loads(result.stdout or "{}")
+
+
+def probe_duration(path: Path) -> float:
+    """Duração em segundos, ou 0.0 se não for possível descobrir."""
+    try:
+        return float(probe(path).get("format", {}).get("duration") or 0.0)
+    except (MediaError, OSError, ValueError):
+        return 0.0
+
+
+def audio_info(path: Path) -> dict:
+    """
+    Codec, bitrate (kbps), taxa de amostragem e canais do primeiro stream de
+    áudio. O bitrate vem do stream, do container ou do tamanho/duração.
+    """
+    data = probe(path)
+    streams = [s for s in data.get("streams", []) if s.get("codec_type") == "audio"]
+    if not streams:
+        raise MediaError(f"Nenhum stream de áudio em {path}")
+    stream = streams[0]
+    fmt = data.get("format", {})
+
+    bitrate = stream.get("bit_rate") or (fmt.get("bit_rate") if len(data.get("streams", [])) == 1 else None)
+    if not bitrate and fmt.get("duration") and fmt.get("size"):
+        bitrate = int(fmt["size"]) * 8 / float(fmt["duration"])
+    return {
+        "codec": stream.get("codec_name", ""),
+        "kbps": round(float(bitrate) / 1000) if bitrate else None,
+        "samplerate": int(stream.get("sample_rate") or 0),
+        "channels": int(stream.get("channels") or 0),
+    }
+
+
+def target_bitrate(source_kbps: int | None, max_kbps: int) -> int:
+    """Menor bitrate padrão que preserva a qualidade da origem, até `max_kbps`."""
+    if not source_kbps:
+        return max_kbps
+    for kbps in LOSSY_BITRATES:
+        if kbps >= source_kbps:
+            return min(kbps, max_kbps)
+    return max_kbps
+
+
+def audio_convert_cmd(source: Path, dest: Path, fmt: str, info: dict) -> tuple[list[str], str]:
+    """
+    Comando ffmpeg para levar o áudio de `source` para `fmt`.
+
+    Returns:
+        (comando, "copy" ou "transcode")
+    """
+    target = AUDIO_FORMATS[fmt]
+    cmd = ["ffmpeg", "-v", "error", "-nostdin", "-y", "-i", str(source),
+           "-map", "0:a:0", "-vn", "-map_metadata", "0"]
+
+    if info["codec"] in target["copy"]:
+        mode = "copy"
+        cmd += ["-c:a", "copy"]
+    else:
+        mode = "transcode"
+        cmd += ["-c:a", target["codec"]]
+        if "max_kbps" in target:
+            cmd += ["-b:a", f"{target_bitrate(info['kbps'], target['max_kbps'])}k"]
+    if fmt == "m4a":
+        cmd += ["-movflags", "+faststart"]
+    cmd.append(str(dest))
+    return cmd, mode
+
+
+def convert_audio(source: Path, fmt: str, dest: Path | None = None) -> tuple[Path, str]:
+    """
+    Converte o áudio de `source` para `fmt` direto com ffmpeg. Quando o codec
+    de origem já serve para o formato, o stream é copiado (remux); senão é
+    recodificado com bitrate próximo ao da origem, nunca acima de 320k.
+
+    Returns:
+        (arquivo de saída, "copy", "transcode" ou "none" se nada precisou mudar)
+    """
+    if fmt not in AUDIO_FORMATS:
+        raise MediaError(f"Formato de áudio não suportado: {fmt}")
+    source = Path(source)
+    dest = Path(dest) if dest else source.with_suffix(f".{fmt}")
+    info = audio_info(source)
+
+    if dest.resolve() == source.resolve():
+        if info["codec"] in AUDIO_FORMATS[fmt]["copy"]:
+            return source, "none"
+        dest = dest.with_name(f"{dest.stem}.converted.{fmt}")
+
+    cmd, mode = audio_convert_cmd(source, dest, fmt, info)
+    try:
+        run_process(with_progress(cmd), "convert", parse_ffmpeg_progress)
+    except ProcessError as e:
+        dest.unlink(missing_ok=True)
+        raise MediaError(f"ffmpeg não conseguiu converter {source} para {fmt}: {e}", e.output) from e
+    if not dest.exists() or dest.stat().st_size == 0:
+        dest.unlink(missing_ok=True)
+        raise MediaError(f"ffmpeg não conseguiu converter {source} para {fmt}")
+    return dest, mode
+
+
+def decode_cmd(source: str, samplerate: int, channels: int) -> list[str]:
+    return [
+        "ffmpeg", "-v", "error", "-nostdin",
+        "-i", source,
+        "-f", "f32le", "-acodec", "pcm_f32le",
+        "-ac", str(channels), "-ar", str(samplerate),
+        "pipe:1",
+    ]
+
+
+def _iter_pcm(proc, channels: int, chunk_bytes: int, label: str):
+    import numpy as np
+
+    frame_bytes = 4 * channels
+    chunk_bytes -= chunk_bytes % frame_bytes
+    pending = b""
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % frame_bytes
+            pending = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype="<f4").reshape(-1, channels)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read().decode(errors="replace")
+        proc.stderr.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise MediaError(f"ffmpeg não conseguiu decodificar {label}", stderr)
+
+
+def iter_decode(path: Path, samplerate: int, channels: int, chunk_bytes: int = DECODE_CHUNK_BYTES):
+    """
+    Decodifica `path` com ffmpeg e entrega blocos float32 (frames, canais)
+    conforme saem do pipe, sem guardar a faixa inteira na memória.
+    """
+    proc = subprocess.Popen(
+        decode_cmd(str(path), samplerate, channels),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    yield from _iter_pcm(proc, channels, chunk_bytes, str(path))
+
+
+def iter_decode_stream(chunks, samplerate: int, channels: int, chunk_bytes: int = DECODE_CHUNK_BYTES):
+    """
+    Como `iter_decode`, mas lendo os bytes comprimidos de um iterável (por
+    exemplo o corpo de uma resposta HTTP) pelo stdin do ffmpeg. Uma thread
+    alimenta o stdin enquanto o PCM já decodificado é entregue, então a
+    decodificação acompanha o download.
+
+    Erros do iterável (download interrompido, etc.) são relançados aqui.
+    """
+    proc = subprocess.Popen(
+        decode_cmd("pipe:0", samplerate, channels),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    errors = []
+    stop = threading.Event()
+
+    def feed():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, name="sound-ai-decode-feed", daemon=True)
+    feeder.start()
+    try:
+        yield from _iter_pcm(proc, channels, chunk_bytes, "stream")
+    except GeneratorExit:
+        stop.set()
+        raise
+    except MediaError:
+        # o ffmpeg costuma falhar por causa do download; esse erro é mais útil
+        feeder.join()
+        if errors:
+            raise errors[0]
+        raise
+    feeder.join()
+    if errors:
+        raise errors[0]
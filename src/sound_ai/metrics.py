@@ -0,0 +1,319 @@
+"""
+Instrumentação do pipeline: spans por etapa, métricas e logs JSON.
+
+Cada etapa (download, decode, separate, encode, mix, cleanup) roda dentro de
+`span(...)` ou de uma função decorada com `traced(...)`. Ao terminar, o span
+registra duração, bytes processados e o motivo da falha em histogramas e
+contadores e grava uma linha JSON no logger `sound_ai.trace`.
+
+As métricas ficam em memória no processo e são servidas pelo servidor de
+stems em `/metrics` (formato texto do Prometheus) e `/metrics.json` (p50/p95
+por etapa). Sem dependências externas.
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .config import TRACE_LOG
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+RESERVOIR_SIZE = 1024
+
+logger = logging.getLogger("sound_ai.trace")
+
+_context = contextvars.ContextVar("sound_ai_trace", default={})
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def items(self) -> list[tuple[tuple, float]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self) -> list[str]:
+        items = self.items()
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = _HistogramValue(self.buckets)
+            data.counts[bisect.bisect_left(self.buckets, value)] += 1
+            data.sum += value
+            data.count += 1
+            data.recent.append(value)
+
+    def summary(self) -> dict[tuple, dict]:
+        """Contagem, média e p50/p95/p99 das observações recentes por série."""
+        with self._lock:
+            items = [(key, data.count, data.sum, sorted(data.recent)) for key, data in self._values.items()]
+        result = {}
+        for key, count, total, recent in items:
+            def quantile(q):
+                return recent[min(len(recent) - 1, int(q * len(recent)))] if recent else 0.0
+            result[key] = {
+                "count": count,
+                "mean": total / count if count else 0.0,
+                "p50": quantile(0.50),
+                "p95": quantile(0.95),
+                "p99": quantile(0.99),
+            }
+        return result
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, list(d.counts), d.sum, d.count) for key, d in self._values.items())
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("sound_ai_stage_duration_seconds", "Duração de cada etapa do pipeline", ("stage", "status"))
+STAGE_BYTES = Counter("sound_ai_stage_bytes_total", "Bytes processados por etapa", ("stage",))
+STAGE_FAILURES = Counter("sound_ai_stage_failures_total", "Falhas por etapa e tipo de erro", ("stage", "reason"))
+STAGE_ACTIVE = Gauge("sound_ai_stage_active", "Etapas em execução agora (saturação)", ("stage",))
+QUEUE_WAIT = Histogram("sound_ai_job_queue_wait_seconds", "Tempo entre o envio do job e o início")
+JOB_SECONDS = Histogram("sound_ai_job_duration_seconds", "Duração total do job", ("status",))
+JOBS = Counter("sound_ai_jobs_total", "Jobs finalizados por status", ("status",))
+JOBS_PENDING = Gauge("sound_ai_jobs_pending", "Jobs aguardando um worker")
+STORAGE_USED = Gauge("sound_ai_storage_used_bytes", "Bytes ocupados pela biblioteca (stems e mixagens)")
+STORAGE_EVICTIONS = Counter("sound_ai_storage_evictions_total", "Faixas rebaixadas ou removidas pela cota", ("action",))
+STAGE_SPEED = Histogram("sound_ai_stage_speed_ratio", "Segundos de áudio processados por segundo nos subprocessos",
+                        ("stage",), buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250))
+PROCESS_KILLS = Counter("sound_ai_process_kills_total", "Subprocessos mortos (timeout, travado, cancelado)",
+                        ("stage", "reason"))
+
+REGISTRY = [STAGE_SECONDS, STAGE_BYTES, STAGE_FAILURES, STAGE_ACTIVE,
+            QUEUE_WAIT, JOB_SECONDS, JOBS, JOBS_PENDING, STORAGE_USED, STORAGE_EVICTIONS,
+            STAGE_SPEED, PROCESS_KILLS]
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """Resumo para `/metrics.json`: latência por etapa, falhas, fila e jobs."""
+    stages = {}
+    for (stage, status), data in STAGE_SECONDS.summary().items():
+        stages.setdefault(stage, {})[status] = data
+    for key, value in STAGE_ACTIVE.items():
+        stages.setdefault(key[0], {})["active"] = value
+    for key, value in STAGE_BYTES.items():
+        stages.setdefault(key[0], {})["bytes"] = value
+    for (stage,), data in STAGE_SPEED.summary().items():
+        stages.setdefault(stage, {})["speed"] = data
+    for (stage, reason), value in PROCESS_KILLS.items():
+        stages.setdefault(stage, {}).setdefault("killed", {})[reason] = value
+    failures = {}
+    for (stage, reason), value in STAGE_FAILURES.items():
+        failures.setdefault(stage, {})[reason] = value
+    return {
+        "stages": stages,
+        "failures": failures,
+        "queue_wait": QUEUE_WAIT.summary().get((), {}),
+        "jobs": {key[0]: value for key, value in JOBS.items()},
+        "jobs_pending": JOBS_PENDING.value(),
+    }
+
+
+def _configure_logger():
+    if logger.handlers or not TRACE_LOG:
+        return
+    if TRACE_LOG == "-":
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = logging.FileHandler(TRACE_LOG)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+_configure_logger()
+
+
+def log_event(event: str, **fields):
+    """Grava um evento estruturado (uma linha JSON) com o contexto atual."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    record = {"ts": round(time.time(), 3), "event": event, **_context.get(), **fields}
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def trace(**fields):
+    """Anexa campos (ex.: job_id) a todos os spans e eventos do bloco."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class Span:
+    def __init__(self, stage: str, fields: dict):
+        self.stage = stage
+        self.fields = fields
+        self.bytes = 0
+
+    def add_bytes(self, n: int):
+        self.bytes += n
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Mede uma etapa. Exceções são registradas (status "error" ou "cancelled"
+    para `JobCancelled`) e relançadas.
+    """
+    current = Span(stage, fields)
+    STAGE_ACTIVE.inc(stage=stage)
+    started = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        status = "cancelled" if type(e).__name__ in ("JobCancelled", "ProcessCancelled", "KeyboardInterrupt") else "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_ACTIVE.dec(stage=stage)
+        STAGE_SECONDS.observe(elapsed, stage=stage, status=status)
+        if current.bytes:
+            STAGE_BYTES.inc(current.bytes, stage=stage)
+        event = {"stage": stage, "status": status, "duration": round(elapsed, 4),
+                 "bytes": current.bytes, **current.fields}
+        if status == "error":
+            STAGE_FAILURES.inc(stage=stage, reason=type(error).__name__)
+            event["reason"] = type(error).__name__
+            event["error"] = str(error)[:500]
+        log_event("stage", **event)
+
+
+def traced(stage: str, bytes_of=None):
+    """
+    Decorador: roda a função dentro de `span(stage)`.
+
+    Args:
+        bytes_of: função opcional (resultado) -> bytes processados
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, function=fn.__qualname__) as current:
+                result = fn(*args, **kwargs)
+                if bytes_of is not None:
+                    try:
+                        current.add_bytes(int(bytes_of(result) or 0))
+                    except (OSError, TypeError, ValueError):
+                        pass
+                return result
+        return wrapper
+    return decorator
+
+
+def file_size(path) -> int:
+    """`bytes_of` para funções que retornam um caminho (ou uma tupla começando por ele)."""
+    if isinstance(path, tuple):
+        path = path[0]
+    if isinstance(path, list):
+        return sum(file_size(p) for p in path)
+    return path.stat().st_size if path is not None and hasattr(path, "stat") else 0
@@ -0,0 +1,97 @@
+"""
+Mixer de stems em NumPy, substituto do `amix` do FFmpeg para entradas WAV.
+
+As entradas são mapeadas em memória e somadas em blocos de tamanho fixo, então
+o consumo de memória não depende da duração das faixas. Segue a semântica de
+`amix=duration=longest`: a saída tem o tamanho da entrada mais longa e cada
+entrada é multiplicada por ganho / soma dos ganhos das entradas ainda ativas
+naquele ponto (com ganhos iguais, divide pelo número de entradas ativas).
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from .metrics import file_size, traced
+from .wavio import WavError, WavReader, WavWriter
+
+CHUNK_FRAMES = 1 << 16
+
+
+def _active_scale(lengths: np.ndarray, weights: np.ndarray, start: int, stop: int) -> np.ndarray:
+    # soma dos pesos das entradas ativas em cada amostra, como os `weights` do amix
+    positions = np.arange(start, stop)
+    weight_sum = ((lengths[:, None] > positions[None, :]) * weights[:, None]).sum(axis=0)
+    return (1.0 / np.where(weight_sum > 0, weight_sum, 1.0)).astype(np.float32)[:, None]
+
+
+def _mix_chunks(readers, gains, channels, total, amix_scale, chunk_frames):
+    lengths = np.array([r.frames for r in readers])
+    weights = np.abs(np.array(gains, dtype=np.float64))
+    for start in range(0, total, chunk_frames):
+        stop = min(start + chunk_frames, total)
+        out = np.zeros((stop - start, channels), dtype=np.float32)
+        for reader, gain in zip(readers, gains):
+            end = min(stop, reader.frames)
+            if end <= start:
+                continue
+            block = reader.read(start, end)
+            if gain != 1.0:
+                block = block * np.float32(gain)
+            # entradas mono são espalhadas em todos os canais
+            out[: end - start] += block
+        if amix_scale:
+            out *= _active_scale(lengths, weights, start, stop)
+        yield out
+
+
+@traced("mix", bytes_of=file_size)
+def mix_wav_files(input_files, output_file, gains=None, normalize=False,
+                  amix_scale=True, dtype="int16", chunk_frames=CHUNK_FRAMES) -> Path:
+    """
+    Mixa arquivos WAV em blocos, sem subprocessos.
+
+    Args:
+        input_files: caminhos dos WAVs de entrada (mesma taxa de amostragem)
+        output_file: WAV de saída
+        gains: ganho linear por entrada (padrão 1.0 para todas)
+        normalize: ajusta o pico da mixagem para 0 dBFS (faz duas passadas)
+        amix_scale: divide pela soma dos ganhos das entradas ativas, como o
+            `amix` com `weights`
+        dtype: "int16" ou "float32"
+    """
+    if not input_files:
+        raise WavError("Nenhum arquivo de entrada.")
+    gains = list(gains) if gains is not None else [1.0] * len(input_files)
+    if len(gains) != len(input_files):
+        raise WavError("Informe um ganho para cada arquivo de entrada.")
+
+    readers = [WavReader(Path(p)) for p in input_files]
+    try:
+        samplerate = readers[0].info.samplerate
+        if any(r.info.samplerate != samplerate for r in readers):
+            raise WavError("Todas as entradas precisam ter a mesma taxa de amostragem.")
+        channels = max(r.info.channels for r in readers)
+        if any(r.info.channels not in (1, channels) for r in readers):
+            raise WavError("Número de canais incompatível entre as entradas.")
+        total = max(r.frames for r in readers)
+
+        scale = 1.0
+        if normalize:
+            peak = 0.0
+            for block in _mix_chunks(readers, gains, channels, total, amix_scale, chunk_frames):
+                if len(block):
+                    peak = max(peak, float(np.abs(block).max()))
+            if peak > 0:
+                scale = 1.0 / peak
+
+        with WavWriter(Path(output_file), samplerate, channels, dtype) as writer:
+            for block in _mix_chunks(readers, gains, channels, total, amix_scale, chunk_frames):
+                if scale != 1.0:
+                    block *= np.float32(scale)
+                writer.write(block)
+    finally:
+        for reader in readers:
+            reader.close()
+
+    return Path(output_file)
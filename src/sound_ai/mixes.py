@@ -0,0 +1,238 @@
+"""
+Mixagens personalizadas de stems, renderizadas sob demanda e guardadas em cache.
+
+Nenhuma mixagem é gerada no pipeline: a interface pede um `MixSpec`
+(qualquer subconjunto de stems com ganho por stem) e `MixCache.render` chama
+o ffmpeg só na primeira vez. O resultado fica em `<faixa>/.mixes/<hash>.<fmt>`,
+onde o hash cobre a especificação e a versão dos stems de origem (com os
+picos da forma de onda em `<hash>.peaks`), e as mixagens menos usadas são
+apagadas quando o total passa de `MIX_CACHE_BYTES`.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import MIX_CACHE_BYTES, SEPARATED_DIR, STEM_FORMAT
+from .metrics import file_size, traced
+from .pipeline import CODECS
+from .process import ProcessError, parse_ffmpeg_progress, run_process, with_progress
+
+MIX_DIR = ".mixes"
+PEAKS_SUFFIX = ".peaks"
+STEMS = ["vocals", "drums", "bass", "other"]
+MAX_GAIN = 2.0
+
+# atalhos da interface: nome -> {stem: ganho}
+PRESETS = {
+    "Sem voz (instrumental)": {"drums": 1.0, "bass": 1.0, "other": 1.0},
+    "Bateria + Baixo": {"drums": 1.0, "bass": 1.0},
+    "Voz + Bateria + Baixo": {"vocals": 1.0, "drums": 1.0, "bass": 1.0},
+    "Sem bateria": {"vocals": 1.0, "bass": 1.0, "other": 1.0},
+    "Sem baixo": {"vocals": 1.0, "drums": 1.0, "other": 1.0},
+}
+
+
+class MixError(Exception):
+    def __init__(self, message: str, output: str = ""):
+        super().__init__(message)
+        self.output = output
+
+
+@dataclass(frozen=True)
+class MixSpec:
+    """Stems e ganhos lineares (1.0 = volume original) de uma mixagem."""
+    gains: tuple[tuple[str, float], ...]
+    fmt: str = STEM_FORMAT
+
+    @classmethod
+    def create(cls, gains: dict[str, float], fmt: str = STEM_FORMAT) -> "MixSpec":
+        # ordem fixa e ganhos arredondados: a mesma mixagem sempre gera o mesmo hash
+        items = []
+        for stem in STEMS + sorted(set(gains) - set(STEMS)):
+            gain = round(min(max(float(gains.get(stem, 0.0)), 0.0), MAX_GAIN), 2)
+            if gain > 0:
+                items.append((stem, gain))
+        if not items:
+            raise MixError("Selecione ao menos um stem.")
+        return cls(tuple(items), fmt)
+
+    @property
+    def stems(self) -> list[str]:
+        return [stem for stem, _ in self.gains]
+
+    def digest(self, sources: dict[str, Path]) -> str:
+        # a versão dos arquivos de origem entra no hash: stems refeitos geram outra mixagem
+        versions = {stem: [path.stat().st_mtime_ns, path.stat().st_size] for stem, path in sources.items()}
+        payload = json.dumps({"gains": self.gains, "fmt": self.fmt, "sources": versions}, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def build_mix_cmd(sources: dict[str, Path], spec: MixSpec, output: Path) -> list[str]:
+    """Soma os stems com os ganhos pedidos (`amix` sem normalização)."""
+    cmd = ["ffmpeg", "-y"]
+    for stem in spec.stems:
+        cmd.extend(["-i", str(sources[stem])])
+    weights = " ".join(f"{gain:g}" for _, gain in spec.gains)
+    if len(spec.gains) == 1:
+        graph = f"[0:a]volume={weights}[mix]"
+    else:
+        labels = "".join(f"[{idx}:a]" for idx in range(len(spec.gains)))
+        graph = f"{labels}amix=inputs={len(spec.gains)}:duration=longest:normalize=0:weights={weights}[mix]"
+    cmd.extend(["-filter_complex", graph, "-map", "[mix]", *CODECS[spec.fmt], str(output)])
+    return cmd
+
+
+@traced("mix", bytes_of=file_size)
+def render_mix(sources: dict[str, Path], spec: MixSpec, output: Path) -> Path:
+    tmp = output.with_name(f".{output.stem}.tmp{output.suffix}")
+    try:
+        # sem callback: só o timeout da etapa e a detecção de travamento
+        run_process(with_progress(build_mix_cmd(sources, spec, tmp)), "mix", parse_ffmpeg_progress)
+    except ProcessError as e:
+        tmp.unlink(missing_ok=True)
+        raise MixError(f"Erro no FFmpeg ao gerar a mixagem: {e}", e.output) from e
+    if not tmp.exists() or tmp.stat().st_size == 0:
+        tmp.unlink(missing_ok=True)
+        raise MixError("Erro no FFmpeg ao gerar a mixagem.")
+    os.replace(tmp, output)
+
+    from .peaks import compute_peaks
+
+    compute_peaks(output)
+    return output
+
+
+class MixCache:
+    """Cache LRU das mixagens de toda a biblioteca, limitado a `max_bytes`."""
+
+    def __init__(self, root: Path = SEPARATED_DIR, max_bytes: int = MIX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, int] | None = None
+        self._lock = threading.Lock()
+        self._rendering: dict[Path, threading.Lock] = {}
+
+    def _ensure_index(self):
+        if self._entries is not None:
+            return
+        found = []
+        if self.root.exists():
+            for path in self.root.glob(f"*/{MIX_DIR}/*"):
+                if path.is_file() and not path.name.startswith(".") and path.suffix != PEAKS_SUFFIX:
+                    stat = path.stat()
+                    found.append((stat.st_mtime, path, stat.st_size))
+        self._entries = OrderedDict((path, size) for _, path, size in sorted(found))
+
+    @staticmethod
+    def _sources(track_dir: Path, spec: MixSpec) -> dict[str, Path]:
+        sources = {stem: track_dir / f"{stem}.{spec.fmt}" for stem in spec.stems}
+        missing = [stem for stem, path in sources.items() if not path.exists()]
+        if missing:
+            raise MixError(f"Stems não encontrados: {', '.join(missing)}")
+        return sources
+
+    def path_for(self, track_dir: Path, spec: MixSpec) -> Path:
+        digest = spec.digest(self._sources(track_dir, spec))
+        return track_dir / MIX_DIR / f"{digest}.{spec.fmt}"
+
+    def _touch(self, path: Path):
+        # o mtime guarda o último acesso, para a ordem LRU sobreviver a reinícios
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._entries.move_to_end(path)
+
+    def lookup(self, track_dir: Path, spec: MixSpec) -> Path | None:
+        """Mixagem já renderizada, sem gerar nada."""
+        if spec.gains == ((spec.stems[0], 1.0),):
+            return self._sources(track_dir, spec)[spec.stems[0]]
+        path = self.path_for(track_dir, spec)
+        with self._lock:
+            self._ensure_index()
+            if not path.exists():
+                self._entries.pop(path, None)
+                return None
+            self._entries.setdefault(path, path.stat().st_size)
+            self._touch(path)
+        return path
+
+    def render(self, track_dir: Path, spec: MixSpec) -> Path:
+        """Devolve a mixagem, renderizando-a na primeira vez que é pedida."""
+        cached = self.lookup(track_dir, spec)
+        if cached is not None:
+            return cached
+
+        path = self.path_for(track_dir, spec)
+        with self._lock:
+            render_lock = self._rendering.setdefault(path, threading.Lock())
+        # pedidos simultâneos da mesma mixagem esperam um único ffmpeg
+        with render_lock:
+            try:
+                if not path.exists():
+                    path.parent.mkdir(exist_ok=True)
+                    render_mix(self._sources(track_dir, spec), spec, path)
+            finally:
+                with self._lock:
+                    self._rendering.pop(path, None)
+
+        with self._lock:
+            self._ensure_index()
+            self._entries[path] = path.stat().st_size
+            self._touch(path)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        total = sum(self._entries.values())
+        for path in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= self._entries.pop(path)
+            path.unlink(missing_ok=True)
+            path.with_suffix(PEAKS_SUFFIX).unlink(missing_ok=True)
+
+    def drop(self, track_dir: Path) -> int:
+        """Apaga as mixagens de uma faixa (podem ser refeitas). Retorna os bytes liberados."""
+        freed = 0
+        with self._lock:
+            self._ensure_index()
+            for path in [p for p in self._entries if p.parent.parent == track_dir]:
+                freed += self._entries.pop(path)
+                path.unlink(missing_ok=True)
+                path.with_suffix(PEAKS_SUFFIX).unlink(missing_ok=True)
+        return freed
+
+    def forget(self, track_dir: Path):
+        """Remove do índice as mixagens de uma faixa apagada."""
+        with self._lock:
+            if self._entries is None:
+                return
+            for path in [p for p in self._entries if p.parent.parent == track_dir]:
+                del self._entries[path]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._ensure_index()
+            return sum(self._entries.values())
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_mix_cache() -> MixCache:
+    """Cache compartilhado do processo (todas as sessões do Streamlit)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MixCache()
+        return _cache
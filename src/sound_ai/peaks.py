@@ -0,0 +1,144 @@
+"""
+Picos da forma de onda (min/max por bucket) em várias resoluções.
+
+Gerados durante o processamento para cada stem (`vocals.peaks` ao lado de
+`vocals.mp3`) e para cada mixagem renderizada, para que o player desenhe as
+formas de onda e a prévia de busca sem baixar nem decodificar o áudio.
+
+Formato binário (little-endian):
+    cabeçalho: b"SAPK", versão (u8), níveis (u8), reservado (u16),
+               taxa de amostragem (u32), frames (u64)
+    por nível: amostras por bucket (u32), buckets (u32),
+               buckets × (min, max) em int8 (-127..127)
+
+O nível 0 é o mais detalhado; cada nível seguinte agrupa `LEVEL_FACTOR`
+buckets do anterior, até sobrarem no máximo `MIN_BUCKETS`.
+"""
+
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"SAPK"
+VERSION = 1
+SUFFIX = ".peaks"
+BASE_BUCKET = 512
+LEVEL_FACTOR = 4
+MIN_BUCKETS = 512
+
+_HEADER = struct.Struct("<4sBBHIQ")
+_LEVEL = struct.Struct("<II")
+
+
+def peaks_path(audio_path: Path) -> Path:
+    return Path(audio_path).with_suffix(SUFFIX)
+
+
+class PeakBuilder:
+    """Acumula blocos PCM (frames, canais) e calcula os picos em uma passada."""
+
+    def __init__(self, samplerate: int, base: int = BASE_BUCKET):
+        self.samplerate = samplerate
+        self.base = base
+        self.frames = 0
+        self._mins: list[np.ndarray] = []
+        self._maxs: list[np.ndarray] = []
+        self._rest_lo = np.zeros(0, dtype=np.float32)
+        self._rest_hi = np.zeros(0, dtype=np.float32)
+
+    def add(self, block: np.ndarray):
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 2:
+            # envelope de todos os canais
+            lo, hi = block.min(axis=1), block.max(axis=1)
+        else:
+            lo = hi = block
+        self.frames += len(lo)
+        if len(self._rest_lo):
+            lo = np.concatenate([self._rest_lo, lo])
+            hi = np.concatenate([self._rest_hi, hi])
+        full = len(lo) - len(lo) % self.base
+        if full:
+            self._mins.append(lo[:full].reshape(-1, self.base).min(axis=1))
+            self._maxs.append(hi[:full].reshape(-1, self.base).max(axis=1))
+        self._rest_lo, self._rest_hi = lo[full:].copy(), hi[full:].copy()
+
+    def levels(self) -> list[tuple[int, np.ndarray]]:
+        """[(amostras por bucket, array int8 (buckets, 2))], do mais detalhado ao mais grosso."""
+        mins, maxs = list(self._mins), list(self._maxs)
+        if len(self._rest_lo):
+            mins.append(self._rest_lo.min(keepdims=True))
+            maxs.append(self._rest_hi.max(keepdims=True))
+        lo = np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32)
+        hi = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32)
+
+        result = []
+        spb = self.base
+        while True:
+            pairs = np.stack([lo, hi], axis=1)
+            result.append((spb, np.clip(np.rint(pairs * 127), -127, 127).astype(np.int8)))
+            if len(lo) <= MIN_BUCKETS:
+                return result
+            starts = np.arange(0, len(lo), LEVEL_FACTOR)
+            lo, hi = np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)
+            spb *= LEVEL_FACTOR
+
+    def write(self, path: Path) -> Path:
+        levels = self.levels()
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(levels), 0, self.samplerate, self.frames))
+            for spb, data in levels:
+                f.write(_LEVEL.pack(spb, len(data)))
+                f.write(data.tobytes())
+        os.replace(tmp, path)
+        return path
+
+
+def read_peaks(path: Path) -> dict:
+    """Lê um arquivo de picos: {"samplerate", "frames", "levels": [(spb, int8 (n, 2))]}."""
+    data = Path(path).read_bytes()
+    magic, version, count, _, samplerate, frames = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Arquivo de picos inválido: {path}")
+    offset = _HEADER.size
+    levels = []
+    for _ in range(count):
+        spb, buckets = _LEVEL.unpack_from(data, offset)
+        offset += _LEVEL.size
+        levels.append((spb, np.frombuffer(data, dtype=np.int8, count=buckets * 2, offset=offset).reshape(-1, 2)))
+        offset += buckets * 2
+    return {"samplerate": samplerate, "frames": frames, "levels": levels}
+
+
+def compute_peaks(audio_path: Path, output: Path | None = None, samplerate: int = 44100) -> Path:
+    """Gera os picos de um arquivo de áudio (WAV lido direto, outros via ffmpeg)."""
+    from .media import iter_decode
+    from .wavio import WavReader
+
+    audio_path = Path(audio_path)
+    output = output or peaks_path(audio_path)
+    if audio_path.suffix.lower() == ".wav":
+        reader = WavReader(audio_path)
+        builder = PeakBuilder(reader.info.samplerate)
+        try:
+            for start in range(0, reader.frames, 1 << 18):
+                builder.add(reader.read(start, min(start + (1 << 18), reader.frames)))
+        finally:
+            reader.close()
+    else:
+        builder = PeakBuilder(samplerate)
+        for block in iter_decode(audio_path, samplerate, 2):
+            builder.add(block)
+    return builder.write(output)
+
+
+def ensure_track_peaks(track_dir: Path, fmt: str) -> list[Path]:
+    """Gera os picos que faltam (faixas processadas antes deste formato existir)."""
+    created = []
+    for audio in sorted(track_dir.glob(f"*.{fmt}")):
+        if not peaks_path(audio).exists():
+            created.append(compute_peaks(audio))
+    return created
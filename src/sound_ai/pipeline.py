@@ -0,0 +1,525 @@
+"""
+Etapas do pipeline (download → separação → MP3 → mixagens).
+
+Não depende do Streamlit: pode rodar nos workers da fila de jobs, em scripts
+ou em testes. Erros são sinalizados com `PipelineError`.
+"""
+
+import subprocess
+import tempfile
+import urllib.parse
+from pathlib import Path
+
+from .config import LONG_TRACK_SECONDS, MODEL_NAME, SEPARATED_ROOT, SRC_DIR, STEM_FORMAT
+from .downloader import DownloadError, download_file, iter_download
+from .media import MediaError, iter_decode_stream, probe_duration
+from .metrics import file_size, span, traced
+from .process import (ProcessCancelled, ProcessError, ProcessStalled, ProcessTimeout,
+                      parse_ffmpeg_progress, run_process, with_progress)
+from .separator import SeparationEngine, SeparationError, engine_available, get_engine, separate_file
+
+API_URL = "https://www.clipto.com/api/youtube/mp3?url={url}&csrfToken=8crUK66l-IsnUGoga9wzUzPRRfb4Inx9MEIw"
+
+STEMS = ["vocals", "drums", "bass", "other"]
+STEM_FILES = [f"{stem}.wav" for stem in STEMS]
+
+CODECS = {
+    "mp3": ["-codec:a", "libmp3lame", "-qscale:a", "2"],
+    "opus": ["-codec:a", "libopus", "-b:a", "160k"],
+    "flac": ["-codec:a", "flac"],
+}
+MIME_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg", "flac": "audio/flac"}
+
+PCM_CHUNK_FRAMES = 1 << 16
+
+# Mixagens gravadas junto com os stems: nome do arquivo -> stems somados.
+# Vazio por padrão: as mixagens são geradas sob demanda (ver `mixes.MixCache`).
+MIXES: dict[str, list[str]] = {}
+
+
+class PipelineError(Exception):
+    def __init__(self, message: str, output: str = ""):
+        super().__init__(message)
+        self.output = output
+
+
+def sanitize_name(name: str) -> str:
+    forbidden = ['/', '\\', ':', '*', '?', '"', '<', '>', '|', '\0']
+    clean = "".join([c if c not in forbidden else "_" for c in name])
+    clean = clean.strip()
+    return clean if clean else "audio_temp"
+
+
+def build_api_url(video_url: str, api_url: str = API_URL) -> str:
+    return api_url.format(url=urllib.parse.quote(video_url, ""))
+
+
+def _report(on_progress):
+    """Repassa o `Progress` dos subprocessos como on_progress(fração, eta=..., speed=...)."""
+    if on_progress is None:
+        return None
+    return lambda progress: on_progress(progress.fraction or 0.0, eta=progress.eta, speed=progress.speed)
+
+
+@traced("encode", bytes_of=file_size)
+def convert_to_mp3(file_path: Path, on_progress=None) -> Path:
+    if file_path.suffix == ".mp3":
+        return file_path
+
+    mp3_path = file_path.with_suffix(".mp3")
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", str(file_path),
+        "-codec:a", "libmp3lame",
+        "-qscale:a", "2",
+        str(mp3_path)
+    ]
+    try:
+        run_process(with_progress(cmd), "encode", parse_ffmpeg_progress,
+                    total=probe_duration(file_path) or None, on_progress=_report(on_progress))
+    except ProcessCancelled:
+        raise
+    except ProcessError:
+        pass
+
+    if mp3_path.exists() and mp3_path.stat().st_size > 0:
+        try:
+            file_path.unlink()
+        except Exception:
+            pass
+        return mp3_path
+    return file_path
+
+
+def build_transcode_cmd(inputs: dict[str, Path], target_dir: Path,
+                        mixes: dict[str, list[str]] = MIXES,
+                        fmt: str = STEM_FORMAT) -> tuple[list[str], list[Path]]:
+    """
+    Monta um único comando ffmpeg que lê cada stem WAV uma vez e grava todos
+    os stems em MP3 e todas as mixagens a partir de um só `filter_complex`.
+    """
+    names = list(inputs)
+    mixes = {out: stems for out, stems in mixes.items() if all(s in inputs for s in stems)}
+
+    uses = {name: 1 + sum(name in stems for stems in mixes.values()) for name in names}
+    labels = {name: [] for name in names}
+    graph = []
+    for idx, name in enumerate(names):
+        if uses[name] == 1:
+            labels[name] = [f"{idx}:a"]
+            continue
+        outs = [f"{name}{n}" for n in range(uses[name])]
+        graph.append(f"[{idx}:a]asplit={uses[name]}" + "".join(f"[{o}]" for o in outs))
+        labels[name] = outs
+
+    for out, stems in mixes.items():
+        srcs = "".join(f"[{labels[s].pop()}]" for s in stems)
+        graph.append(f"{srcs}amix=inputs={len(stems)}:duration=longest[{out}]")
+
+    cmd = ["ffmpeg", "-y"]
+    for name in names:
+        cmd.extend(["-i", str(inputs[name])])
+    if graph:
+        cmd.extend(["-filter_complex", ";".join(graph)])
+
+    outputs = []
+    for name in names:
+        label = labels[name][0]
+        cmd.extend(["-map", label if label.endswith(":a") else f"[{label}]"])
+        cmd.extend(CODECS[fmt])
+        outputs.append(target_dir / f"{name}.{fmt}")
+        cmd.append(str(outputs[-1]))
+    for out in mixes:
+        cmd.extend(["-map", f"[{out}]"])
+        cmd.extend(CODECS[fmt])
+        outputs.append(target_dir / f"{out}.{fmt}")
+        cmd.append(str(outputs[-1]))
+    return cmd, outputs
+
+
+@traced("encode", bytes_of=file_size)
+def transcode_stems(target_dir: Path, mixes: dict[str, list[str]] = MIXES,
+                    fmt: str = STEM_FORMAT, on_progress=None) -> list[Path]:
+    """
+    Converte os stems WAV de `target_dir` e cria as mixagens em uma passada.
+
+    Args:
+        on_progress: callback(fração, eta=..., speed=...) lido do `-progress` do ffmpeg
+    """
+    from .wavio import WavError, read_wav_info
+
+    inputs = {stem: target_dir / f"{stem}.wav" for stem in STEMS}
+    inputs = {stem: path for stem, path in inputs.items() if path.exists()}
+    if not inputs:
+        raise PipelineError("Nenhum stem WAV encontrado.")
+    try:
+        duration = max(read_wav_info(path).duration for path in inputs.values())
+    except (WavError, OSError):
+        duration = None
+
+    cmd, outputs = build_transcode_cmd(inputs, target_dir, mixes, fmt)
+    try:
+        run_process(with_progress(cmd), "encode", parse_ffmpeg_progress,
+                    total=duration, on_progress=_report(on_progress))
+    except ProcessCancelled:
+        raise
+    except (ProcessTimeout, ProcessStalled) as e:
+        raise PipelineError(f"FFmpeg interrompido: {e}", e.output) from e
+    except ProcessError as e:
+        raise PipelineError("Erro no FFmpeg ao converter/mixar as faixas.", e.output) from e
+    if not all(p.exists() and p.stat().st_size > 0 for p in outputs):
+        raise PipelineError("Erro no FFmpeg ao converter/mixar as faixas.")
+
+    # picos a partir dos WAVs, que são lidos direto (sem ffmpeg) antes de apagados
+    from .peaks import compute_peaks, peaks_path
+
+    for stem, path in inputs.items():
+        compute_peaks(path, peaks_path(target_dir / f"{stem}.{fmt}"))
+    for out in mixes:
+        output = target_dir / f"{out}.{fmt}"
+        if output.exists():
+            compute_peaks(output)
+
+    for path in inputs.values():
+        try:
+            path.unlink()
+        except Exception:
+            pass
+    return outputs
+
+
+def build_encode_cmd(names: list[str], channels: int, samplerate: int, target_dir: Path,
+                     mixes: dict[str, list[str]] = MIXES,
+                     fmt: str = STEM_FORMAT) -> tuple[list[str], list[Path]]:
+    """
+    Comando ffmpeg que recebe todos os stems intercalados em um único fluxo
+    PCM float32 pelo stdin (stem0 c0..cN, stem1 c0..cN, ...) e grava cada stem
+    e cada mixagem comprimidos, sem WAV intermediário.
+
+    As mixagens usam `pan` com peso 1/n por stem, o mesmo resultado do `amix`.
+    """
+    mixes = {out: stems for out, stems in mixes.items() if all(s in names for s in stems)}
+    outs = list(names) + list(mixes)
+    layout = "stereo" if channels == 2 else "mono" if channels == 1 else f"{channels}c"
+
+    graph = [f"[0:a]asplit={len(outs)}" + "".join(f"[in{i}]" for i in range(len(outs)))]
+    for idx, name in enumerate(names):
+        base = idx * channels
+        pan = "|".join(f"c{c}=c{base + c}" for c in range(channels))
+        graph.append(f"[in{idx}]pan={layout}|{pan}[{name}]")
+    for offset, (out, stems) in enumerate(mixes.items(), start=len(names)):
+        weight = 1.0 / len(stems)
+        terms = []
+        for c in range(channels):
+            srcs = "+".join(f"{weight:.6f}*c{names.index(s) * channels + c}" for s in stems)
+            terms.append(f"c{c}={srcs}")
+        graph.append(f"[in{offset}]pan={layout}|{'|'.join(terms)}[{out}]")
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "f32le", "-ar", str(samplerate), "-ac", str(len(names) * channels),
+        "-i", "pipe:0",
+        "-filter_complex", ";".join(graph),
+    ]
+    outputs = []
+    for out in outs:
+        cmd.extend(["-map", f"[{out}]"])
+        cmd.extend(CODECS[fmt])
+        outputs.append(target_dir / f"{out}.{fmt}")
+        cmd.append(str(outputs[-1]))
+    return cmd, outputs
+
+
+class StemEncoder:
+    """
+    Encoder incremental: recebe blocos {stem: array (canais, amostras)} e
+    os envia ao ffmpeg conforme chegam, sem precisar da faixa inteira.
+    """
+
+    def __init__(self, names: list[str], channels: int, samplerate: int, target_dir: Path,
+                 mixes: dict[str, list[str]] = MIXES, fmt: str = STEM_FORMAT):
+        from .peaks import PeakBuilder
+
+        self.names = list(names)
+        self.channels = channels
+        target_dir.mkdir(parents=True, exist_ok=True)
+        cmd, self.outputs = build_encode_cmd(self.names, channels, samplerate, target_dir, mixes, fmt)
+        # picos da forma de onda calculados do mesmo PCM, sem decodificar de novo
+        self._peaks = {name: PeakBuilder(samplerate) for name in self.names}
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+
+    def write(self, stems: dict):
+        import numpy as np
+
+        channels = self.channels
+        arrays = [np.asarray(stems[name], dtype=np.float32) for name in self.names]
+        frames = max(a.shape[1] for a in arrays)
+        # um buffer reaproveitado por chamada, escrito no pipe sem cópia para bytes
+        buffer = np.empty((min(frames, PCM_CHUNK_FRAMES), len(arrays) * channels), dtype="<f4")
+        for start in range(0, frames, PCM_CHUNK_FRAMES):
+            stop = min(start + PCM_CHUNK_FRAMES, frames)
+            block = buffer[: stop - start]
+            for idx, data in enumerate(arrays):
+                part = data[:, start:stop]
+                block[: part.shape[1], idx * channels:(idx + 1) * channels] = part.T
+                block[part.shape[1]:, idx * channels:(idx + 1) * channels] = 0
+                self._peaks[self.names[idx]].add(part.T)
+            try:
+                self._proc.stdin.write(memoryview(block).cast("B"))
+            except BrokenPipeError:
+                # ffmpeg morreu; o erro aparece em close()
+                return
+
+    def close(self) -> list[Path]:
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self._proc.wait()
+        self._stderr.seek(0)
+        log = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+
+        if returncode != 0 or not all(p.exists() and p.stat().st_size > 0 for p in self.outputs):
+            raise PipelineError("Erro no FFmpeg ao codificar as faixas.", log)
+        from .peaks import compute_peaks, peaks_path
+
+        for name, output in zip(self.names, self.outputs):
+            self._peaks[name].write(peaks_path(output))
+        for output in self.outputs[len(self.names):]:
+            compute_peaks(output)
+        return self.outputs
+
+    def abort(self):
+        self._proc.kill()
+        self._proc.wait()
+        self._stderr.close()
+
+
+def stem_order(names) -> list[str]:
+    return [name for name in STEMS if name in names] + [n for n in names if n not in STEMS]
+
+
+@traced("encode", bytes_of=file_size)
+def encode_stems(stems: dict, samplerate: int, target_dir: Path,
+                 mixes: dict[str, list[str]] = MIXES, fmt: str = STEM_FORMAT) -> list[Path]:
+    """
+    Codifica os stems separados (arrays (canais, amostras)) direto para o
+    formato final através de um pipe para o ffmpeg.
+    """
+    names = stem_order(stems)
+    channels = len(stems[names[0]])
+    encoder = StemEncoder(names, channels, samplerate, target_dir, mixes, fmt)
+    try:
+        encoder.write(stems)
+    except Exception:
+        encoder.abort()
+        raise
+    return encoder.close()
+
+
+def download_audio(video_url: str, music_name: str, dest_dir: Path = SRC_DIR,
+                   on_progress=None, api_url: str = API_URL) -> tuple[Path, str]:
+    if not music_name:
+        music_name = "audio_temp"
+
+    final_name = sanitize_name(music_name)
+    mp3_path = dest_dir / f"{final_name}.mp3"
+
+    if mp3_path.exists():
+        mp3_path.unlink()
+
+    try:
+        download_file(build_api_url(video_url, api_url), mp3_path, on_progress=on_progress)
+    except DownloadError as e:
+        raise PipelineError(str(e)) from e
+    return mp3_path, final_name
+
+
+async def download_audio_async(video_url: str, music_name: str, dest_dir: Path = SRC_DIR,
+                               on_progress=None, api_url: str = API_URL,
+                               downloader=None) -> tuple[Path, str]:
+    """
+    Versão assíncrona de `download_audio` (mesmo retorno), para muitos
+    downloads simultâneos em um único event loop.
+
+    Args:
+        downloader: `AsyncDownloader` compartilhado (pool de conexões e
+            limite de concorrência); sem ele, um é criado só para esta chamada
+    """
+    from .async_downloader import AsyncDownloader
+
+    final_name = sanitize_name(music_name or "audio_temp")
+    mp3_path = dest_dir / f"{final_name}.mp3"
+    mp3_path.unlink(missing_ok=True)
+
+    owned = downloader is None
+    downloader = downloader or AsyncDownloader()
+    try:
+        await downloader.download(build_api_url(video_url, api_url), mp3_path, on_progress=on_progress)
+    except DownloadError as e:
+        raise PipelineError(str(e)) from e
+    finally:
+        if owned:
+            downloader.pool.close()
+    return mp3_path, final_name
+
+
+def separate_long_track(source, target_dir: Path, model_name: str, on_progress=None) -> list[Path]:
+    """`source` é um arquivo ou um iterável de blocos PCM (ver `separate_segmented`)."""
+    from .segmented import separate_segmented
+
+    def encoder_factory(names, channels, samplerate):
+        return StemEncoder(stem_order(names), channels, samplerate, target_dir)
+
+    def progress(done, total):
+        if on_progress:
+            on_progress(done / total)
+
+    try:
+        with span("separate", segmented=True):
+            return separate_segmented(source, encoder_factory, model_name=model_name, on_progress=progress)
+    except (PipelineError, ProcessCancelled):
+        raise
+    except Exception as e:
+        raise PipelineError(f"Erro no processamento: {e}") from e
+
+
+def process_demucs(input_mp3: Path, out_root: Path = SEPARATED_ROOT,
+                   engine: SeparationEngine | None = None, on_stage=None,
+                   on_progress=None) -> Path:
+    """
+    Separa `input_mp3`, grava os stems no formato final e cria as mixagens.
+
+    Faixas mais longas que `LONG_TRACK_SECONDS` são separadas em segmentos
+    paralelos com memória limitada.
+
+    Args:
+        on_stage: callback opcional chamado com o nome de cada etapa
+        on_progress: callback opcional com a fração (0-1) da etapa atual; os
+            subprocessos (demucs, ffmpeg) também passam `eta` e `speed`
+            (segundos de áudio por segundo)
+    """
+    def stage(name):
+        if on_stage:
+            on_stage(name)
+
+    stage("separate")
+    if engine_available() and probe_duration(input_mp3) > LONG_TRACK_SECONDS:
+        # separação e codificação acontecem juntas, segmento a segmento
+        model_name = engine.model_name if engine else MODEL_NAME
+        target_dir = out_root / model_name / input_mp3.stem
+        separate_long_track(input_mp3, target_dir, model_name, on_progress)
+    elif engine_available():
+        # stems saem do modelo direto para o encoder, sem WAV em disco
+        engine = engine or get_engine()
+        target_dir = out_root / engine.model_name / input_mp3.stem
+        try:
+            with span("separate"):
+                stems = engine.separate(input_mp3)
+        except Exception as e:
+            raise PipelineError(f"Erro no processamento: {e}") from e
+
+        stage("encode")
+        encode_stems(stems, engine.samplerate, target_dir)
+    else:
+        try:
+            target_dir = separate_file(input_mp3, out_root, on_progress=_report(on_progress))
+        except SeparationError as e:
+            raise PipelineError(f"Erro no processamento: {e}", e.output) from e
+
+        stage("encode")
+        transcode_stems(target_dir, on_progress=on_progress)
+
+    stage("cleanup")
+    with span("cleanup"):
+        if input_mp3.exists():
+            try:
+                input_mp3.unlink()
+            except Exception:
+                pass
+
+    return target_dir
+
+
+def process_stream(video_url: str, music_name: str, out_root: Path = SEPARATED_ROOT,
+                   engine: SeparationEngine | None = None, on_stage=None,
+                   on_progress=None) -> Path:
+    """
+    Como `download_audio` + `process_demucs`, mas sem MP3 temporário: o corpo
+    da resposta HTTP vai direto para o stdin do ffmpeg e o PCM decodificado
+    segue para o modelo. A decodificação acontece durante o download.
+
+    Exige o engine em processo (torch + demucs); o CLI do demucs precisa de
+    um arquivo.
+
+    Args:
+        on_stage: callback opcional chamado com o nome de cada etapa
+        on_progress: callback opcional com a fração (0-1) da etapa atual
+    """
+    import itertools
+
+    import numpy as np
+
+    def stage(name):
+        if on_stage:
+            on_stage(name)
+
+    downloaded = [0]
+
+    def download_progress(done, total):
+        downloaded[0] = done
+        if on_progress and total:
+            on_progress(min(done / total, 1.0))
+
+    engine = engine or get_engine()
+    final_name = sanitize_name(music_name or "audio_temp")
+    target_dir = out_root / engine.model_name / final_name
+    samplerate, channels = engine.samplerate, engine.audio_channels
+    long_frames = int(LONG_TRACK_SECONDS * samplerate)
+
+    stage("download")
+    blocks = iter_decode_stream(
+        iter_download(build_api_url(video_url), on_progress=download_progress),
+        samplerate, channels,
+    )
+    head, frames = [], 0
+    try:
+        # download e decodificação acontecem juntos: um span para os dois
+        with span("download", streaming=True) as current:
+            for block in blocks:
+                head.append(block)
+                frames += len(block)
+                if frames > long_frames:
+                    break
+            current.add_bytes(downloaded[0])
+            current.set(decoded_seconds=round(frames / samplerate, 2))
+    except (DownloadError, MediaError) as e:
+        blocks.close()
+        raise PipelineError(str(e), getattr(e, "output", "")) from e
+
+    if frames > long_frames:
+        # faixa longa: o resto do stream segue direto para os segmentos
+        stage("separate")
+        separate_long_track(itertools.chain(head, blocks), target_dir, engine.model_name, on_progress)
+        return target_dir
+
+    if frames == 0:
+        raise PipelineError("Erro no download: nenhum áudio recebido")
+
+    stage("separate")
+    audio = np.concatenate(head).T
+    del head
+    try:
+        with span("separate"):
+            stems = engine.separate(audio)
+    except Exception as e:
+        raise PipelineError(f"Erro no processamento: {e}") from e
+
+    stage("encode")
+    encode_stems(stems, engine.samplerate, target_dir)
+    return target_dir
@@ -0,0 +1,222 @@
+"""
+Subprocessos do pipeline (CLI do demucs, ffmpeg) com progresso ao vivo.
+
+`run_process` lê a saída conforme ela chega, em vez de esperar o fim como
+`subprocess.run(capture_output=True)`: as barras do tqdm (demucs) e o
+`-progress pipe:1` do ffmpeg viram eventos `Progress` (fração, ETA e
+velocidade em segundos de áudio por segundo). O processo é morto se passar do
+timeout da etapa, se ficar `STALL_SECONDS` sem escrever nada ou se o job for
+cancelado (`cancel_scope`).
+"""
+
+import os
+import re
+import selectors
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+
+from .metrics import PROCESS_KILLS, STAGE_SPEED, log_event
+
+# sem nenhuma saída por este tempo o processo é considerado travado
+STALL_SECONDS = float(os.environ.get("SOUND_AI_STALL_SECONDS", "180"))
+# limite por etapa em segundos (0 = sem limite); sobrescreva com SOUND_AI_TIMEOUT_<ETAPA>
+STAGE_TIMEOUTS = {"separate": 4 * 3600, "encode": 3600, "mix": 600, "convert": 1800}
+PROGRESS_INTERVAL = 0.5
+LOG_INTERVAL = 10.0
+TAIL_LINES = 200
+
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+_cancel: ContextVar[threading.Event | None] = ContextVar("sound_ai_cancel", default=None)
+
+
+class ProcessError(Exception):
+    def __init__(self, message: str, output: str = "", returncode: int | None = None):
+        super().__init__(message)
+        self.output = output
+        self.returncode = returncode
+
+
+class ProcessTimeout(ProcessError):
+    pass
+
+
+class ProcessStalled(ProcessError):
+    pass
+
+
+class ProcessCancelled(ProcessError):
+    pass
+
+
+@dataclass
+class Progress:
+    stage: str
+    done: float
+    total: float | None
+    elapsed: float
+
+    @property
+    def fraction(self) -> float | None:
+        return min(self.done / self.total, 1.0) if self.total else None
+
+    @property
+    def speed(self) -> float:
+        """Segundos de áudio processados por segundo."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        if not self.total or not self.speed:
+            return None
+        return max(self.total - self.done, 0.0) / self.speed
+
+
+def stage_timeout(stage: str) -> float | None:
+    value = float(os.environ.get(f"SOUND_AI_TIMEOUT_{stage.upper()}", STAGE_TIMEOUTS.get(stage, 0)))
+    return value or None
+
+
+@contextmanager
+def cancel_scope(event: threading.Event):
+    """Subprocessos rodados dentro do bloco são mortos quando `event` é setado."""
+    token = _cancel.set(event)
+    try:
+        yield
+    finally:
+        _cancel.reset(token)
+
+
+def check_cancelled(name: str):
+    """Trabalho fora de subprocessos (ex.: pool de processos) chama isto entre etapas."""
+    cancel = _cancel.get()
+    if cancel is not None and cancel.is_set():
+        raise ProcessCancelled(f"{name} cancelado")
+
+
+_TQDM = re.compile(r"(\d+(?:\.\d+)?)/(\d+(?:\.\d+)?)\s*\[")
+
+
+def parse_tqdm(line: str):
+    """`45%|████▌     | 52.65/117.0 [00:10<00:12, 5.08seconds/s]` -> (52.65, 117.0)."""
+    match = _TQDM.search(line)
+    return (float(match.group(1)), float(match.group(2))) if match else None
+
+
+def parse_ffmpeg_progress(line: str):
+    """Linhas `chave=valor` do `-progress`: só `out_time_us` traz o andamento."""
+    key, sep, value = line.partition("=")
+    if not sep or not key.replace("_", "").isalnum():
+        return None
+    if key in ("out_time_us", "out_time_ms") and value.isdigit():
+        # out_time_ms também vem em microssegundos
+        return int(value) / 1e6, None
+    return ()
+
+
+def with_progress(cmd: list[str]) -> list[str]:
+    """Comando ffmpeg com o relatório de progresso no stdout."""
+    return [cmd[0], *FFMPEG_PROGRESS_ARGS, *cmd[1:]]
+
+
+def run_process(cmd: list[str], stage: str, parser=None, total: float | None = None,
+                on_progress=None, timeout: float | None = -1,
+                stall: float | None = STALL_SECONDS) -> str:
+    """
+    Roda `cmd` lendo stdout e stderr juntos, linha a linha (`\\r` também
+    separa linhas, como nas barras do tqdm).
+
+    Args:
+        parser: função(linha) -> (feito, total_ou_None) para linhas de
+            progresso, () para linhas a ignorar ou None para saída comum
+        total: duração em segundos, quando o parser não informa
+        on_progress: callback(Progress), no máximo a cada `PROGRESS_INTERVAL`
+        timeout: segundos até matar o processo; -1 usa o da etapa (`stage_timeout`)
+        stall: segundos sem nenhuma saída até matar o processo
+
+    Returns:
+        As últimas linhas de saída comum (sem as de progresso)
+
+    Raises:
+        ProcessTimeout, ProcessStalled, ProcessCancelled: o processo foi morto
+        ProcessError: o processo terminou com código diferente de zero
+    """
+    if timeout == -1:
+        timeout = stage_timeout(stage)
+    name = Path(cmd[0]).name
+    cancel = _cancel.get()
+    tail = deque(maxlen=TAIL_LINES)
+    done = 0.0
+    pending = b""
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    selector = selectors.DefaultSelector()
+    selector.register(proc.stdout, selectors.EVENT_READ)
+    started = last_output = last_report = last_log = time.monotonic()
+
+    def kill(error_type, message):
+        PROCESS_KILLS.inc(stage=stage, reason=error_type.__name__)
+        log_event("process", stage=stage, command=name, status="killed",
+                  reason=error_type.__name__, elapsed=round(time.monotonic() - started, 1))
+        raise error_type(message, "\n".join(tail))
+
+    try:
+        while True:
+            now = time.monotonic()
+            if cancel is not None and cancel.is_set():
+                kill(ProcessCancelled, f"{name} cancelado")
+            if timeout and now - started > timeout:
+                kill(ProcessTimeout, f"{name} passou do limite de {timeout:.0f}s da etapa {stage}")
+            if stall and now - last_output > stall:
+                kill(ProcessStalled, f"{name} travou: {stall:.0f}s sem nenhuma saída")
+
+            if not selector.select(timeout=PROGRESS_INTERVAL):
+                continue
+            chunk = os.read(proc.stdout.fileno(), 1 << 16)
+            if not chunk:
+                break
+            last_output = now
+            *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+            for raw in lines:
+                line = raw.decode(errors="replace").strip()
+                if not line:
+                    continue
+                parsed = parser(line) if parser else None
+                if parsed is None:
+                    tail.append(line)
+                elif parsed:
+                    done, total = parsed[0], parsed[1] or total
+
+            if done and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                progress = Progress(stage, done, total, now - started)
+                if on_progress:
+                    on_progress(progress)
+                if now - last_log >= LOG_INTERVAL:
+                    last_log = now
+                    log_event("progress", stage=stage, command=name, fraction=progress.fraction,
+                              eta=progress.eta, speed=round(progress.speed, 2))
+        if pending.strip():
+            tail.append(pending.decode(errors="replace").strip())
+        returncode = proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        selector.close()
+        proc.stdout.close()
+
+    output = "\n".join(tail)
+    if returncode != 0:
+        raise ProcessError(f"{name} terminou com código {returncode}", output, returncode)
+    elapsed = time.monotonic() - started
+    if done and elapsed > 0:
+        STAGE_SPEED.observe(done / elapsed, stage=stage)
+    return output
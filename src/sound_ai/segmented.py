@@ -0,0 +1,374 @@
+"""
+Separação segmentada para faixas longas (sets de DJ, shows inteiros).
+
+A faixa é decodificada uma vez para um arquivo PCM temporário e dividida em
+segmentos sobrepostos. Um pool de processos (cada um com o seu modelo) separa
+os segmentos em paralelo; o processo principal junta os resultados em ordem
+com crossfade linear na sobreposição e os envia direto ao encoder. A memória
+usada depende do tamanho do segmento e do número de workers, não da duração.
+
+Os workers leem o PCM de entrada por `memmap` e gravam os stems separados em
+um anel de buffers em memória compartilhada (`StemRing`), um slot por segmento
+em voo: nada de PCM passa serializado pelo pipe do pool.
+
+Como o `SeparationEngine`, o pool (com um modelo carregado por processo) é
+criado uma vez por thread (cada worker da `JobQueue`) e reaproveitado nas
+faixas seguintes. O custo é manter essa memória ocupada entre faixas longas;
+`SOUND_AI_SEGMENT_KEEP_POOL=0` volta a criar um pool por faixa.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from .config import MODEL_NAME
+from .media import iter_decode
+from .metrics import span
+from .process import ProcessCancelled, check_cancelled
+from .separator import AUDIO_CHANNELS, SAMPLERATE, SeparationEngine
+
+SEGMENT_SECONDS = float(os.environ.get("SOUND_AI_SEGMENT_SECONDS", "30"))
+OVERLAP_SECONDS = float(os.environ.get("SOUND_AI_SEGMENT_OVERLAP", "1"))
+SEGMENT_WORKERS = int(os.environ.get("SOUND_AI_SEGMENT_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+# "0" devolve os stems pelo pipe do pool (pickle) em vez da memória compartilhada
+SHARED_RING = os.environ.get("SOUND_AI_SEGMENT_SHM", "1") != "0"
+# slots dimensionados para o maior modelo (htdemucs_6s); páginas não usadas não ocupam memória
+RING_MAX_STEMS = 6
+# "0" cria um pool novo por faixa (a memória dos modelos é liberada no fim de cada uma)
+KEEP_POOL = os.environ.get("SOUND_AI_SEGMENT_KEEP_POOL", "1") != "0"
+# de quanto em quanto tempo a espera por um segmento confere se o job foi cancelado
+CANCEL_POLL_SECONDS = 0.5
+
+_worker_engine = None
+_worker_rings = {}
+_pools = threading.local()
+
+
+def plan_segments(total: int, length: int, overlap: int) -> list[tuple[int, int]]:
+    """Intervalos [início, fim) cobrindo `total` amostras com `overlap` entre vizinhos."""
+    if total <= 0:
+        return []
+    length = max(length, overlap * 2 + 1)
+    hop = length - overlap
+    segments = []
+    start = 0
+    while True:
+        stop = min(start + length, total)
+        segments.append((start, stop))
+        if stop == total:
+            return segments
+        start += hop
+
+
+def crossfade_weights(start: int, stop: int, total: int, overlap: int) -> np.ndarray:
+    weights = np.ones(stop - start, dtype=np.float32)
+    if overlap <= 0:
+        return weights
+    ramp = np.linspace(0.0, 1.0, overlap + 2, dtype=np.float32)[1:-1]
+    if start > 0:
+        weights[:overlap] = ramp
+    if stop < total:
+        weights[-overlap:] = ramp[::-1]
+    return weights
+
+
+class TrackStitcher:
+    """
+    Junta, em ordem, os segmentos separados de uma faixa: aplica o crossfade,
+    soma a sobreposição com o segmento anterior e envia ao encoder só a parte
+    que já está definitiva.
+    """
+
+    def __init__(self, total: int, overlap: int, encoder_factory, channels: int, samplerate: int):
+        self.total = total
+        self.overlap = overlap
+        self.encoder_factory = encoder_factory
+        self.channels = channels
+        self.samplerate = samplerate
+        self.encoder = None
+        self.finished = False
+        self._tail = None
+
+    def add(self, start: int, stop: int, stems: dict):
+        overlap = self.overlap
+        weights = crossfade_weights(start, stop, self.total, overlap)
+        stems = {name: data * weights for name, data in stems.items()}
+
+        if self.encoder is None:
+            self.encoder = self.encoder_factory(list(stems), self.channels, self.samplerate)
+        if self._tail is not None:
+            for name in stems:
+                stems[name][:, :overlap] += self._tail[name]
+
+        if stop < self.total and overlap:
+            self.encoder.write({n: d[:, :-overlap] for n, d in stems.items()})
+            self._tail = {n: d[:, -overlap:] for n, d in stems.items()}
+        else:
+            self.encoder.write(stems)
+            self._tail = None
+        self.finished = stop >= self.total
+
+    def close(self):
+        return self.encoder.close()
+
+    def abort(self):
+        if self.encoder is not None:
+            self.encoder.abort()
+
+
+def write_raw(blocks, raw_path: Path) -> tuple[int, tuple[float, float]]:
+    """
+    Grava blocos float32 (frames, canais) como PCM intercalado em disco.
+
+    Returns:
+        (número de frames, (média, desvio) do sinal mono) para normalização
+    """
+    frames = 0
+    total = total_sq = 0.0
+    with span("decode") as current, open(raw_path, "wb") as f:
+        for block in blocks:
+            f.write(block.tobytes())
+            current.add_bytes(block.nbytes)
+            mono = block.mean(axis=1, dtype=np.float64)
+            total += float(mono.sum())
+            total_sq += float(np.square(mono).sum())
+            frames += len(block)
+    if frames == 0:
+        return 0, (0.0, 1.0)
+    mean = total / frames
+    std = max(total_sq / frames - mean * mean, 0.0) ** 0.5
+    return frames, (mean, std)
+
+
+def decode_to_raw(input_path: Path, raw_path: Path, samplerate: int = SAMPLERATE,
+                  channels: int = AUDIO_CHANNELS) -> tuple[int, tuple[float, float]]:
+    """Decodifica para PCM float32 intercalado em disco (ver `write_raw`)."""
+    return write_raw(iter_decode(input_path, samplerate, channels), raw_path)
+
+
+class StemRing:
+    """
+    Anel de slots em `multiprocessing.shared_memory`, cada um com espaço para
+    os stems (stems, canais, frames) float32 de um segmento.
+
+    O processo principal reserva um slot ao enviar o segmento e o libera
+    depois de costurá-lo; o worker escreve os stems direto no slot.
+    """
+
+    def __init__(self, slots: int, frames: int, channels: int, max_stems: int = RING_MAX_STEMS):
+        from multiprocessing import shared_memory
+
+        self.shape = (max_stems, channels, frames)
+        self.slot_bytes = max_stems * channels * frames * 4
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        self._free = list(range(slots))
+
+    @classmethod
+    def create(cls, slots: int, frames: int, channels: int) -> "StemRing | None":
+        """O anel, ou None se `/dev/shm` não tiver espaço (o tmpfs estoura com SIGBUS, não com erro)."""
+        size = slots * RING_MAX_STEMS * channels * frames * 4
+        if os.path.isdir("/dev/shm") and shutil.disk_usage("/dev/shm").free < size:
+            return None
+        try:
+            return cls(slots, frames, channels)
+        except OSError:
+            return None
+
+    @property
+    def spec(self) -> tuple:
+        """O que o worker precisa para abrir o anel (vai junto com cada segmento)."""
+        return self.shm.name, self.shape, self.slot_bytes
+
+    def acquire(self) -> int:
+        return self._free.pop()
+
+    def release(self, slot: int):
+        self._free.append(slot)
+
+    def stems(self, slot: int, names: list[str], frames: int) -> dict:
+        view = np.ndarray(self.shape, dtype=np.float32, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        return {name: view[idx, :, :frames] for idx, name in enumerate(names)}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _ring_slot(spec: tuple, slot: int) -> np.ndarray:
+    from multiprocessing import shared_memory
+
+    name, shape, slot_bytes = spec
+    shm = _worker_rings.get(name)
+    if shm is None:
+        # o pool atende uma faixa por vez: o anel da faixa anterior já foi removido
+        for old in _worker_rings.values():
+            old.close()
+        _worker_rings.clear()
+        shm = _worker_rings[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=np.float32, buffer=shm.buf, offset=slot * slot_bytes)
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_engine
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+    _worker_engine = SeparationEngine(model_name=model_name)
+    _worker_engine.load()
+
+
+def _open_pool(model_name: str, workers: int) -> ProcessPoolExecutor:
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, threads),
+    )
+
+
+def _close_pool():
+    pool = getattr(_pools, "pool", None)
+    _pools.pool = _pools.config = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def _segment_pool(model_name: str, workers: int):
+    """
+    O pool de processos da thread atual, criado na primeira faixa longa. Um
+    pool que falhou (ex.: worker morto) é descartado e recriado na próxima.
+    """
+    if not KEEP_POOL:
+        with _open_pool(model_name, workers) as pool:
+            yield pool
+        return
+    if getattr(_pools, "config", None) != (model_name, workers):
+        _close_pool()
+        _pools.pool = _open_pool(model_name, workers)
+        _pools.config = (model_name, workers)
+    try:
+        yield _pools.pool
+    except ProcessCancelled:
+        raise
+    except BaseException:
+        _close_pool()
+        raise
+
+
+def _separate_segment(raw_path: str, channels: int, total: int, start: int, stop: int, norm,
+                      ring: tuple | None = None, slot: int = 0):
+    data = np.memmap(raw_path, dtype="<f4", mode="r", shape=(total, channels))
+    segment = np.ascontiguousarray(data[start:stop].T)
+    del data
+    stems = _worker_engine.separate(segment, norm=norm)
+    if ring is None or len(stems) > ring[1][0]:
+        return start, stop, stems
+    view = _ring_slot(ring, slot)
+    for idx, stem in enumerate(stems.values()):
+        view[idx, :, : stem.shape[1]] = stem
+    del view
+    # só os nomes voltam pelo pipe; os dados ficam no slot
+    return start, stop, list(stems)
+
+
+def _result(future):
+    """Espera o segmento; um job cancelado (`cancel_scope`) para sem esperar os demais."""
+    while True:
+        check_cancelled("separação segmentada")
+        try:
+            return future.result(timeout=CANCEL_POLL_SECONDS)
+        except TimeoutError:
+            continue
+
+
+def _stitch(stitcher: TrackStitcher, result: tuple, ring: StemRing | None, slot: int | None):
+    start, stop, stems = result
+    if isinstance(stems, list):
+        stems = ring.stems(slot, stems, stop - start)
+    # o stitcher copia (crossfade) antes de o slot voltar ao anel
+    stitcher.add(start, stop, stems)
+
+
+def separate_segmented(source, encoder_factory, workers: int = SEGMENT_WORKERS,
+                       segment_seconds: float = SEGMENT_SECONDS,
+                       overlap_seconds: float = OVERLAP_SECONDS,
+                       model_name: str = MODEL_NAME, on_progress=None,
+                       samplerate: int = SAMPLERATE, channels: int = AUDIO_CHANNELS):
+    """
+    Separa `source` em segmentos paralelos e entrega o resultado costurado
+    ao encoder criado por `encoder_factory(names, channels, samplerate)`.
+
+    Args:
+        source: caminho do arquivo ou iterável de blocos PCM float32
+            (frames, canais) já na taxa de amostragem do modelo
+        on_progress: callback(segmentos_prontos, total_de_segmentos)
+
+    Returns:
+        O retorno de `encoder.close()`
+
+    Raises:
+        ProcessCancelled: o job do `cancel_scope` atual foi cancelado; os
+            segmentos ainda na fila do pool são descartados
+    """
+    segment = int(segment_seconds * samplerate)
+    overlap = int(overlap_seconds * samplerate)
+
+    with tempfile.TemporaryDirectory(prefix="sound-ai-seg-") as tmp:
+        raw_path = Path(tmp) / "input.f32"
+        if isinstance(source, (str, Path)):
+            total, norm = decode_to_raw(Path(source), raw_path, samplerate, channels)
+        else:
+            total, norm = write_raw(source, raw_path)
+        segments = plan_segments(total, segment, overlap)
+        if not segments:
+            raise ValueError("Áudio vazio" + (f": {source}" if isinstance(source, (str, Path)) else ""))
+
+        workers = max(1, workers)
+        stitcher = TrackStitcher(total, overlap, encoder_factory, channels, samplerate)
+        done = 0
+        # janela limitada de segmentos em voo: memória constante
+        window = min(workers, len(segments)) * 2
+        longest = max(stop - start for start, stop in segments)
+        ring = StemRing.create(min(window, len(segments)), longest, channels) if SHARED_RING else None
+
+        try:
+            with _segment_pool(model_name, workers) as pool:
+                futures = []
+                next_idx = 0
+                try:
+                    while done < len(segments):
+                        while next_idx < len(segments) and len(futures) < window:
+                            start, stop = segments[next_idx]
+                            slot = ring.acquire() if ring else None
+                            futures.append((slot, pool.submit(
+                                _separate_segment, str(raw_path), channels, total, start, stop, norm,
+                                ring.spec if ring else None, slot,
+                            )))
+                            next_idx += 1
+
+                        slot, future = futures.pop(0)
+                        _stitch(stitcher, _result(future), ring, slot)
+                        if ring:
+                            ring.release(slot)
+                        done += 1
+                        if on_progress:
+                            on_progress(done, len(segments))
+                except BaseException:
+                    for _, future in futures:
+                        future.cancel()
+                    stitcher.abort()
+                    raise
+        finally:
+            if ring:
+                ring.close()
+
+        return stitcher.close()
@@ -0,0 +1,233 @@
+"""
+Motor de separação Demucs mantido em memória.
+
+O modelo é carregado uma única vez por processo (ou por worker) e reaproveitado
+em todas as separações seguintes. Quando torch/demucs não estão disponíveis no
+processo atual, cai para o comando `demucs` via subprocess.
+"""
+
+import threading
+from pathlib import Path
+
+from .config import DEVICE, MODEL_NAME, SEPARATED_ROOT
+from .metrics import traced
+
+STEMS = ("drums", "bass", "other", "vocals")
+# todos os modelos pré-treinados do Demucs v4 usam 44.1 kHz estéreo
+SAMPLERATE = 44100
+AUDIO_CHANNELS = 2
+
+
+class SeparationError(Exception):
+    def __init__(self, message: str, output: str = ""):
+        super().__init__(message)
+        self.output = output
+
+
+class SeparationEngine:
+    def __init__(self, model_name: str = MODEL_NAME, device: str = DEVICE,
+                 shifts: int = 1, overlap: float = 0.25):
+        self.model_name = model_name
+        self.device = device
+        self.shifts = shifts
+        self.overlap = overlap
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is not None:
+            return self._model
+
+        import torch
+        from demucs.pretrained import get_model
+
+        if not self.device:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+        model = get_model(self.model_name)
+        model.to(self.device)
+        model.eval()
+        self._model = model
+        return model
+
+    @property
+    def samplerate(self) -> int:
+        return self.load().samplerate
+
+    @property
+    def audio_channels(self) -> int:
+        return self.load().audio_channels
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self.load().sources)
+
+    def _read_audio(self, source):
+        import torch
+
+        model = self.load()
+        if isinstance(source, (str, Path)):
+            from demucs.audio import AudioFile
+            return AudioFile(Path(source)).read(
+                streams=0,
+                samplerate=model.samplerate,
+                channels=model.audio_channels,
+            )
+        # array (canais, amostras) já na taxa de amostragem do modelo
+        return torch.as_tensor(source, dtype=torch.float32)
+
+    def separate(self, source, norm: tuple[float, float] | None = None) -> dict:
+        """
+        Separa um arquivo de áudio ou um array (canais, amostras).
+
+        Args:
+            norm: (média, desvio) usados na normalização; por padrão são
+                calculados sobre o próprio trecho. Trechos de uma faixa longa
+                devem usar as estatísticas da faixa inteira.
+
+        Returns:
+            Dicionário {stem: numpy.ndarray (canais, amostras)} em float32
+        """
+        import torch
+        from demucs.apply import apply_model
+
+        with self._lock:
+            model = self.load()
+            wav = self._read_audio(source)
+
+            if norm is None:
+                ref = wav.mean(0)
+                mean, std = ref.mean(), ref.std()
+            else:
+                mean, std = norm
+            wav = (wav - mean) / (std + 1e-8)
+
+            with torch.no_grad():
+                sources = apply_model(
+                    model, wav[None],
+                    device=self.device,
+                    shifts=self.shifts,
+                    split=True,
+                    overlap=self.overlap,
+                    progress=False,
+                )[0]
+            sources = sources * std + mean
+
+        return {name: src.cpu().numpy() for name, src in zip(model.sources, sources)}
+
+    def separate_batch(self, batch, norms: list[tuple[float, float]]):
+        """
+        Separa vários trechos de mesmo tamanho em uma única chamada ao modelo.
+
+        Args:
+            batch: array (lote, canais, amostras)
+            norms: (média, desvio) de cada item do lote
+
+        Returns:
+            numpy.ndarray (lote, stems, canais, amostras), stems na ordem de `sources`
+        """
+        import torch
+        from demucs.apply import apply_model
+
+        with self._lock:
+            model = self.load()
+            wav = torch.as_tensor(batch, dtype=torch.float32)
+            mean = torch.tensor([m for m, _ in norms], dtype=torch.float32)[:, None, None]
+            std = torch.tensor([s for _, s in norms], dtype=torch.float32)[:, None, None]
+            wav = (wav - mean) / (std + 1e-8)
+
+            with torch.no_grad():
+                sources = apply_model(
+                    model, wav,
+                    device=self.device,
+                    shifts=self.shifts,
+                    split=True,
+                    overlap=self.overlap,
+                    progress=False,
+                )
+            sources = sources * std[:, None] + mean[:, None]
+
+        return sources.cpu().numpy()
+
+    def separate_to_dir(self, input_path: Path, out_dir: Path) -> dict[str, Path]:
+        import torch
+        from demucs.audio import save_audio
+
+        stems = self.separate(input_path)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        paths = {}
+        for name, data in stems.items():
+            path = out_dir / f"{name}.wav"
+            save_audio(torch.from_numpy(data), str(path), samplerate=self.samplerate)
+            paths[name] = path
+        return paths
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SeparationEngine:
+    """Engine compartilhado do processo (carregado na primeira chamada)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SeparationEngine()
+        return _engine
+
+
+def engine_available() -> bool:
+    try:
+        import torch  # noqa: F401
+        import demucs.pretrained  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_demucs_cli(input_path: Path, out_root: Path = SEPARATED_ROOT,
+                   model_name: str = MODEL_NAME, on_progress=None) -> Path:
+    """
+    Args:
+        on_progress: callback(`process.Progress`) lido da barra do tqdm do demucs
+    """
+    from .process import ProcessCancelled, ProcessError, parse_tqdm, run_process
+
+    try:
+        run_process(
+            ["demucs", "-n", model_name, "-o", str(out_root), str(input_path)],
+            "separate", parse_tqdm, on_progress=on_progress,
+        )
+    except ProcessCancelled:
+        raise
+    except ProcessError as e:
+        raise SeparationError(e.output if e.returncode else str(e), e.output) from e
+    return out_root / model_name / input_path.stem
+
+
+@traced("separate")
+def separate_file(input_path: Path, out_root: Path = SEPARATED_ROOT,
+                  engine: SeparationEngine | None = None, on_progress=None) -> Path:
+    """
+    Separa `input_path` em `out_root/<modelo>/<nome>/<stem>.wav`.
+
+    Usa o engine em memória quando possível e o CLI do demucs como fallback.
+
+    Args:
+        on_progress: callback(`process.Progress`), só no CLI do demucs
+    """
+    input_path = Path(input_path)
+    if not engine_available():
+        target_dir = run_demucs_cli(input_path, out_root, on_progress=on_progress)
+    else:
+        engine = engine or get_engine()
+        target_dir = out_root / engine.model_name / input_path.stem
+        try:
+            engine.separate_to_dir(input_path, target_dir)
+        except Exception as e:
+            raise SeparationError(str(e)) from e
+
+    if not target_dir.exists():
+        raise SeparationError("Diretório de saída não encontrado.")
+    return target_dir
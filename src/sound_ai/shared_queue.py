@@ -0,0 +1,445 @@
+"""
+Fila de jobs compartilhada entre containers, em arquivos no volume comum.
+
+No modo `SOUND_AI_QUEUE=shared` o app Streamlit só enfileira e lê o estado
+dos jobs; a separação roda em processos `scripts/worker.py`, quantos forem
+necessários, em qualquer container que monte o mesmo volume.
+
+Layout em `QUEUE_DIR` (toda troca de estado é um `rename` atômico):
+    jobs/<id>.json     estado do job (escrito só por quem detém o job)
+    pending/<id>       na fila; a ordem é o mtime
+    leased/<id>        em execução; o conteúdo diz qual worker tem a concessão
+    reaping/<id>.<ns>  concessão vencida sendo devolvida à fila
+    cancel/<id>        pedido de cancelamento
+    aliases/<id>       outros nomes pedidos para o mesmo vídeo (um por linha)
+    keys/<chave>       job ativo de cada vídeo (deduplicação)
+    inbox/             áudios já baixados (`scripts/ingest.py`)
+
+Um worker pega um job renomeando `pending/<id>` para `leased/<id>`: só um
+ganha. Enquanto o job roda, uma thread renova a concessão (mtime do arquivo)
+e publica etapa e progresso. Se o worker morrer, a concessão vence depois de
+`LEASE_SECONDS` e o próximo worker que olhar a fila devolve o job, até
+`MAX_ATTEMPTS` entregas.
+
+Limitações (por isso o padrão continua sendo a fila local):
+    - métricas de etapas e jobs ficam no processo de cada worker, que não
+      expõe `/metrics`; o `/metrics` do app só mostra a fila e o armazenamento
+    - as reservas de espaço do `StorageManager` são por processo, então N
+      workers juntos podem passar da cota
+    - a biblioteca SQLite usa WAL, que exige todos os containers no mesmo
+      host com um volume local (nada de NFS ou outro sistema de rede)
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from .config import MODEL_NAME, QUEUE_DIR, SEPARATED_ROOT, SRC_DIR
+from .jobs import CANCELLED, DONE, FAILED, FINISHED, PENDING, RUNNING, Job, JobQueue
+from .metrics import JOBS, JOBS_PENDING, log_event, trace
+from .pipeline import sanitize_name
+from .process import cancel_scope
+from .workspace import check_same_filesystem, workspace_root
+
+LEASE_SECONDS = float(os.environ.get("SOUND_AI_LEASE_SECONDS", "60"))
+HEARTBEAT_SECONDS = LEASE_SECONDS / 6
+POLL_SECONDS = 1.0
+MAX_ATTEMPTS = int(os.environ.get("SOUND_AI_MAX_ATTEMPTS", "3"))
+# tempo máximo entre criar `keys/<chave>` e gravar o id do job nele
+KEY_WRITE_SECONDS = 1.0
+
+DIRS = ["jobs", "pending", "leased", "reaping", "cancel", "aliases", "keys", "inbox"]
+
+_FIELDS = ["id", "url", "name", "key", "status", "stage", "progress", "eta", "speed", "error",
+           "created_at", "started_at", "finished_at"]
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False))
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def job_to_record(job: Job, **extra) -> dict:
+    record = {name: getattr(job, name) for name in _FIELDS}
+    record["aliases"] = list(job.aliases)
+    record["input_path"] = str(job.input_path) if job.input_path else None
+    record["result"] = str(job.result) if job.result else None
+    record.update(extra)
+    return record
+
+
+def job_from_record(record: dict) -> Job:
+    job = Job(**{name: record[name] for name in _FIELDS if name in record})
+    job.aliases = list(record.get("aliases", []))
+    job.input_path = Path(record["input_path"]) if record.get("input_path") else None
+    job.result = Path(record["result"]) if record.get("result") else None
+    return job
+
+
+class SharedJobQueue:
+    """
+    Lado web da fila compartilhada. Tem a mesma interface de `JobQueue`
+    (`submit`, `status`, `jobs`, `cancel`, `cache`, `library`, `storage`),
+    mas não roda nenhum job.
+    """
+
+    def __init__(self, queue_dir: Path = QUEUE_DIR, out_root: Path = SEPARATED_ROOT):
+        self.dir = Path(queue_dir)
+        self.out_root = out_root
+        # downloads feitos fora dos workers precisam estar no volume compartilhado
+        self.src_dir = self.dir / "inbox"
+        for name in DIRS:
+            (self.dir / name).mkdir(parents=True, exist_ok=True)
+
+        from .cache import ResultCache
+        from .library import Library
+        from .storage import StorageManager
+
+        self.cache = ResultCache(out_root / MODEL_NAME)
+        self.library = Library(out_root / MODEL_NAME)
+        self.storage = StorageManager(self.library, self.cache,
+                                      JobQueue._mix_cache(out_root / MODEL_NAME))
+        # publicações de resultados em cache também passam por uma área de trabalho
+        self.workspace_dir = workspace_root(out_root)
+        check_same_filesystem(self.workspace_dir, self.cache.root)
+
+    # só usam `cache`, `storage`, `library` e `workspace_dir`, que as duas filas têm
+    _publish_cached = JobQueue._publish_cached
+    _ensure_peaks = staticmethod(JobQueue._ensure_peaks)
+    _start_cached = JobQueue._start_cached
+    _finish_cached = JobQueue._finish_cached
+
+    def path(self, kind: str, name: str = "") -> Path:
+        return self.dir / kind / name
+
+    def read(self, job_id: str) -> dict | None:
+        return _read_json(self.path("jobs", f"{job_id}.json"))
+
+    def write(self, record: dict):
+        _write_json(self.path("jobs", f"{record['id']}.json"), record)
+
+    def _claim_key(self, key: str, job_id: str) -> str | None:
+        """
+        Registra `job_id` como o job ativo do vídeo, criando `keys/<chave>`
+        com O_EXCL: de dois pedidos simultâneos só um cria o arquivo.
+
+        Returns:
+            o job que já estava ativo (nada é registrado) ou None
+        """
+        path = self.path("keys", key)
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                try:
+                    holder = path.read_text().strip()
+                    age = time.time() - path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if not holder and age < KEY_WRITE_SECONDS:
+                    # outro pedido acabou de criar o arquivo e ainda vai gravar o id
+                    time.sleep(0.01)
+                    continue
+                record = self.read(holder) if holder else None
+                if record is not None and record["status"] not in FINISHED:
+                    return holder
+                # chave de um job que terminou sem limpá-la (processo morto)
+                try:
+                    if path.read_text().strip() == holder:
+                        path.unlink()
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(job_id)
+            return None
+
+    def submit(self, url: str, name: str, input_path: Path | None = None) -> str:
+        """
+        Enfileira um job para os workers. Vídeos já processados são resolvidos
+        pelo cache, em uma thread do app, e pedidos do mesmo vídeo viram um único job.
+
+        Args:
+            input_path: áudio já baixado, dentro de `src_dir` (volume compartilhado)
+        """
+        from .cache import cache_key
+
+        key = cache_key(url)
+        job = Job(id=uuid.uuid4().hex[:12], url=url, name=name, key=key, input_path=input_path)
+
+        cached = self.cache.lookup(key, refresh=True)
+        if cached is not None:
+            if input_path is not None:
+                input_path.unlink(missing_ok=True)
+            job.status = RUNNING
+            job.stage = "cache"
+            job.started_at = time.time()
+            self.write(job_to_record(job))
+            self._start_cached(job, cached, on_finish=lambda done: self.write(job_to_record(done)))
+            return job.id
+
+        self.write(job_to_record(job, attempts=0))
+        other = self._claim_key(key, job.id)
+        if other is not None:
+            self.path("jobs", f"{job.id}.json").unlink(missing_ok=True)
+            with open(self.path("aliases", other), "a") as f:
+                f.write(sanitize_name(name) + "\n")
+            if input_path is not None:
+                input_path.unlink(missing_ok=True)
+            return other
+
+        self.path("pending", job.id).touch()
+        JOBS_PENDING.set(self.pending_count())
+        return job.id
+
+    def status(self, job_id: str) -> Job | None:
+        # os workers tiram jobs da fila sem avisar o app, que consulta isto a cada atualização
+        JOBS_PENDING.set(self.pending_count())
+        record = self.read(job_id)
+        return job_from_record(record) if record else None
+
+    def jobs(self) -> list[Job]:
+        records = (_read_json(path) for path in self.path("jobs").glob("*.json"))
+        return sorted((job_from_record(r) for r in records if r), key=lambda j: j.created_at)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancela um job. Jobs na fila saem na hora; jobs em execução param na
+        próxima troca de etapa do worker (avisado pelo heartbeat).
+        """
+        record = self.read(job_id)
+        if record is None or record["status"] in FINISHED:
+            return False
+        self.path("cancel", job_id).touch()
+        held = self.path("reaping", f"{job_id}.{time.time_ns()}")
+        try:
+            # tira da fila antes que um worker pegue
+            os.rename(self.path("pending", job_id), held)
+        except FileNotFoundError:
+            return True
+        record.update(status=CANCELLED, finished_at=time.time())
+        self.write(record)
+        self.finish(job_id, record["key"])
+        held.unlink(missing_ok=True)
+        JOBS_PENDING.set(self.pending_count())
+        return True
+
+    def finish(self, job_id: str, key: str):
+        """Limpa os arquivos auxiliares de um job finalizado."""
+        self.path("cancel", job_id).unlink(missing_ok=True)
+        self.path("aliases", job_id).unlink(missing_ok=True)
+        try:
+            if self.path("keys", key).read_text().strip() == job_id:
+                self.path("keys", key).unlink()
+        except OSError:
+            pass
+
+    def pending_count(self) -> int:
+        return sum(1 for _ in self.path("pending").iterdir())
+
+    def aliases(self, job_id: str) -> list[str]:
+        try:
+            return [line for line in self.path("aliases", job_id).read_text().splitlines() if line]
+        except OSError:
+            return []
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return self.path("cancel", job_id).exists()
+
+
+class SharedWorker:
+    """
+    Worker da fila compartilhada (`scripts/worker.py`).
+
+    Cada thread tem o seu `SeparationEngine` e roda um job por vez com o mesmo
+    código da fila local (`JobQueue._run`).
+    """
+
+    def __init__(self, queue: SharedJobQueue, threads: int = 1,
+                 worker_id: str | None = None, src_dir: Path = SRC_DIR):
+        self.queue = queue
+        self.threads = max(1, threads)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.runner = JobQueue(src_dir=src_dir, out_root=queue.out_root)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _lease(self, job_id: str) -> Path:
+        return self.queue.path("leased", job_id)
+
+    def owns(self, job_id: str) -> bool:
+        lease = _read_json(self._lease(job_id))
+        return lease is not None and lease.get("worker") == self.worker_id
+
+    def claim(self) -> str | None:
+        """Pega o job mais antigo da fila, ou None se estiver vazia."""
+        entries = []
+        for entry in os.scandir(self.queue.path("pending")):
+            try:
+                entries.append((entry.stat().st_mtime, entry.name))
+            except FileNotFoundError:
+                continue
+        for _, job_id in sorted(entries):
+            pending = self.queue.path("pending", job_id)
+            try:
+                # o mtime do marcador vira o início da concessão
+                os.utime(pending)
+                os.rename(pending, self._lease(job_id))
+            except FileNotFoundError:
+                continue  # outro worker pegou antes
+            _write_json(self._lease(job_id), {"worker": self.worker_id, "since": time.time()})
+            return job_id
+        return None
+
+    def reap(self) -> int:
+        """Devolve à fila os jobs com concessão vencida (worker morto ou travado)."""
+        now = time.time()
+        reaped = 0
+        for entry in os.scandir(self.queue.path("leased")):
+            if entry.name.startswith("."):
+                continue
+            held = self.queue.path("reaping", f"{entry.name}.{time.time_ns()}")
+            try:
+                if now - entry.stat().st_mtime < LEASE_SECONDS:
+                    continue
+                os.rename(entry.path, held)
+            except FileNotFoundError:
+                continue
+            self._redeliver(entry.name, expired=True)
+            held.unlink(missing_ok=True)
+            reaped += 1
+        # um worker que morreu no meio da devolução deixa o job em reaping/
+        for entry in os.scandir(self.queue.path("reaping")):
+            job_id, _, since = entry.name.partition(".")
+            if not since.isdigit() or now - int(since) / 1e9 < LEASE_SECONDS:
+                continue
+            held = self.queue.path("reaping", f"{job_id}.{time.time_ns()}")
+            try:
+                os.rename(entry.path, held)
+            except FileNotFoundError:
+                continue
+            self._redeliver(job_id, expired=False)
+            held.unlink(missing_ok=True)
+            reaped += 1
+        return reaped
+
+    def _redeliver(self, job_id: str, expired: bool):
+        record = self.queue.read(job_id)
+        if record is None or record["status"] in FINISHED:
+            return
+        if expired:
+            record["attempts"] = record.get("attempts", 0) + 1
+        if self.queue.cancel_requested(job_id):
+            record.update(status=CANCELLED, finished_at=time.time())
+        elif record.get("attempts", 0) >= MAX_ATTEMPTS:
+            record.update(status=FAILED, finished_at=time.time(),
+                          error=f"Worker parou de responder em {record['attempts']} tentativa(s).")
+        else:
+            record.update(status=PENDING, stage="", progress=0.0)
+            self.queue.write(record)
+            self.queue.path("pending", job_id).touch()
+            log_event("job", job_id=job_id, status="redelivered", attempts=record["attempts"])
+            return
+        self.queue.write(record)
+        self.queue.finish(job_id, record["key"])
+        JOBS.inc(status=record["status"])
+        log_event("job", job_id=job_id, status=record["status"], attempts=record.get("attempts", 0))
+
+    def _heartbeat(self, job: Job, attempts: int, done: threading.Event):
+        """Renova a concessão e publica etapa e progresso até o job terminar."""
+        while not done.wait(HEARTBEAT_SECONDS):
+            try:
+                if not self.owns(job.id):
+                    raise FileNotFoundError
+                os.utime(self._lease(job.id))
+            except FileNotFoundError:
+                # a concessão venceu e o job voltou para a fila
+                job.cancel_event.set()
+                return
+            if self.queue.cancel_requested(job.id):
+                job.cancel_event.set()
+            self.queue.write(job_to_record(job, attempts=attempts, worker=self.worker_id,
+                                           aliases=self.queue.aliases(job.id)))
+
+    def execute(self, job_id: str, engine):
+        record = self.queue.read(job_id)
+        if record is None:
+            self._lease(job_id).unlink(missing_ok=True)
+            return
+        job = job_from_record(record)
+        job.aliases = self.queue.aliases(job_id)
+        attempts = record.get("attempts", 0)
+
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, attempts, done),
+                                name=f"sound-ai-lease-{job_id}", daemon=True)
+        beat.start()
+        try:
+            cached = self.runner.cache.lookup(job.key, refresh=True)
+            if self.queue.cancel_requested(job_id):
+                job.status, job.finished_at = CANCELLED, time.time()
+            elif cached is not None:
+                # outro worker terminou o mesmo vídeo enquanto este job esperava
+                job.result = self.runner._publish_cached(cached, sanitize_name(job.name))
+                job.name = job.result.name
+                job.stage, job.status, job.finished_at = "cache", DONE, time.time()
+            else:
+                with trace(job_id=job.id, key=job.key, worker=self.worker_id), cancel_scope(job.cancel_event):
+                    self.runner._run(job, engine)
+        finally:
+            done.set()
+            beat.join()
+
+        if not self.owns(job_id):
+            # outro worker já recebeu o job de novo; o resultado, se houver, fica no cache
+            return
+        if job.status == DONE:
+            for alias in self.queue.aliases(job_id):
+                if alias not in job.aliases and alias != job.result.name:
+                    self.runner._publish_cached(job.result, alias)
+                    job.aliases.append(alias)
+        self.queue.write(job_to_record(job, attempts=attempts, worker=self.worker_id))
+        self.queue.finish(job_id, job.key)
+        self._lease(job_id).unlink(missing_ok=True)
+
+    def _loop(self):
+        from .separator import SeparationEngine
+
+        engine = SeparationEngine()
+        while not self._stop.is_set():
+            self.reap()
+            job_id = self.claim()
+            if job_id is None:
+                self._stop.wait(POLL_SECONDS)
+                continue
+            self.execute(job_id, engine)
+
+    def run(self):
+        """Processa a fila até `stop()` ou Ctrl+C."""
+        log_event("worker", worker=self.worker_id, threads=self.threads, queue=str(self.queue.dir))
+        threads = [threading.Thread(target=self._loop, name=f"sound-ai-shared-{i}", daemon=True)
+                   for i in range(self.threads)]
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop()
+            for t in threads:
+                t.join()
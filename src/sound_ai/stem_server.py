@@ -0,0 +1,230 @@
+"""
+Servidor HTTP dos stems da biblioteca, com suporte a `Range` e cache.
+
+O mixer multifaixa referencia os arquivos por URL em vez de embutir o áudio
+em base64: o navegador baixa só o que precisa para tocar/buscar e reaproveita
+o cache entre reruns do Streamlit.
+
+Só são servidos os arquivos de áudio das faixas (stems e mixagens em
+`.mixes/`) e os seus picos; `track.json` (com a URL de origem), pastas ocultas
+e qualquer outro arquivo dão 404. Por padrão o servidor só escuta em
+localhost; em containers ou para outros computadores da rede defina
+`SOUND_AI_STEM_HOST=0.0.0.0`.
+"""
+
+import email.utils
+import json
+import mimetypes
+import os
+import re
+import threading
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from . import metrics
+from .config import SEPARATED_DIR
+
+HOST = os.environ.get("SOUND_AI_STEM_HOST", "127.0.0.1")
+PORT = int(os.environ.get("SOUND_AI_STEM_PORT", "8502"))
+# URL pública (ex.: atrás de um proxy); vazio = mesmo host da página, porta PORT
+PUBLIC_URL = os.environ.get("SOUND_AI_STEM_URL", "").rstrip("/")
+
+CACHE_MAX_AGE = 24 * 3600
+COPY_CHUNK = 256 * 1024
+
+# o que pode ser baixado de cada faixa: <faixa>/<arquivo> ou <faixa>/.mixes/<arquivo>
+SERVED_SUFFIXES = {".mp3", ".opus", ".flac", ".peaks"}
+MIX_DIR = ".mixes"  # mixes.MIX_DIR (não importado: puxaria o pipeline)
+
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("audio/ogg", ".opus")
+mimetypes.add_type("audio/flac", ".flac")
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def is_served(parts: tuple[str, ...]) -> bool:
+    """Se o caminho relativo à biblioteca é um arquivo de áudio ou de picos de uma faixa."""
+    if len(parts) == 3 and parts[1] == MIX_DIR:
+        track, name = parts[0], parts[2]
+    elif len(parts) == 2:
+        track, name = parts
+    else:
+        return False
+    return (not track.startswith(".") and not name.startswith(".")
+            and Path(name).suffix.lower() in SERVED_SUFFIXES)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Converte um cabeçalho `Range` de intervalo único em (início, fim) inclusivo.
+
+    Returns:
+        None quando o cabeçalho é inválido ou não satisfazível
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    start, end = match.groups()
+    if start == "":
+        if end == "":
+            return None
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class StemRequestHandler(BaseHTTPRequestHandler):
+    root: Path = SEPARATED_DIR
+    # False serve qualquer arquivo da raiz (benchmark e testes com pastas temporárias)
+    restrict: bool = True
+    server_version = "SoundAIStems/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Path | None:
+        rel = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).lstrip("/")
+        root = self.root.resolve()
+        path = (root / rel).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        if self.restrict and not is_served(path.relative_to(root).parts):
+            return None
+        return path
+
+    def _common_headers(self, path: Path, stat, etag: str):
+        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.send_header("Content-Type", ctype)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", f"public, max-age={CACHE_MAX_AGE}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "Content-Length, Content-Range, ETag")
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve_metrics(self, send_body: bool) -> bool:
+        """`/metrics` (Prometheus) e `/metrics.json`; False para outros caminhos."""
+        route = urllib.parse.urlsplit(self.path).path
+        if route == "/metrics":
+            body = metrics.render_prometheus().encode()
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif route == "/metrics.json":
+            body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode()
+            ctype = "application/json"
+        else:
+            return False
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        return True
+
+    def _serve(self, send_body: bool):
+        if self._serve_metrics(send_body):
+            return
+        path = self._resolve()
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        stat = path.stat()
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._common_headers(path, stat, etag)
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (not if_range or if_range == etag):
+            byte_range = parse_range(range_header, size)
+            if byte_range is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        length = max(end - start + 1, 0)
+        self.send_response(status)
+        self._common_headers(path, stat, etag)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+        if not send_body or length == 0:
+            return
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(COPY_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # o navegador cancela requisições ao buscar outra posição
+            pass
+
+
+def make_server(root: Path = SEPARATED_DIR, host: str = HOST, port: int = PORT,
+                restrict: bool = True) -> ThreadingHTTPServer:
+    handler = type("BoundStemRequestHandler", (StemRequestHandler,), {"root": Path(root), "restrict": restrict})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def ensure_stem_server(root: Path = SEPARATED_DIR) -> ThreadingHTTPServer | None:
+    """Sobe o servidor em uma thread na primeira chamada do processo."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = make_server(root)
+            except OSError:
+                # porta já ocupada (outro processo do app já está servindo)
+                return None
+            threading.Thread(target=_server.serve_forever, name="sound-ai-stems", daemon=True).start()
+        return _server
+
+
+def stem_path(path: Path, root: Path = SEPARATED_DIR) -> str:
+    """Caminho URL (relativo à raiz do servidor) de um arquivo da biblioteca."""
+    path = Path(path)
+    rel = path.resolve().relative_to(Path(root).resolve())
+    # versão na query invalida o cache do navegador se o arquivo for refeito
+    version = f"{path.stat().st_mtime_ns:x}"
+    return "/" + "/".join(urllib.parse.quote(part) for part in rel.parts) + f"?v={version}"
@@ -0,0 +1,193 @@
+"""
+Cota de disco da biblioteca, com remoção LRU e reserva de espaço por job.
+
+O uso é a soma dos tamanhos indexados na biblioteca mais as mixagens em
+cache. Aberturas de faixa e downloads na interface atualizam o último acesso
+(`Library.touch`). Antes de rodar, cada job reserva uma estimativa do espaço
+que vai ocupar. Se a reserva estourar a cota ou o espaço livre mínimo do
+disco, as faixas menos usadas são primeiro rebaixadas (mixagens e arquivos
+derivados apagados) e, se ainda faltar espaço, removidas. Assim o job falha
+antes de começar, e não no meio da gravação dos stems.
+"""
+
+import itertools
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .config import STORAGE_EVICTION, STORAGE_MIN_FREE_BYTES, STORAGE_QUOTA_BYTES, STEM_FORMAT
+from .library import Library
+from .metrics import STORAGE_EVICTIONS, STORAGE_USED, log_event
+
+# pior caso por segundo de áudio: origem + stems WAV do CLI do demucs + saída comprimida
+RESERVE_BYTES_PER_SECOND = 1 << 20
+DEFAULT_RESERVE_SECONDS = 600
+# faixas acessadas há menos que isso não são removidas (podem estar abertas na interface)
+PROTECT_SECONDS = 600
+TOUCH_INTERVAL = 60
+EVICTION_BATCH = 1000
+
+# arquivos que podem ser refeitos a partir dos stems
+DERIVED_PATTERNS = [f"mixed_audio*.{STEM_FORMAT}", "mixed_audio*.peaks"]
+
+
+class StorageError(Exception):
+    pass
+
+
+@dataclass
+class Reservation:
+    id: int
+    nbytes: int
+    names: set[str] = field(default_factory=set)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if abs(n) < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class StorageManager:
+    def __init__(self, library: Library, cache=None, mix_cache=None,
+                 quota_bytes: int = STORAGE_QUOTA_BYTES,
+                 min_free_bytes: int = STORAGE_MIN_FREE_BYTES,
+                 eviction: str = STORAGE_EVICTION):
+        self.library = library
+        self.root = library.root
+        self.cache = cache
+        self.mix_cache = mix_cache
+        self.quota_bytes = quota_bytes
+        self.min_free_bytes = min_free_bytes
+        self.eviction = eviction
+        self._reserved: dict[int, Reservation] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}
+
+    def touch(self, track_id: str, force: bool = False):
+        """Registra o acesso a uma faixa (no máximo uma escrita por minuto por faixa)."""
+        now = time.time()
+        if not force and now - self._touched.get(track_id, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[track_id] = now
+        self.library.touch(track_id, now)
+
+    def usage(self) -> int:
+        used = self.library.total_size()
+        if self.mix_cache is not None:
+            used += self.mix_cache.total_bytes
+        STORAGE_USED.set(used)
+        return used
+
+    def free_disk(self) -> int:
+        path = self.root
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        return shutil.disk_usage(path).free
+
+    @staticmethod
+    def estimate(duration: float | None = None) -> int:
+        """Espaço a reservar para um job (duração desconhecida usa `DEFAULT_RESERVE_SECONDS`)."""
+        return int((duration or DEFAULT_RESERVE_SECONDS) * RESERVE_BYTES_PER_SECOND)
+
+    def _shortfall(self, nbytes: int) -> int:
+        reserved = sum(r.nbytes for r in self._reserved.values())
+        need = self.min_free_bytes + reserved + nbytes - self.free_disk()
+        if self.quota_bytes:
+            need = max(need, self.usage() + reserved + nbytes - self.quota_bytes)
+        return max(need, 0)
+
+    def demote(self, track_id: str) -> int:
+        """Deixa só os stems: apaga mixagens em cache e arquivos derivados."""
+        track_dir = self.root / track_id
+        freed = self.mix_cache.drop(track_dir) if self.mix_cache is not None else 0
+        for pattern in DERIVED_PATTERNS:
+            for path in track_dir.glob(pattern):
+                freed += path.stat().st_size
+                path.unlink(missing_ok=True)
+        if freed:
+            self.library.update(track_dir, refresh=False)
+            STORAGE_EVICTIONS.inc(action="demote")
+            log_event("storage", action="demote", track=track_id, freed=freed)
+        return freed
+
+    def delete(self, track_id: str) -> int:
+        track_dir = self.root / track_id
+        record = self.library.get(track_id)
+        freed = record.size_bytes if record else 0
+        if self.mix_cache is not None:
+            freed += self.mix_cache.drop(track_dir)
+            self.mix_cache.forget(track_dir)
+        shutil.rmtree(track_dir, ignore_errors=True)
+        if self.cache is not None:
+            self.cache.forget(track_dir)
+        self.library.remove(track_id)
+        STORAGE_EVICTIONS.inc(action="delete")
+        log_event("storage", action="delete", track=track_id, freed=freed)
+        return freed
+
+    def _evict(self, need: int, protected: set[str]) -> int:
+        cutoff = time.time() - PROTECT_SECONDS
+        candidates = [
+            record for record in self.library.least_recently_used(EVICTION_BATCH)
+            if record.id not in protected and record.last_used < cutoff
+        ]
+        # não apaga nada se nem removendo todas as candidatas o espaço couber
+        available = sum(record.size_bytes for record in candidates) if self.eviction == "delete" else 0
+        if self.mix_cache is not None:
+            available += self.mix_cache.total_bytes
+        if available < need:
+            return 0
+
+        freed = 0
+        for record in candidates:
+            if freed >= need:
+                return freed
+            freed += self.demote(record.id)
+        if self.eviction != "delete":
+            return freed
+        for record in candidates:
+            if freed >= need:
+                break
+            freed += self.delete(record.id)
+        return freed
+
+    def _protected(self, names=()) -> set[str]:
+        return set(names) | {name for r in self._reserved.values() for name in r.names}
+
+    def reserve(self, nbytes: int, names=()) -> Reservation:
+        """
+        Reserva `nbytes` para um job, liberando espaço se preciso.
+
+        Args:
+            names: pastas que o job vai gravar (nunca são removidas enquanto ele roda)
+
+        Raises:
+            StorageError: se nem removendo faixas antigas o espaço couber
+        """
+        with self._lock:
+            need = self._shortfall(nbytes)
+            if need:
+                self._evict(need, self._protected(names))
+                need = self._shortfall(nbytes)
+                if need:
+                    raise StorageError(
+                        f"Sem espaço para o job (cota ou disco): faltam {format_bytes(need)} "
+                        f"(reserva de {format_bytes(nbytes)})."
+                    )
+            reservation = Reservation(next(self._ids), nbytes, set(names))
+            self._reserved[reservation.id] = reservation
+            return reservation
+
+    def release(self, reservation: Reservation):
+        with self._lock:
+            self._reserved.pop(reservation.id, None)
+
+    def enforce(self) -> int:
+        """Volta para dentro da cota (jobs podem ocupar mais que a estimativa)."""
+        with self._lock:
+            need = self._shortfall(0)
+            return self._evict(need, self._protected()) if need else 0
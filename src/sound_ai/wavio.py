@@ -0,0 +1,166 @@
+"""
+Leitura e escrita de WAV com NumPy, sem carregar o arquivo inteiro na memória.
+
+`WavReader` mapeia o bloco de dados com `numpy.memmap` e entrega trechos já
+convertidos para float32 no formato (frames, canais). `WavWriter` grava PCM
+16 bits ou float32 de forma incremental.
+"""
+
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavError(Exception):
+    pass
+
+
+@dataclass
+class WavInfo:
+    samplerate: int
+    channels: int
+    bits: int
+    is_float: bool
+    data_offset: int
+    frames: int
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+
+def read_wav_info(path: Path) -> WavInfo:
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+            raise WavError(f"Não é um arquivo WAV: {path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise WavError(f"Bloco de dados não encontrado: {path}")
+            chunk_id, size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"fmt ":
+                raw = f.read(size)
+                tag, channels, samplerate, _, _, bits = struct.unpack("<HHIIHH", raw[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(raw) >= 26:
+                    tag = struct.unpack("<H", raw[24:26])[0]
+                if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                    raise WavError(f"Formato WAV não suportado ({tag}): {path}")
+                fmt = (channels, samplerate, bits, tag == WAVE_FORMAT_IEEE_FLOAT)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise WavError(f"Bloco fmt ausente: {path}")
+                channels, samplerate, bits, is_float = fmt
+                offset = f.tell()
+                file_size = Path(path).stat().st_size
+                # ffmpeg escrevendo em pipe deixa o tamanho como 0 ou 0xFFFFFFFF
+                if size in (0, 0xFFFFFFFF) or offset + size > file_size:
+                    size = file_size - offset
+                frame_size = channels * bits // 8
+                return WavInfo(samplerate, channels, bits, is_float, offset, size // frame_size)
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+class WavReader:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.info = read_wav_info(self.path)
+        info = self.info
+
+        if info.is_float:
+            dtype = {32: np.float32, 64: np.float64}.get(info.bits)
+        else:
+            dtype = {16: np.int16, 24: np.uint8, 32: np.int32}.get(info.bits)
+        if dtype is None:
+            raise WavError(f"Profundidade de {info.bits} bits não suportada: {path}")
+
+        width = 3 if info.bits == 24 else 1
+        shape = (info.frames, info.channels * width)
+        if info.frames == 0:
+            self._data = np.zeros(shape, dtype=dtype)
+        else:
+            self._data = np.memmap(
+                self.path, dtype=dtype, mode="r", offset=info.data_offset, shape=shape
+            )
+
+    @property
+    def frames(self) -> int:
+        return self.info.frames
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Trecho [start, stop) como float32 (frames, canais) em [-1, 1]."""
+        chunk = self._data[start:stop]
+        bits = self.info.bits
+        if self.info.is_float:
+            return np.array(chunk, dtype=np.float32)
+        if bits == 24:
+            raw = chunk.reshape(len(chunk), self.info.channels, 3).astype(np.int32)
+            ints = raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16)
+            ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+            return ints.astype(np.float32) / float(1 << 23)
+        return chunk.astype(np.float32) / float(1 << (bits - 1))
+
+    def close(self):
+        # o mapeamento é liberado quando a última referência some
+        self._data = None
+
+
+class WavWriter:
+    def __init__(self, path: Path, samplerate: int, channels: int, dtype: str = "int16"):
+        if dtype not in ("int16", "float32"):
+            raise WavError(f"Formato de saída não suportado: {dtype}")
+        self.path = Path(path)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.frames = 0
+        self._file = open(self.path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        is_float = self.dtype == "float32"
+        bits = 32 if is_float else 16
+        block_align = self.channels * bits // 8
+        data_size = self.frames * block_align
+        self._file.write(struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + data_size, b"WAVE",
+            b"fmt ", 16,
+            WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM,
+            self.channels, self.samplerate, self.samplerate * block_align,
+            block_align, bits,
+            b"data", data_size,
+        ))
+
+    def write(self, samples: np.ndarray):
+        """Grava um bloco float32 (frames, canais)."""
+        if self.dtype == "int16":
+            data = np.clip(samples, -1.0, 1.0) * 32767.0
+            data = data.astype("<i2")
+        else:
+            data = samples.astype("<f4", copy=False)
+        self._file.write(np.ascontiguousarray(data).tobytes())
+        self.frames += len(samples)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
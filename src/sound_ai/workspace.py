@@ -0,0 +1,156 @@
+"""
+Áreas de trabalho isoladas por job.
+
+Cada job baixa, separa e codifica dentro de `WORKSPACE_DIR/<id>` e só no fim
+publica a pasta da faixa na biblioteca com um `rename` (mesmo sistema de
+arquivos, conferido por `check_same_filesystem`). Assim jobs simultâneos
+nunca escrevem nos mesmos caminhos e uma faixa publicada nunca fica pela
+metade. `publish` nunca substitui uma pasta existente sem `replace=True`; quem
+publica escolhe outro nome quando o pedido é ocupado por outro vídeo
+(`ResultCache.place`). Áreas deixadas por processos que morreram são apagadas na
+inicialização (`cleanup_orphans`).
+"""
+
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+from pathlib import Path
+
+from .config import SEPARATED_ROOT, WORKSPACE_DIR
+from .metrics import log_event
+
+OWNER_FILE = ".owner"
+# áreas de outros hosts (workers da fila compartilhada) só são apagadas depois disso
+ORPHAN_SECONDS = float(os.environ.get("SOUND_AI_WORKSPACE_MAX_AGE", str(24 * 3600)))
+
+# distingue este processo de um anterior que teve o mesmo pid (containers reiniciados)
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+class WorkspaceError(Exception):
+    pass
+
+
+class Workspace:
+    def __init__(self, path: Path):
+        self.path = path
+        # raiz de saída do pipeline: os stems ficam em out/<modelo>/<nome>
+        self.out_root = path / "out"
+
+    @classmethod
+    def create(cls, label: str = "", root: Path = WORKSPACE_DIR) -> "Workspace":
+        path = root / f"{label or 'job'}-{uuid.uuid4().hex[:8]}"
+        path.mkdir(parents=True)
+        (path / OWNER_FILE).write_text(json.dumps({
+            "host": socket.gethostname(), "pid": os.getpid(),
+            "token": _PROCESS_TOKEN, "created_at": time.time(),
+        }))
+        return cls(path)
+
+    def adopt(self, source: Path, name: str | None = None) -> Path:
+        """Move um arquivo de entrada (ex.: baixado pelo ingest) para dentro da área."""
+        target = self.path / (name or source.name)
+        try:
+            os.replace(source, target)
+        except OSError:
+            # outro sistema de arquivos
+            shutil.move(source, target)
+        return target
+
+    def publish(self, staged: Path, target: Path, replace: bool = False) -> Path:
+        """
+        Coloca a pasta `staged` em `target` com `rename`.
+
+        Args:
+            replace: tira do lugar uma pasta existente em `target` (outra versão
+                da mesma faixa), que é apagada com a área de trabalho
+
+        Raises:
+            FileExistsError: `target` existe e `replace` é falso
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(staged, target)
+            return target
+        except OSError:
+            if not target.exists():
+                raise
+        if not replace:
+            raise FileExistsError(f"Já existe uma pasta em {target}")
+        replaced = self.path / "replaced"
+        replaced.mkdir(exist_ok=True)
+        os.rename(target, replaced / target.name)
+        os.rename(staged, target)
+        return target
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def workspace_root(out_root: Path) -> Path:
+    """Raiz das áreas de trabalho para uma saída (scripts e testes usam outra raiz)."""
+    return WORKSPACE_DIR if out_root == SEPARATED_ROOT else out_root / WORKSPACE_DIR.name
+
+
+def check_same_filesystem(root: Path, library_root: Path):
+    """
+    Raises:
+        WorkspaceError: as áreas de trabalho não estão no sistema de arquivos da
+            biblioteca (o `rename` da publicação falharia com EXDEV)
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    library_root.mkdir(parents=True, exist_ok=True)
+    if root.stat().st_dev != library_root.stat().st_dev:
+        raise WorkspaceError(
+            f"SOUND_AI_WORKSPACE_DIR ({root}) precisa estar no mesmo sistema de arquivos "
+            f"da biblioteca ({library_root})."
+        )
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_orphan(path: Path, now: float) -> bool:
+    try:
+        owner = json.loads((path / OWNER_FILE).read_text())
+    except (OSError, ValueError):
+        return now - path.stat().st_mtime > ORPHAN_SECONDS
+    if owner.get("host") != socket.gethostname():
+        return now - owner.get("created_at", 0) > ORPHAN_SECONDS
+    if owner.get("pid") == os.getpid():
+        return owner.get("token") != _PROCESS_TOKEN
+    return not _pid_alive(owner.get("pid", 0))
+
+
+def cleanup_orphans(root: Path = WORKSPACE_DIR) -> int:
+    """Apaga as áreas de trabalho de processos que não existem mais. Retorna quantas."""
+    if not root.exists():
+        return 0
+    now = time.time()
+    removed = 0
+    for path in root.iterdir():
+        try:
+            if path.is_dir() and _is_orphan(path, now):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    if removed:
+        log_event("workspace", action="cleanup", removed=removed)
+    return removed
@@ -0,0 +1,205 @@
+"""Motor de download (sound_ai.downloader) contra um servidor HTTP local."""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+requests = pytest.importorskip("requests")
+from sound_ai import downloader
+from sound_ai.downloader import DownloadError, download_file
+
+PROBE_RANGE = "bytes=0-0"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serve `cfg["data"]` com Range/If-Range e falhas programadas (ver `server`)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cfg = self.server.cfg
+        requested = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        probe = requested == PROBE_RANGE
+        cfg["log"].append({"range": requested, "if_range": if_range, "probe": probe})
+
+        if probe and cfg["probe_failures"]:
+            cfg["probe_failures"] -= 1
+            return self.empty(503)
+        if cfg["status"]:
+            return self.empty(cfg["status"])
+
+        data = cfg["data"]
+        start, end, partial = 0, len(data) - 1, False
+        if requested and cfg["ranges"] and (if_range is None or if_range == cfg["etag"]):
+            first, last = requested.removeprefix("bytes=").split("-")
+            start, end, partial = int(first), int(last) if last else len(data) - 1, True
+        body = data[start:end + 1]
+
+        self.send_response(206 if partial else 200)
+        self.send_header("ETag", cfg["etag"])
+        if partial:
+            total = "*" if cfg["unknown_size"] else len(data)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+
+        if probe or not cfg["truncate"]:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # corta o corpo pela metade e fecha a conexão
+        cfg["truncate"] -= 1
+        if not cfg["no_length"]:
+            self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body[: len(body) // 2])
+        self.wfile.flush()
+        self.close_connection = True
+        if cfg["after_truncate"]:
+            cfg["after_truncate"](cfg)
+
+    def empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.cfg = {
+        "data": os.urandom(256 << 10), "etag": '"v1"', "ranges": True, "unknown_size": False,
+        "probe_failures": 0, "status": 0, "truncate": 0, "no_length": False,
+        "after_truncate": None, "log": [],
+    }
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/audio.mp3"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(downloader.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(downloader, "MIN_SEGMENT_SIZE", 16 << 10)
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 4 << 10)
+
+
+def fetch(server, dest, **kwargs):
+    with requests.Session() as session:
+        return download_file(server.url, dest, session=session, timeout=5, **kwargs)
+
+
+def ranges(server):
+    return [entry["range"] for entry in server.cfg["log"] if not entry["probe"]]
+
+
+def test_segmented_download_uses_ranges(server, tmp_path):
+    dest = fetch(server, tmp_path / "a.mp3", segments=4)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    assert len(ranges(server)) == 4
+    assert all(r.startswith("bytes=") for r in ranges(server))
+    assert not (tmp_path / "a.mp3.part").exists()
+    assert not (tmp_path / "a.mp3.part.json").exists()
+
+
+def test_truncated_segments_resume_from_offset(server, tmp_path):
+    server.cfg["truncate"] = 4
+
+    dest = fetch(server, tmp_path / "a.mp3", segments=4, retries=2)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    starts = {int(r.removeprefix("bytes=").split("-")[0]) for r in ranges(server)}
+    segment = len(server.cfg["data"]) // 4
+    # as novas tentativas continuam do meio dos segmentos, não do começo
+    assert any(start % segment for start in starts)
+
+
+def test_interrupted_download_resumes_from_saved_state(server, tmp_path):
+    server.cfg["truncate"] = 4
+    with pytest.raises(DownloadError):
+        fetch(server, tmp_path / "a.mp3", segments=4, retries=0)
+    assert (tmp_path / "a.mp3.part.json").exists()
+    server.cfg["log"].clear()
+
+    dest = fetch(server, tmp_path / "a.mp3", segments=4)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    segment = len(server.cfg["data"]) // 4
+    assert all(int(r.removeprefix("bytes=").split("-")[0]) % segment for r in ranges(server))
+
+
+def test_changed_file_discards_saved_state(server, tmp_path):
+    server.cfg["truncate"] = 4
+    with pytest.raises(DownloadError):
+        fetch(server, tmp_path / "a.mp3", segments=4, retries=0)
+    server.cfg.update(data=os.urandom(256 << 10), etag='"v2"')
+    server.cfg["log"].clear()
+
+    dest = fetch(server, tmp_path / "a.mp3", segments=4)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    assert "bytes=0-65535" in ranges(server)
+
+
+def test_stream_resume_sends_if_range(server, tmp_path):
+    server.cfg.update(unknown_size=True, truncate=1)
+
+    dest = fetch(server, tmp_path / "a.mp3", retries=1)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    resumed = [entry for entry in server.cfg["log"] if not entry["probe"]][-1]
+    assert resumed["range"] == f"bytes={len(server.cfg['data']) // 2}-"
+    assert resumed["if_range"] == '"v1"'
+
+
+def test_stream_restarts_when_if_range_does_not_match(server, tmp_path):
+    new_data = os.urandom(200 << 10)
+    server.cfg.update(unknown_size=True, truncate=1,
+                      after_truncate=lambda cfg: cfg.update(data=new_data, etag='"v2"'))
+
+    dest = fetch(server, tmp_path / "a.mp3", retries=1)
+
+    # o servidor ignorou o Range (If-Range antigo) e mandou a versão nova inteira
+    assert dest.read_bytes() == new_data
+
+
+def test_short_stream_pass_is_retried(server, tmp_path):
+    # sem Content-Length e sem Range: a passada termina limpa, mas curta
+    server.cfg.update(ranges=False, no_length=True, truncate=1)
+
+    dest = fetch(server, tmp_path / "a.mp3", retries=1)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    assert len(ranges(server)) == 2
+
+
+def test_probe_is_retried(server, tmp_path):
+    server.cfg["probe_failures"] = 2
+
+    dest = fetch(server, tmp_path / "a.mp3", retries=2)
+
+    assert dest.read_bytes() == server.cfg["data"]
+    assert sum(entry["probe"] for entry in server.cfg["log"]) == 3
+
+
+def test_probe_client_error_is_not_retried(server, tmp_path):
+    server.cfg["status"] = 404
+
+    with pytest.raises(DownloadError):
+        fetch(server, tmp_path / "a.mp3", retries=3)
+
+    assert len(server.cfg["log"]) == 1
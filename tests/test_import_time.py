@@ -0,0 +1,25 @@
+"""Orçamento de tempo de import dos pontos de entrada (scripts/check_import_time.py)."""
+
+import os
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "scripts"))
+import check_import_time
+
+# máquinas de CI mais lentas: SOUND_AI_IMPORT_BUDGET_SCALE=1.5
+SCALE = float(os.environ.get("SOUND_AI_IMPORT_BUDGET_SCALE", "1.0"))
+RUNS = 5
+
+
+@pytest.mark.parametrize("name", list(check_import_time.ENTRY_POINTS))
+def test_import_time_budget(name):
+    entry = check_import_time.ENTRY_POINTS[name]
+    runs = [check_import_time.measure(entry["modules"], entry["forbidden"]) for _ in range(RUNS)]
+
+    assert not runs[-1][1], f"dependências pesadas carregadas no import: {runs[-1][1]}"
+    median = statistics.median(ms for ms, _ in runs)
+    assert median <= entry["budget_ms"] * SCALE, f"{name}: {median:.1f}ms"